@@ -0,0 +1,56 @@
+import hmac
+import time
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+
+from app.core.config import settings
+from app.services.shared_store import get_shared_store
+
+
+def client_address(request: HTTPConnection) -> str:
+    """Address of the client, read from X-Forwarded-For only when the peer is a TRUSTED_PROXIES proxy
+
+    The header is walked from the right, skipping trusted proxies, so addresses a client
+    writes into it itself are never used.
+    """
+    peer = request.client.host if request.client else "unknown"
+    trusted = settings.TRUSTED_PROXIES
+    if not trusted or ("*" not in trusted and peer not in trusted):
+        return peer
+    forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()]
+    for address in reversed(forwarded):
+        if address not in trusted:
+            return address
+    return forwarded[0] if forwarded else peer
+
+
+async def rate_limit(request: HTTPConnection):
+    """Enforce RATE_LIMIT_PER_MINUTE per client, counted across all worker processes (0 disables it)
+
+    Typed as HTTPConnection so it also guards WebSocket routes, where a connection counts once.
+    """
+    limit = settings.RATE_LIMIT_PER_MINUTE
+    if limit <= 0:
+        return
+
+    client = client_address(request)
+    window = int(time.time() // 60)
+    count = await run_in_threadpool(get_shared_store().incr, f"rate:{client}:{window}", 1, 60)
+    if count > limit:
+        retry_after = 60 - int(time.time() % 60)
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded, please retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+async def require_admin(request: Request):
+    """Allow admin endpoints only with the configured X-Admin-Token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
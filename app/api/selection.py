@@ -0,0 +1,75 @@
+import hashlib
+from typing import Optional, Type
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.core.responses import ModelJSONResponse, artifact_response, etag_for, etag_matches
+from app.services.markdown_sections import get_sections, parse_selectors, select_sections
+
+
+class Selection:
+    """Response field and section selection requested through ?fields= and ?sections="""
+
+    def __init__(self, fields: Optional[str] = None, sections: Optional[str] = None):
+        self.fields = parse_selectors(fields)
+        self.sections = parse_selectors(sections)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.fields and not self.sections
+
+    def etag(self, artifact_id: str) -> str:
+        """ETag of the selected representation, distinct from the full artifact's"""
+        if self.is_empty:
+            return etag_for(artifact_id)
+        variant = f"{','.join(self.fields)}|{','.join(self.sections)}"
+        return etag_for(f"{artifact_id}.{hashlib.sha256(variant.encode('utf-8')).hexdigest()[:8]}")
+
+
+def render_selected(model: BaseModel, markdown_field: str, selection: Selection) -> ModelJSONResponse:
+    """Render an artifact with only the requested fields and parsed sections
+
+    Without a selection the full artifact is returned as stored. Selecting
+    sections replaces the raw markdown with just those sections, unless the markdown field
+    is also requested explicitly in ?fields=.
+    """
+    headers = {"ETag": selection.etag(model.id)}
+    if selection.is_empty:
+        return ModelJSONResponse(model, headers=headers)
+
+    parsed = get_sections(model.id, getattr(model, markdown_field))
+    include = None
+    exclude = {"sections"}
+    if selection.sections:
+        model = model.model_copy(update={"sections": select_sections(parsed, selection.sections)})
+        exclude = {markdown_field}
+    elif "sections" in selection.fields:
+        model = model.model_copy(update={"sections": parsed})
+
+    if selection.fields:
+        include = set(selection.fields) & set(type(model).model_fields)
+        if selection.sections:
+            include.add("sections")
+        exclude = None
+
+    return ModelJSONResponse(model, include=include, exclude=exclude, headers=headers)
+
+
+def stored_selection_response(
+    request: Request,
+    body: bytes,
+    artifact_id: str,
+    model_type: Type[BaseModel],
+    markdown_field: str,
+    selection: Selection
+) -> Response:
+    """Serve a stored artifact, applying the selection and honoring If-None-Match"""
+    if selection.is_empty:
+        return artifact_response(request, body, artifact_id)
+
+    etag = selection.etag(artifact_id)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return render_selected(model_type.model_validate_json(body), markdown_field, selection)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException
+
+from app.core.model_config import ModelConfigError, get_model_config_snapshot, reload_model_config
+
+router = APIRouter()
+
+
+def _describe(snapshot) -> dict:
+    return {
+        "version": snapshot.version,
+        "loaded_at": snapshot.loaded_at,
+        "source": snapshot.source,
+        "endpoints": {name: config.model_dump() for name, config in snapshot.endpoints.items()}
+    }
+
+
+@router.get("/config")
+async def get_config():
+    """Show the model configuration currently used by this worker"""
+    return _describe(get_model_config_snapshot())
+
+
+@router.post("/reload-config")
+async def reload_config():
+    """Reload the model configuration file on every worker"""
+    try:
+        # Requests already running keep the agents they were built with
+        snapshot = reload_model_config(broadcast=True)
+    except ModelConfigError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _describe(snapshot)
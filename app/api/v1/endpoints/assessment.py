@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import uuid
+from fastapi import APIRouter, File, Form, HTTPException, Query, Request, UploadFile
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import List, Optional
 from datetime import datetime
 
-from app.schemas.assessment.requests import AssessmentRequest
+from app.core.responses import ModelJSONResponse, artifact_response, etag_for
+from app.schemas.assessment.requests import AssessmentRequest, MAX_CONTENT_LENGTH
 from app.schemas.assessment.responses import AssessmentResponse, AssessmentListResponse
+from app.schemas.sections import SectionRegenerationRequest
 from app.services.agent import get_assessment_agent
+from app.services.artifact_store import get_artifact_store
+from app.services.document_upload import extract_upload
+from app.services.generation import generate_content
+from app.services.long_content import condense_content
+from app.services.markdown_sections import find_section
+from app.services.output_budget import assessment_budget
+from app.services.section_regeneration import regenerate_section
 
 router = APIRouter()
 
@@ -27,22 +37,59 @@ async def generate_assessment(request: AssessmentRequest):
                 detail="Either provide detailed text_content OR all curriculum fields (curriculum, grade, class_level, subject)"
             )
         
-        # Get agent when needed
-        agent = get_assessment_agent()
+        assessment = await _generate_assessment(request)
+        return ModelJSONResponse(assessment, headers={"ETag": etag_for(assessment.id)})
         
-        # Determine content source for the prompt
-        if request.text_content:
-            content_source = f"Text Content: {request.text_content}"
-        else:
-            content_source = f"""
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating assessment: {str(e)}")
+
+
+@router.post("/generate-from-file", response_model=AssessmentResponse)
+async def generate_assessment_from_file(
+    file: UploadFile = File(..., description="Source document (PDF, DOCX or TXT)"),
+    mcq_count: int = Form(5, ge=1, le=20),
+    short_question_count: int = Form(2, ge=1, le=10)
+):
+    """Generate an assessment from an uploaded source document"""
+    
+    # Spool the upload to disk and extract its text (skipped for previously seen files)
+    document = await extract_upload(file, MAX_CONTENT_LENGTH)
+    try:
+        request = AssessmentRequest(
+            text_content=document.text,
+            mcq_count=mcq_count,
+            short_question_count=short_question_count
+        )
+    except ValidationError:
+        raise HTTPException(status_code=422, detail="The uploaded document does not contain enough text")
+    
+    try:
+        # Label the stored assessment with the file rather than echoing its full text
+        assessment = await _generate_assessment(request, source_label=f"Uploaded document: {document.filename}")
+        return ModelJSONResponse(assessment, headers={"ETag": etag_for(assessment.id)})
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating assessment: {str(e)}")
+
+
+async def _generate_assessment(request: AssessmentRequest, source_label: Optional[str] = None) -> AssessmentResponse:
+    """Generate and store an assessment for a request"""
+    
+    # Determine content source for the prompt
+    if request.text_content:
+        # Condense very long source text into a digest before prompting
+        text_content = await condense_content(request.text_content, "assessment_source")
+        content_source = f"Text Content: {text_content}"
+    else:
+        content_source = f"""
             Curriculum: {request.curriculum}
             Grade: {request.grade}
             Class: {request.class_level}
             Subject: {request.subject}
             """
-        
-        # Create system prompt for the agent
-        system_prompt = f"""
+    
+    # Create system prompt for the agent
+    system_prompt = f"""
         Generate an educational assessment based on the following content:
         
         {content_source}
@@ -87,32 +134,27 @@ async def generate_assessment(request: AssessmentRequest):
         - Difficulty should be appropriate for the content level
         - DO NOT include any answers or answer keys
         """
-        
-        # Generate assessment using the agent
-        response = agent.run(system_prompt)
-        
-        # Extract the content from the RunResponse object
-        if hasattr(response, 'content'):
-            generated_content = response.content
-        elif hasattr(response, 'text'):
-            generated_content = response.text
-        else:
-            generated_content = str(response)
-        
-        # Create response object
-        assessment = AssessmentResponse(
-            id=str(uuid.uuid4()),
-            question_types=[f"{request.mcq_count} Multiple Choice Questions", f"{request.short_question_count} Short Answer Questions"],
-            text_content=request.text_content or f"{request.curriculum} - {request.grade} - {request.class_level} - {request.subject}",
-            generated_assessment=generated_content,
-            created_at=datetime.utcnow(),
-            status="completed"
-        )
-        
-        return assessment
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating assessment: {str(e)}")
+    
+    # Generate assessment using the agent
+    generated_content = await generate_content(
+        "assessment",
+        system_prompt,
+        get_assessment_agent,
+        output_budget=assessment_budget(request.mcq_count, request.short_question_count)
+    )
+    
+    # Create response object
+    assessment = AssessmentResponse(
+        id="",  # Replaced by the content hash when stored
+        question_types=[f"{request.mcq_count} Multiple Choice Questions", f"{request.short_question_count} Short Answer Questions"],
+        text_content=source_label or request.text_content or f"{request.curriculum} - {request.grade} - {request.class_level} - {request.subject}",
+        generated_assessment=generated_content,
+        created_at=datetime.utcnow(),
+        status="completed"
+    )
+    
+    # Store the artifact under its content-addressed id
+    return await run_in_threadpool(get_artifact_store().save, "assessment", assessment)
 
 def _generate_mcq_template(count: int) -> str:
     """Generate MCQ template based on count"""
@@ -146,19 +188,53 @@ def _calculate_time_allocation(mcq_count: int, short_count: int) -> int:
 
 
 @router.get("/", response_model=AssessmentListResponse)
-async def list_assessments():
-    """List all generated assessments"""
-    # This would typically query a database
-    # For now, returning empty list
+async def list_assessments(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """List all generated assessments, newest first"""
+    store = get_artifact_store()
     return AssessmentListResponse(
-        assessments=[],
-        total_count=0
+        assessments=await run_in_threadpool(store.list, "assessment", AssessmentResponse, limit, offset),
+        total_count=await run_in_threadpool(store.count, "assessment")
     )
 
 
 @router.get("/{assessment_id}", response_model=AssessmentResponse)
-async def get_assessment(assessment_id: str):
+async def get_assessment(assessment_id: str, request: Request):
     """Get a specific assessment by ID"""
-    # This would typically query a database
-    # For now, returning 404
-    raise HTTPException(status_code=404, detail="Assessment not found")
+    body = await run_in_threadpool(get_artifact_store().get_raw, "assessment", assessment_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    
+    # Honors If-None-Match so clients can revalidate cached copies
+    return artifact_response(request, body, assessment_id)
+
+
+@router.post("/{assessment_id}/sections/{section}/regenerate", response_model=AssessmentResponse)
+async def regenerate_assessment_section(
+    assessment_id: str,
+    section: str,
+    request: Optional[SectionRegenerationRequest] = None
+):
+    """Regenerate one section of an assessment (by number or key), stored as a new assessment"""
+    body = await run_in_threadpool(get_artifact_store().get_raw, "assessment", assessment_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    assessment = AssessmentResponse.model_validate_json(body)
+    if find_section(assessment.generated_assessment, section) is None:
+        raise HTTPException(status_code=404, detail=f"Section '{section}' not found in the assessment")
+    
+    try:
+        assessment = await regenerate_section(
+            "assessment",
+            assessment,
+            "generated_assessment",
+            section,
+            get_assessment_agent,
+            request.instructions if request else None
+        )
+        return ModelJSONResponse(assessment, headers={"ETag": etag_for(assessment.id)})
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error regenerating assessment section: {str(e)}")
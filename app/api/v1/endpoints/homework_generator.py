@@ -1,25 +1,39 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import uuid
+import asyncio
+import json
+import re
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Tuple
 from datetime import datetime
 
-from app.schemas.homework_generator.requests import HomeworkGeneratorRequest
+from app.core.deadlines import resolve_deadline
+from app.core.responses import ModelJSONResponse, artifact_response, etag_for
+from app.schemas.homework_generator.requests import HomeworkBatchRequest, HomeworkGeneratorRequest
 from app.schemas.homework_generator.responses import HomeworkGeneratorResponse, HomeworkGeneratorListResponse
 from app.services.agent import get_homework_generator_agent
+from app.services.artifact_store import get_artifact_store
+from app.services.curriculum_kb import standards_context
+from app.services.generation import generate_content
+from app.services.metrics import metrics
+from app.services.output_budget import homework_batch_budget, homework_budget
+from app.services.saturation import saturation
+from app.services.warmup import record_request, register_warmup_target
 
 router = APIRouter()
 
+# "=== TOPIC 2: Fractions ===" lines separating topics in a batch response
+TOPIC_MARKER = re.compile(r"^[ \t]*=+[ \t]*TOPIC[ \t]+(\d+)\b[^\n]*?=+[ \t]*$", re.MULTILINE | re.IGNORECASE)
 
-@router.post("/generate", response_model=HomeworkGeneratorResponse)
-async def generate_homework(request: HomeworkGeneratorRequest):
-    """Generate homework based on curriculum, subject, grade, and topic"""
-    
-    try:
-        # Get agent when needed
-        agent = get_homework_generator_agent()
-        
-        # Create system prompt for the agent
-        system_prompt = f"""
+batch_model_calls_total = metrics.counter(
+    "homework_batch_model_calls_total",
+    "Model calls made by batch homework generation, by mode (grouped, single or fallback)"
+)
+
+
+def build_homework_prompt(request: HomeworkGeneratorRequest) -> str:
+    """Build the homework agent prompt for a request"""
+    return f"""
         Generate comprehensive homework assignments based on the following requirements:
         
         Curriculum: {request.curriculum}
@@ -29,6 +43,8 @@ async def generate_homework(request: HomeworkGeneratorRequest):
         Difficulty Level: {request.difficulty_level}
         Additional Requirements: {request.additional_requirements or 'None specified'}
         
+        {standards_context(request.curriculum, request.subject, request.grade, request.topic)}
+        
         Please create engaging homework that includes:
         1. Clear instructions and learning objectives
         2. Varied question types appropriate for {request.difficulty_level} level
@@ -46,52 +62,256 @@ async def generate_homework(request: HomeworkGeneratorRequest):
         
         Include a variety of question formats and ensure clear, student-friendly language.
         """
+
+
+register_warmup_target(
+    "homework_generator",
+    HomeworkGeneratorRequest,
+    build_homework_prompt,
+    get_homework_generator_agent,
+    output_budget=lambda request: homework_budget(request.difficulty_level)
+)
+
+
+@router.post("/generate", response_model=HomeworkGeneratorResponse)
+async def generate_homework(request: HomeworkGeneratorRequest):
+    """Generate homework based on curriculum, subject, grade, and topic"""
+    
+    try:
+        # Create system prompt for the agent
+        system_prompt = build_homework_prompt(request)
+        record_request("homework_generator", request)
         
         # Generate homework using the agent
-        response = agent.run(system_prompt)
-        
-        # Extract the content from the RunResponse object
-        if hasattr(response, 'content'):
-            generated_content = response.content
-        elif hasattr(response, 'text'):
-            generated_content = response.text
-        else:
-            generated_content = str(response)
-        
-        # Create response object
-        homework = HomeworkGeneratorResponse(
-            id=str(uuid.uuid4()),
-            curriculum=request.curriculum,
-            subject=request.subject,
-            grade=request.grade,
-            topic=request.topic,
-            difficulty_level=request.difficulty_level,
-            additional_requirements=request.additional_requirements,
-            generated_homework=generated_content,
-            created_at=datetime.utcnow(),
-            status="completed"
+        generated_content = await generate_content(
+            "homework_generator",
+            system_prompt,
+            get_homework_generator_agent,
+            output_budget=homework_budget(request.difficulty_level)
         )
         
-        return homework
+        # Store the artifact under its content-addressed id
+        homework = await _save_homework(request, generated_content)
+        
+        return ModelJSONResponse(homework, headers={"ETag": etag_for(homework.id)})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating homework: {str(e)}")
 
 
+@router.post("/batch")
+async def generate_homework_batch(batch: HomeworkBatchRequest, request: Request):
+    """Generate homework for many topics, streaming each result as NDJSON as soon as it is ready"""
+    
+    # Topics for the same curriculum, subject and grade share model calls
+    groups = _group_batch_items(batch.items, batch.topics_per_call)
+    semaphore = asyncio.Semaphore(batch.max_concurrency)
+    # The stream has no overall deadline; each model call gets the endpoint's deadline
+    # (or X-Request-Timeout) once it holds a concurrency slot
+    deadline = resolve_deadline(request.headers, "homework_generator")
+    
+    async def stream():
+        tasks = [asyncio.ensure_future(_generate_homework_group(group, semaphore, deadline)) for group in groups]
+        completed = failed = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for result in await finished:
+                    if result["status"] == "completed":
+                        completed += 1
+                    else:
+                        failed += 1
+                    yield json.dumps(result) + "\n"
+            yield json.dumps({"status": "done", "completed": completed, "failed": failed, "groups": len(groups)}) + "\n"
+        finally:
+            # Stop outstanding generations if the client goes away mid-stream
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+async def _save_homework(request: HomeworkGeneratorRequest, generated_content: str) -> HomeworkGeneratorResponse:
+    """Build and store the homework artifact for a request"""
+    homework = HomeworkGeneratorResponse(
+        id="",  # Replaced by the content hash when stored
+        curriculum=request.curriculum,
+        subject=request.subject,
+        grade=request.grade,
+        topic=request.topic,
+        difficulty_level=request.difficulty_level,
+        additional_requirements=request.additional_requirements,
+        generated_homework=generated_content,
+        created_at=datetime.utcnow(),
+        status="completed"
+    )
+    return await run_in_threadpool(get_artifact_store().save, "homework", homework)
+
+
+def _group_batch_items(items: List[HomeworkGeneratorRequest], topics_per_call: int) -> List[List[Tuple[int, HomeworkGeneratorRequest]]]:
+    """Group (index, item) pairs by curriculum, subject and grade, at most topics_per_call per group"""
+    by_context: Dict[tuple, List[Tuple[int, HomeworkGeneratorRequest]]] = {}
+    for index, item in enumerate(items):
+        key = tuple(value.strip().lower() for value in (item.curriculum, item.subject, item.grade))
+        by_context.setdefault(key, []).append((index, item))
+    
+    groups = []
+    for members in by_context.values():
+        for start in range(0, len(members), topics_per_call):
+            groups.append(members[start:start + topics_per_call])
+    return groups
+
+
+def build_homework_batch_prompt(items: List[HomeworkGeneratorRequest]) -> str:
+    """Build one agent prompt covering several topics for the same curriculum, subject and grade"""
+    first = items[0]
+    topics = "\n".join(
+        f"        {number}. {item.topic} (Difficulty Level: {item.difficulty_level}; "
+        f"Additional Requirements: {item.additional_requirements or 'None specified'})"
+        for number, item in enumerate(items, start=1)
+    )
+    return f"""
+        Generate comprehensive homework assignments for EACH of the following topics:
+        
+        Curriculum: {first.curriculum}
+        Subject: {first.subject}
+        Grade: {first.grade}
+        
+        Topics:
+{topics}
+        
+        {standards_context(first.curriculum, first.subject, first.grade, " ".join(item.topic for item in items))}
+        
+        For each topic, create engaging homework that includes:
+        1. Clear instructions and learning objectives
+        2. Varied question types appropriate for the topic's difficulty level
+        3. Practical applications and real-world connections
+        4. Appropriate time allocation for {first.grade} students
+        5. Answer key or solution guide for teachers
+        6. Extension activities for advanced students
+        7. Integration with {first.curriculum} standards
+        
+        Make the homework:
+        - Age-appropriate and engaging for {first.grade} students
+        - Challenging but achievable for each topic's difficulty level
+        - Practical and meaningful for student learning
+        
+        Include a variety of question formats and ensure clear, student-friendly language.
+        
+        Start each topic's homework with a marker line in exactly this format, and write
+        nothing before the first marker:
+        === TOPIC 1: <topic name> ===
+        """
+
+
+def _split_topic_sections(content: str, count: int) -> Dict[int, str]:
+    """Split a multi-topic response at its === TOPIC n === markers, keyed by topic number"""
+    sections: Dict[int, str] = {}
+    matches = list(TOPIC_MARKER.finditer(content))
+    for position, match in enumerate(matches):
+        number = int(match.group(1))
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(content)
+        section = content[match.end():end].strip()
+        if 1 <= number <= count and section and number not in sections:
+            sections[number] = section
+    return sections
+
+
+def _failed_result(index: int, item: HomeworkGeneratorRequest, error: Exception) -> dict:
+    detail = "deadline exceeded" if isinstance(error, asyncio.TimeoutError) else str(error)
+    return {"index": index, "topic": item.topic, "status": "failed", "error": f"Error generating homework: {detail}"}
+
+
+async def _generate_single_homework(index: int, item: HomeworkGeneratorRequest, semaphore: asyncio.Semaphore, deadline: float) -> dict:
+    """Generate and store homework for one batch item; never raises, a failure is its result"""
+    try:
+        async with saturation.slot(semaphore):
+            generated_content = await asyncio.wait_for(
+                generate_content(
+                    "homework_generator",
+                    build_homework_prompt(item),
+                    get_homework_generator_agent,
+                    output_budget=homework_budget(item.difficulty_level)
+                ),
+                timeout=deadline
+            )
+        return await _batch_result(index, item, generated_content)
+    except Exception as e:
+        return _failed_result(index, item, e)
+
+
+async def _generate_homework_group(
+    group: List[Tuple[int, HomeworkGeneratorRequest]],
+    semaphore: asyncio.Semaphore,
+    deadline: float
+) -> List[dict]:
+    """Generate homework for a group of compatible items; never raises, failures are per item
+
+    Every model call (the grouped one and each fallback) holds its own concurrency slot and
+    gets its own deadline.
+    """
+    if len(group) == 1:
+        batch_model_calls_total.inc(labels={"mode": "single"})
+        return [await _generate_single_homework(*group[0], semaphore, deadline)]
+    
+    batch_model_calls_total.inc(labels={"mode": "grouped"})
+    items = [item for _, item in group]
+    try:
+        async with saturation.slot(semaphore):
+            generated_content = await asyncio.wait_for(
+                generate_content(
+                    "homework_batch",
+                    build_homework_batch_prompt(items),
+                    get_homework_generator_agent,
+                    output_budget=homework_batch_budget(item.difficulty_level for item in items)
+                ),
+                timeout=deadline
+            )
+    except Exception as e:
+        return [_failed_result(index, item, e) for index, item in group]
+    
+    sections = _split_topic_sections(generated_content, len(group))
+    results = []
+    missing = []
+    for number, (index, item) in enumerate(group, start=1):
+        if number not in sections:
+            missing.append((index, item))
+            continue
+        try:
+            results.append(await _batch_result(index, item, sections[number]))
+        except Exception as e:
+            results.append(_failed_result(index, item, e))
+    
+    # Topics the model skipped or merged are generated on their own
+    if missing:
+        batch_model_calls_total.inc(len(missing), labels={"mode": "fallback"})
+        results.extend(await asyncio.gather(*(_generate_single_homework(index, item, semaphore, deadline) for index, item in missing)))
+    return results
+
+
+async def _batch_result(index: int, item: HomeworkGeneratorRequest, generated_content: str) -> dict:
+    homework = await _save_homework(item, generated_content)
+    return {"index": index, "topic": item.topic, "status": "completed", "homework": homework.model_dump(mode="json")}
+
+
 @router.get("/", response_model=HomeworkGeneratorListResponse)
-async def list_homework_assignments():
-    """List all generated homework assignments"""
-    # This would typically query a database
-    # For now, returning empty list
+async def list_homework_assignments(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """List all generated homework assignments, newest first"""
+    store = get_artifact_store()
     return HomeworkGeneratorListResponse(
-        homework_assignments=[],
-        total_count=0
+        homework_assignments=await run_in_threadpool(store.list, "homework", HomeworkGeneratorResponse, limit, offset),
+        total_count=await run_in_threadpool(store.count, "homework")
     )
 
 
 @router.get("/{homework_id}", response_model=HomeworkGeneratorResponse)
-async def get_homework(homework_id: str):
+async def get_homework(homework_id: str, request: Request):
     """Get a specific homework assignment by ID"""
-    # This would typically query a database
-    # For now, returning 404
-    raise HTTPException(status_code=404, detail="Homework assignment not found")
+    body = await run_in_threadpool(get_artifact_store().get_raw, "homework", homework_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Homework assignment not found")
+    
+    # Honors If-None-Match so clients can revalidate cached copies
+    return artifact_response(request, body, homework_id)
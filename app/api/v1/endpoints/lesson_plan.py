@@ -1,27 +1,85 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import uuid
+from fastapi import APIRouter, File, Form, HTTPException, Query, Request, UploadFile
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import List, Optional
 from datetime import datetime
 
-from app.schemas.lesson_plan.requests import LessonPlanRequest
+from app.api.selection import Selection, render_selected, stored_selection_response
+from app.schemas.lesson_plan.requests import LessonPlanRequest, MAX_CONTENT_LENGTH
 from app.schemas.lesson_plan.responses import LessonPlanResponse, LessonPlanListResponse
+from app.schemas.sections import SectionRegenerationRequest
 from app.services.agent import get_lesson_plan_agent
+from app.services.artifact_store import get_artifact_store
+from app.services.document_upload import extract_upload
+from app.services.generation import generate_content
+from app.services.long_content import condense_content
+from app.services.markdown_sections import find_section
+from app.services.output_budget import lesson_plan_budget
+from app.services.section_regeneration import regenerate_section
 
 router = APIRouter()
 
 
 @router.post("/generate", response_model=LessonPlanResponse)
 async def generate_lesson_plan(
-    request: LessonPlanRequest
+    request: LessonPlanRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return, e.g. id,generated_plan"),
+    sections: Optional[str] = Query(None, description="Comma-separated section numbers or keys to return, e.g. 1,homework-assignments")
 ):
     """Generate a detailed lesson plan based on syllabus content and preferences"""
     
     try:
-        # Create comprehensive system prompt for the agent
-        system_prompt = f"""
+        lesson_plan = await _generate_lesson_plan(request, "Curriculum-based syllabus")
+        return render_selected(lesson_plan, "generated_plan", Selection(fields, sections))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating lesson plan: {str(e)}")
+
+
+@router.post("/generate-from-file", response_model=LessonPlanResponse)
+async def generate_lesson_plan_from_file(
+    file: UploadFile = File(..., description="Syllabus document (PDF, DOCX or TXT)"),
+    number_of_classes: int = Form(1, ge=1, le=20),
+    class_duration: str = Form("45 minutes"),
+    teaching_style: str = Form("Interactive"),
+    homework_level: str = Form("Moderate"),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return, e.g. id,generated_plan"),
+    sections: Optional[str] = Query(None, description="Comma-separated section numbers or keys to return, e.g. 1,homework-assignments")
+):
+    """Generate a lesson plan from an uploaded syllabus document"""
+    
+    # Spool the upload to disk and extract its text (skipped for previously seen files)
+    document = await extract_upload(file, MAX_CONTENT_LENGTH)
+    try:
+        request = LessonPlanRequest(
+            syllabus_content=document.text,
+            number_of_classes=number_of_classes,
+            class_duration=class_duration,
+            teaching_style=teaching_style,
+            homework_level=homework_level
+        )
+    except ValidationError:
+        raise HTTPException(status_code=422, detail="The uploaded syllabus does not contain enough text")
+    
+    try:
+        lesson_plan = await _generate_lesson_plan(request, document.filename)
+        return render_selected(lesson_plan, "generated_plan", Selection(fields, sections))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating lesson plan: {str(e)}")
+
+
+async def _generate_lesson_plan(request: LessonPlanRequest, syllabus_filename: str) -> LessonPlanResponse:
+    """Generate and store a lesson plan for a request"""
+    
+    # Condense very long syllabus content into a digest before prompting
+    syllabus_content = await condense_content(request.syllabus_content, "syllabus")
+    
+    # Create comprehensive system prompt for the agent
+    system_prompt = f"""
         Generate a comprehensive and detailed lesson plan based on the following requirements:
         
-        Syllabus Content: {request.syllabus_content}
+        Syllabus Content: {syllabus_content}
         Number of Classes: {request.number_of_classes}
         Class Duration: {request.class_duration}
         Teaching Style: {request.teaching_style}
@@ -85,54 +143,87 @@ async def generate_lesson_plan(
         
         Format the response in a clear, structured manner that teachers can easily read and implement.
         """
-        
-        # Get agent when needed
-        agent = get_lesson_plan_agent()
-        
-        # Generate lesson plan using the agent
-        response = agent.run(system_prompt)
-        
-        # Extract the content from the RunResponse object
-        if hasattr(response, 'content'):
-            generated_content = response.content
-        elif hasattr(response, 'text'):
-            generated_content = response.text
-        else:
-            generated_content = str(response)
-        
-        # Create response object
-        lesson_plan = LessonPlanResponse(
-            id=str(uuid.uuid4()),
-            syllabus_filename="Curriculum-based syllabus",
-            number_of_classes=request.number_of_classes,
-            class_duration=request.class_duration,
-            teaching_style=request.teaching_style,
-            homework_level=request.homework_level,
-            generated_plan=generated_content,
-            created_at=datetime.utcnow(),
-            status="completed"
-        )
-        
-        return lesson_plan
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating lesson plan: {str(e)}")
+    
+    # Generate lesson plan using the agent
+    generated_content = await generate_content(
+        "lesson_plan",
+        system_prompt,
+        get_lesson_plan_agent,
+        output_budget=lesson_plan_budget(request.number_of_classes)
+    )
+    
+    # Create response object
+    lesson_plan = LessonPlanResponse(
+        id="",  # Replaced by the content hash when stored
+        syllabus_filename=syllabus_filename,
+        number_of_classes=request.number_of_classes,
+        class_duration=request.class_duration,
+        teaching_style=request.teaching_style,
+        homework_level=request.homework_level,
+        generated_plan=generated_content,
+        created_at=datetime.utcnow(),
+        status="completed"
+    )
+    
+    # Store the artifact under its content-addressed id
+    return await run_in_threadpool(get_artifact_store().save, "lesson_plan", lesson_plan)
 
 
 @router.get("/", response_model=LessonPlanListResponse)
-async def list_lesson_plans():
-    """List all generated lesson plans"""
-    # This would typically query a database
-    # For now, returning empty list
+async def list_lesson_plans(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """List all generated lesson plans, newest first"""
+    store = get_artifact_store()
     return LessonPlanListResponse(
-        plans=[],
-        total_count=0
+        plans=await run_in_threadpool(store.list, "lesson_plan", LessonPlanResponse, limit, offset),
+        total_count=await run_in_threadpool(store.count, "lesson_plan")
     )
 
 
 @router.get("/{plan_id}", response_model=LessonPlanResponse)
-async def get_lesson_plan(plan_id: str):
+async def get_lesson_plan(
+    plan_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return, e.g. id,generated_plan"),
+    sections: Optional[str] = Query(None, description="Comma-separated section numbers or keys to return, e.g. 1,homework-assignments")
+):
     """Get a specific lesson plan by ID"""
-    # This would typically query a database
-    # For now, returning 404
-    raise HTTPException(status_code=404, detail="Lesson plan not found")
+    body = await run_in_threadpool(get_artifact_store().get_raw, "lesson_plan", plan_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    
+    # Honors If-None-Match so clients can revalidate cached copies of each selection
+    return stored_selection_response(request, body, plan_id, LessonPlanResponse, "generated_plan", Selection(fields, sections))
+
+
+@router.post("/{plan_id}/sections/{section}/regenerate", response_model=LessonPlanResponse)
+async def regenerate_lesson_plan_section(
+    plan_id: str,
+    section: str,
+    request: Optional[SectionRegenerationRequest] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return, e.g. id,generated_plan"),
+    sections: Optional[str] = Query(None, description="Comma-separated section numbers or keys to return, e.g. 1,homework-assignments")
+):
+    """Regenerate one section of a lesson plan (by number or key), stored as a new plan"""
+    body = await run_in_threadpool(get_artifact_store().get_raw, "lesson_plan", plan_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    lesson_plan = LessonPlanResponse.model_validate_json(body)
+    if find_section(lesson_plan.generated_plan, section) is None:
+        raise HTTPException(status_code=404, detail=f"Section '{section}' not found in the lesson plan")
+    
+    try:
+        lesson_plan = await regenerate_section(
+            "lesson_plan",
+            lesson_plan,
+            "generated_plan",
+            section,
+            get_lesson_plan_agent,
+            request.instructions if request else None
+        )
+        return render_selected(lesson_plan, "generated_plan", Selection(fields, sections))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error regenerating lesson plan section: {str(e)}")
@@ -0,0 +1,52 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from app.schemas.search.responses import SearchResponse, SearchResult
+from app.services.artifact_store import get_artifact_store
+
+router = APIRouter()
+
+
+def _timestamp(day: Optional[date]) -> Optional[float]:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc).timestamp() if day else None
+
+
+@router.get("/", response_model=SearchResponse)
+async def search_artifacts(
+    q: str = Query("", max_length=500, description="Words to search for in generated content, topics and questions"),
+    kind: Optional[str] = Query(None, description="Comma-separated artifact kinds, e.g. homework,lesson_plan"),
+    curriculum: Optional[str] = Query(None),
+    subject: Optional[str] = Query(None),
+    grade: Optional[str] = Query(None),
+    created_from: Optional[date] = Query(None, description="First day to include (UTC)"),
+    created_to: Optional[date] = Query(None, description="Last day to include (UTC)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000)
+):
+    """Search generated artifacts, ranked by relevance, with metadata and date filters"""
+    kinds = [value.strip() for value in kind.split(",") if value.strip()] if kind else None
+    try:
+        # One more than asked for tells whether there is a next page
+        hits = await run_in_threadpool(
+            get_artifact_store().search,
+            q,
+            kinds,
+            curriculum,
+            subject,
+            grade,
+            _timestamp(created_from),
+            _timestamp(created_to + timedelta(days=1)) if created_to else None,
+            limit + 1,
+            offset
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching artifacts: {str(e)}")
+
+    results = [
+        SearchResult(**{**hit, "created_at": datetime.fromtimestamp(hit["created_at"], tz=timezone.utc)})
+        for hit in hits[:limit]
+    ]
+    return SearchResponse(results=results, next_offset=offset + limit if len(hits) > limit else None)
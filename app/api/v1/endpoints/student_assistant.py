@@ -1,25 +1,46 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import uuid
+import asyncio
+import inspect
+import json
+import time
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from datetime import datetime
 
+from app.core.config import settings
+from app.core.drain import drain_state
+from app.core.responses import ModelJSONResponse, artifact_response, etag_for
 from app.schemas.student_assistant.requests import StudentAssistantRequest
 from app.schemas.student_assistant.responses import StudentAssistantResponse, StudentAssistantListResponse
 from app.services.agent import get_student_assistant_agent
+from app.services.artifact_store import get_artifact_store
+from app.services.generation import generate_content
+from app.services.metrics import metrics
+from app.services.output_budget import apply_token_limit, assistant_budget
+from app.services.web_search import start_search_run
 
 router = APIRouter()
 
+tutoring_sessions_total = metrics.counter(
+    "student_ws_sessions_total",
+    "Live tutoring WebSocket connections, by result (accepted, rejected or failed)"
+)
+tutoring_answers_total = metrics.counter(
+    "student_ws_answers_total",
+    "Answers streamed over live tutoring connections, by result (completed, interrupted or failed)"
+)
+first_token_seconds = metrics.histogram(
+    "student_ws_first_token_seconds",
+    "Time from a live tutoring question to its first streamed token"
+)
 
-@router.post("/query", response_model=StudentAssistantResponse)
-async def query_student_assistant(request: StudentAssistantRequest):
-    """Get assistance from the student assistant"""
-    
-    try:
-        # Get agent when needed
-        agent = get_student_assistant_agent()
-        
-        # Create system prompt for the agent
-        system_prompt = f"""
+# Open live tutoring connections in this worker
+_open_sessions = 0
+
+
+def build_student_prompt(request: StudentAssistantRequest) -> str:
+    """Create system prompt for the agent"""
+    return f"""
         You are helping a student with the following context:
         
         Curriculum: {request.curriculum}
@@ -38,21 +59,30 @@ async def query_student_assistant(request: StudentAssistantRequest):
         
         Remember you are speaking to a student, so be patient, clear, and motivating.
         """
+
+
+def build_follow_up_prompt(request: StudentAssistantRequest) -> str:
+    """Prompt for a later question in a live tutoring conversation, whose context is in the history"""
+    return f"""
+        Student's follow-up question: {request.question}
         
-        # Get response from the student assistant agent
-        response = agent.run(system_prompt)
+        Keep helping the same {request.grade} {request.subject} student in the same patient, clear and encouraging way.
+        """
+
+
+@router.post("/query", response_model=StudentAssistantResponse)
+async def query_student_assistant(request: StudentAssistantRequest):
+    """Get assistance from the student assistant"""
+    
+    try:
+        system_prompt = build_student_prompt(request)
         
-        # Extract the content from the RunResponse object
-        if hasattr(response, 'content'):
-            generated_content = response.content
-        elif hasattr(response, 'text'):
-            generated_content = response.text
-        else:
-            generated_content = str(response)
+        # Get response from the student assistant agent
+        generated_content = await generate_content("student_assistant", system_prompt, get_student_assistant_agent, output_budget=assistant_budget())
         
         # Create response object
         student_response = StudentAssistantResponse(
-            id=str(uuid.uuid4()),
+            id="",  # Replaced by the content hash when stored
             curriculum=request.curriculum,
             subject=request.subject,
             grade=request.grade,
@@ -63,26 +93,175 @@ async def query_student_assistant(request: StudentAssistantRequest):
             status="completed"
         )
         
-        return student_response
+        # Store the artifact under its content-addressed id
+        student_response = await run_in_threadpool(get_artifact_store().save, "student_query", student_response)
+        
+        return ModelJSONResponse(student_response, headers={"ETag": etag_for(student_response.id)})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting student assistance: {str(e)}")
 
 
 @router.get("/", response_model=StudentAssistantListResponse)
-async def list_student_queries():
-    """List all student assistant queries"""
-    # This would typically query a database
-    # For now, returning empty list
+async def list_student_queries(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """List all student assistant queries, newest first"""
+    store = get_artifact_store()
     return StudentAssistantListResponse(
-        queries=[],
-        total_count=0
+        queries=await run_in_threadpool(store.list, "student_query", StudentAssistantResponse, limit, offset),
+        total_count=await run_in_threadpool(store.count, "student_query")
     )
 
 
 @router.get("/{query_id}", response_model=StudentAssistantResponse)
-async def get_student_query(query_id: str):
+async def get_student_query(query_id: str, request: Request):
     """Get a specific student query by ID"""
-    # This would typically query a database
-    # For now, returning 404
-    raise HTTPException(status_code=404, detail="Student query not found")
+    body = await run_in_threadpool(get_artifact_store().get_raw, "student_query", query_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Student query not found")
+    
+    # Honors If-None-Match so clients can revalidate cached copies
+    return artifact_response(request, body, query_id)
+
+
+async def _stream_answer(agent, request: StudentAssistantRequest, prompt: str, send):
+    """Stream one answer token by token, then store it; cancelling the task interrupts it"""
+    parts: List[str] = []
+    started = time.monotonic()
+    # The connection's agent is reused, but search limits apply to each answer
+    start_search_run(agent)
+    try:
+        stream = agent.arun(prompt, stream=True)
+        if inspect.isawaitable(stream):
+            stream = await stream
+        async for chunk in stream:
+            text = getattr(chunk, "content", None)
+            if not isinstance(text, str) or not text:
+                continue
+            if not parts:
+                first_token_seconds.observe(time.monotonic() - started)
+            parts.append(text)
+            await send({"type": "token", "text": text})
+    except asyncio.CancelledError:
+        tutoring_answers_total.inc(labels={"result": "interrupted"})
+        try:
+            await send({"type": "done", "id": None, "interrupted": True})
+        except Exception:
+            # The connection itself is gone
+            pass
+        return
+    except Exception as e:
+        tutoring_answers_total.inc(labels={"result": "failed"})
+        await send({"type": "error", "detail": f"Error getting student assistance: {str(e)}"})
+        return
+
+    student_response = await run_in_threadpool(get_artifact_store().save, "student_query", StudentAssistantResponse(
+        id="",  # Replaced by the content hash when stored
+        curriculum=request.curriculum,
+        subject=request.subject,
+        grade=request.grade,
+        question=request.question,
+        input_method=request.input_method,
+        answer="".join(parts),
+        created_at=datetime.utcnow(),
+        status="completed"
+    ))
+    tutoring_answers_total.inc(labels={"result": "completed"})
+    await send({"type": "done", "id": student_response.id, "interrupted": False})
+
+
+@router.websocket("/ws")
+async def student_assistant_ws(
+    websocket: WebSocket,
+    curriculum: str,
+    subject: str,
+    grade: str,
+    input_method: str = "text"
+):
+    """Live tutoring: one warm agent per connection, answers streamed token by token
+
+    Client messages: {"type": "ask", "question": "..."}, {"type": "interrupt"} and
+    {"type": "ping"}. Server messages: "ready", "token" (text), "done" (id of the stored
+    answer, interrupted), "error" (detail) and "pong". One answer runs at a time per
+    connection, and connections idle for STUDENT_WS_IDLE_TIMEOUT_SECONDS are closed.
+    """
+    global _open_sessions
+    await websocket.accept()
+    if drain_state.draining:
+        tutoring_sessions_total.inc(labels={"result": "rejected"})
+        await websocket.close(code=1012, reason="Server is restarting, please reconnect")
+        return
+    if _open_sessions >= settings.STUDENT_WS_MAX_CONNECTIONS:
+        tutoring_sessions_total.inc(labels={"result": "rejected"})
+        await websocket.close(code=1013, reason="Too many live tutoring sessions, try again later")
+        return
+
+    _open_sessions += 1
+    answer_task: Optional[asyncio.Task] = None
+    questions = 0
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_json(message)
+
+    try:
+        try:
+            # The agent keeps the conversation history, so follow-up questions carry no context
+            agent = get_student_assistant_agent(history_runs=settings.STUDENT_WS_HISTORY_RUNS)
+            apply_token_limit(agent, assistant_budget())
+        except Exception as e:
+            tutoring_sessions_total.inc(labels={"result": "failed"})
+            await send({"type": "error", "detail": f"Error starting tutoring session: {str(e)}"})
+            await websocket.close(code=1011, reason="Could not start the tutoring session")
+            return
+        tutoring_sessions_total.inc(labels={"result": "accepted"})
+        await send({"type": "ready"})
+        while True:
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), timeout=settings.STUDENT_WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                if answer_task is not None and not answer_task.done():
+                    continue
+                await websocket.close(code=1000, reason="Idle timeout")
+                return
+
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                message = None
+            kind = message.get("type") if isinstance(message, dict) else None
+            answering = answer_task is not None and not answer_task.done()
+
+            if kind == "ping":
+                await send({"type": "pong"})
+            elif kind == "interrupt":
+                if answering:
+                    answer_task.cancel()
+            elif kind == "ask":
+                question = str(message.get("question") or "").strip()
+                if not question:
+                    await send({"type": "error", "detail": "question is required"})
+                elif answering:
+                    await send({"type": "error", "detail": "An answer is already in progress, send interrupt first"})
+                else:
+                    request = StudentAssistantRequest(
+                        curriculum=curriculum,
+                        subject=subject,
+                        grade=grade,
+                        question=question,
+                        input_method=input_method
+                    )
+                    prompt = build_follow_up_prompt(request) if questions else build_student_prompt(request)
+                    questions += 1
+                    answer_task = asyncio.ensure_future(_stream_answer(agent, request, prompt, send))
+            else:
+                await send({"type": "error", "detail": "Unknown message, expected ask, interrupt or ping"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _open_sessions -= 1
+        if answer_task is not None and not answer_task.done():
+            answer_task.cancel()
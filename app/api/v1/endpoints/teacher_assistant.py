@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 from typing import List
-import uuid
 from datetime import datetime
 
+from app.core.responses import ModelJSONResponse, artifact_response, etag_for
 from app.schemas.teacher_assistant.requests import TeacherAssistantRequest
 from app.schemas.teacher_assistant.responses import TeacherAssistantResponse, TeacherAssistantListResponse
 from app.services.agent import get_teacher_assistant_agent
+from app.services.artifact_store import get_artifact_store
+from app.services.generation import generate_content
+from app.services.output_budget import assistant_budget
 
 router = APIRouter()
 
@@ -38,20 +42,11 @@ async def ask_teacher_assistant(request: TeacherAssistantRequest):
         """
         
         # Get response from the teacher assistant agent
-        agent = get_teacher_assistant_agent()
-        response = agent.run(system_prompt)
-        
-        # Extract the content from the RunResponse object
-        if hasattr(response, 'content'):
-            generated_content = response.content
-        elif hasattr(response, 'text'):
-            generated_content = response.text
-        else:
-            generated_content = str(response)
+        generated_content = await generate_content("teacher_assistant", system_prompt, get_teacher_assistant_agent, output_budget=assistant_budget())
         
         # Create response object
         teacher_response = TeacherAssistantResponse(
-            id=str(uuid.uuid4()),
+            id="",  # Replaced by the content hash when stored
             curriculum=request.curriculum,
             subject=request.subject,
             grade=request.grade,
@@ -62,26 +57,34 @@ async def ask_teacher_assistant(request: TeacherAssistantRequest):
             status="completed"
         )
         
-        return teacher_response
+        # Store the artifact under its content-addressed id
+        teacher_response = await run_in_threadpool(get_artifact_store().save, "teacher_query", teacher_response)
+        
+        return ModelJSONResponse(teacher_response, headers={"ETag": etag_for(teacher_response.id)})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting teacher assistance: {str(e)}")
 
 
 @router.get("/", response_model=TeacherAssistantListResponse)
-async def list_teacher_queries():
-    """List all teacher assistant queries"""
-    # This would typically query a database
-    # For now, returning empty list
+async def list_teacher_queries(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """List all teacher assistant queries, newest first"""
+    store = get_artifact_store()
     return TeacherAssistantListResponse(
-        queries=[],
-        total_count=0
+        queries=await run_in_threadpool(store.list, "teacher_query", TeacherAssistantResponse, limit, offset),
+        total_count=await run_in_threadpool(store.count, "teacher_query")
     )
 
 
 @router.get("/{query_id}", response_model=TeacherAssistantResponse)
-async def get_teacher_query(query_id: str):
+async def get_teacher_query(query_id: str, request: Request):
     """Get a specific teacher query by ID"""
-    # This would typically query a database
-    # For now, returning 404
-    raise HTTPException(status_code=404, detail="Teacher query not found")
+    body = await run_in_threadpool(get_artifact_store().get_raw, "teacher_query", query_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Teacher query not found")
+    
+    # Honors If-None-Match so clients can revalidate cached copies
+    return artifact_response(request, body, query_id)
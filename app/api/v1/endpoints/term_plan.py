@@ -1,25 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import uuid
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from datetime import datetime
 
+from app.api.selection import Selection, render_selected, stored_selection_response
 from app.schemas.term_plan.requests import TermPlanRequest
 from app.schemas.term_plan.responses import TermPlanResponse, TermPlanListResponse
+from app.schemas.sections import SectionRegenerationRequest
 from app.services.agent import get_term_plan_agent
+from app.services.artifact_store import get_artifact_store
+from app.services.curriculum_kb import standards_context
+from app.services.generation import generate_content
+from app.services.markdown_sections import find_section
+from app.services.output_budget import term_plan_budget
+from app.services.section_regeneration import regenerate_section
+from app.services.warmup import record_request, register_warmup_target
 
 router = APIRouter()
 
 
-@router.post("/generate", response_model=TermPlanResponse)
-async def generate_term_plan(request: TermPlanRequest):
-    """Generate a term plan based on curriculum, subject, and grade"""
-    
-    try:
-        # Get agent when needed
-        agent = get_term_plan_agent()
-        
-        # Create system prompt for the agent
-        system_prompt = f"""
+def build_term_plan_prompt(request: TermPlanRequest) -> str:
+    """Build the term plan agent prompt for a request"""
+    return f"""
         Generate a comprehensive term plan based on the following requirements:
         
         Curriculum: {request.curriculum}
@@ -27,6 +29,8 @@ async def generate_term_plan(request: TermPlanRequest):
         Grade: {request.grade}
         Additional Notes: {request.additional_notes or 'None provided'}
         
+        {standards_context(request.curriculum, request.subject, request.grade)}
+        
         Please create a detailed term plan that includes:
         1. Term overview and learning objectives
         2. Weekly breakdown of topics and concepts
@@ -38,21 +42,36 @@ async def generate_term_plan(request: TermPlanRequest):
         
         Make the plan comprehensive, well-structured, and aligned with educational best practices for {request.grade} {request.subject}.
         """
+
+
+register_warmup_target(
+    "term_plan",
+    TermPlanRequest,
+    build_term_plan_prompt,
+    get_term_plan_agent,
+    output_budget=lambda request: term_plan_budget()
+)
+
+
+@router.post("/generate", response_model=TermPlanResponse)
+async def generate_term_plan(
+    request: TermPlanRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return, e.g. id,generated_plan"),
+    sections: Optional[str] = Query(None, description="Comma-separated section numbers or keys to return, e.g. 1,homework-assignments")
+):
+    """Generate a term plan based on curriculum, subject, and grade"""
+    
+    try:
+        # Create system prompt for the agent
+        system_prompt = build_term_plan_prompt(request)
+        record_request("term_plan", request)
         
         # Generate term plan using the agent
-        response = agent.run(system_prompt)
-        
-        # Extract the content from the RunResponse object
-        if hasattr(response, 'content'):
-            generated_content = response.content
-        elif hasattr(response, 'text'):
-            generated_content = response.text
-        else:
-            generated_content = str(response)
+        generated_content = await generate_content("term_plan", system_prompt, get_term_plan_agent, output_budget=term_plan_budget())
         
         # Create response object
         term_plan = TermPlanResponse(
-            id=str(uuid.uuid4()),
+            id="",  # Replaced by the content hash when stored
             curriculum=request.curriculum,
             subject=request.subject,
             grade=request.grade,
@@ -62,26 +81,70 @@ async def generate_term_plan(request: TermPlanRequest):
             status="completed"
         )
         
-        return term_plan
+        # Store the artifact under its content-addressed id
+        term_plan = await run_in_threadpool(get_artifact_store().save, "term_plan", term_plan)
+        
+        return render_selected(term_plan, "generated_plan", Selection(fields, sections))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating term plan: {str(e)}")
 
 
 @router.get("/", response_model=TermPlanListResponse)
-async def list_term_plans():
-    """List all generated term plans"""
-    # This would typically query a database
-    # For now, returning empty list
+async def list_term_plans(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """List all generated term plans, newest first"""
+    store = get_artifact_store()
     return TermPlanListResponse(
-        plans=[],
-        total_count=0
+        plans=await run_in_threadpool(store.list, "term_plan", TermPlanResponse, limit, offset),
+        total_count=await run_in_threadpool(store.count, "term_plan")
     )
 
 
 @router.get("/{plan_id}", response_model=TermPlanResponse)
-async def get_term_plan(plan_id: str):
+async def get_term_plan(
+    plan_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return, e.g. id,generated_plan"),
+    sections: Optional[str] = Query(None, description="Comma-separated section numbers or keys to return, e.g. 1,homework-assignments")
+):
     """Get a specific term plan by ID"""
-    # This would typically query a database
-    # For now, returning 404
-    raise HTTPException(status_code=404, detail="Term plan not found")
+    body = await run_in_threadpool(get_artifact_store().get_raw, "term_plan", plan_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Term plan not found")
+    
+    # Honors If-None-Match so clients can revalidate cached copies of each selection
+    return stored_selection_response(request, body, plan_id, TermPlanResponse, "generated_plan", Selection(fields, sections))
+
+
+@router.post("/{plan_id}/sections/{section}/regenerate", response_model=TermPlanResponse)
+async def regenerate_term_plan_section(
+    plan_id: str,
+    section: str,
+    request: Optional[SectionRegenerationRequest] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return, e.g. id,generated_plan"),
+    sections: Optional[str] = Query(None, description="Comma-separated section numbers or keys to return, e.g. 1,weekly-breakdown")
+):
+    """Regenerate one section of a term plan (by number or key), stored as a new plan"""
+    body = await run_in_threadpool(get_artifact_store().get_raw, "term_plan", plan_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Term plan not found")
+    term_plan = TermPlanResponse.model_validate_json(body)
+    if find_section(term_plan.generated_plan, section) is None:
+        raise HTTPException(status_code=404, detail=f"Section '{section}' not found in the term plan")
+    
+    try:
+        term_plan = await regenerate_section(
+            "term_plan",
+            term_plan,
+            "generated_plan",
+            section,
+            get_term_plan_agent,
+            request.instructions if request else None
+        )
+        return render_selected(term_plan, "generated_plan", Selection(fields, sections))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error regenerating term plan section: {str(e)}")
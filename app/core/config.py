@@ -24,6 +24,116 @@ class Settings:
     # CORS Configuration
     BACKEND_CORS_ORIGINS: list = ["*"]  # Configure properly for production
     
+    # Worker Configuration ("auto" derives the count from cores and concurrency)
+    WORKERS: str = os.getenv("WORKERS", "auto")
+    TARGET_CONCURRENCY: int = int(os.getenv("TARGET_CONCURRENCY", "32"))
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "8"))
+    
+    # Process-shared store used by the response cache, coalescing and rate limits
+    SHARED_STORE_PATH: str = os.getenv("SHARED_STORE_PATH", "data/shared_store.sqlite3")
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "21600"))
+    COALESCE_LEASE_SECONDS: int = int(os.getenv("COALESCE_LEASE_SECONDS", "180"))
+    SHARED_STORE_PURGE_INTERVAL_SECONDS: float = float(os.getenv("SHARED_STORE_PURGE_INTERVAL_SECONDS", "300"))
+    
+    # Content-addressed storage of generated artifacts
+    ARTIFACT_STORE_PATH: str = os.getenv("ARTIFACT_STORE_PATH", "data/artifacts.sqlite3")
+    # zstd (falls back to zlib without the zstandard package), zlib or off
+    ARTIFACT_COMPRESSION: str = os.getenv("ARTIFACT_COMPRESSION", "zstd").lower()
+    ARTIFACT_COMPRESSION_LEVEL: int = int(os.getenv("ARTIFACT_COMPRESSION_LEVEL", "9"))
+    ARTIFACT_DICTIONARY_BYTES: int = int(os.getenv("ARTIFACT_DICTIONARY_BYTES", "65536"))
+    ARTIFACT_DICTIONARY_MIN_SAMPLES: int = int(os.getenv("ARTIFACT_DICTIONARY_MIN_SAMPLES", "50"))
+    # Most recent matches ranked per search, which bounds search latency on large stores
+    ARTIFACT_SEARCH_CANDIDATES: int = int(os.getenv("ARTIFACT_SEARCH_CANDIDATES", "2000"))
+    
+    # Event-loop monitoring (LOOP_BLOCK_DEBUG logs the stack of callbacks blocking the loop)
+    LOOP_MONITOR_INTERVAL_SECONDS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.5"))
+    LOOP_BLOCK_DEBUG: bool = os.getenv("LOOP_BLOCK_DEBUG", "false").lower() == "true"
+    LOOP_BLOCK_THRESHOLD_MS: int = int(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+    
+    # Long syllabus / text content is condensed chunk by chunk before prompting
+    LONG_CONTENT_THRESHOLD_CHARS: int = int(os.getenv("LONG_CONTENT_THRESHOLD_CHARS", "12000"))
+    CONTENT_CHUNK_CHARS: int = int(os.getenv("CONTENT_CHUNK_CHARS", "6000"))
+    CONTENT_DIGEST_CONCURRENCY: int = int(os.getenv("CONTENT_DIGEST_CONCURRENCY", "4"))
+    CHUNK_SUMMARY_TTL_SECONDS: int = int(os.getenv("CHUNK_SUMMARY_TTL_SECONDS", "604800"))
+    
+    # Document uploads (spooled to disk, extracted text cached by content hash)
+    UPLOAD_SPOOL_DIR: str = os.getenv("UPLOAD_SPOOL_DIR", "data/uploads")
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+    DOCUMENT_TEXT_TTL_SECONDS: int = int(os.getenv("DOCUMENT_TEXT_TTL_SECONDS", "604800"))
+    
+    # Local curriculum knowledge base (built with python -m app.services.curriculum_kb build)
+    CURRICULUM_INDEX_PATH: str = os.getenv("CURRICULUM_INDEX_PATH", "data/curriculum_index.json")
+    CURRICULUM_CONTEXT_PASSAGES: int = int(os.getenv("CURRICULUM_CONTEXT_PASSAGES", "4"))
+    
+    # Cache warming of popular requests in an off-peak window (hours in UTC)
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "false").lower() == "true"
+    WARMUP_WINDOW_START_HOUR: int = int(os.getenv("WARMUP_WINDOW_START_HOUR", "1"))
+    WARMUP_WINDOW_END_HOUR: int = int(os.getenv("WARMUP_WINDOW_END_HOUR", "5"))
+    WARMUP_TOP_N: int = int(os.getenv("WARMUP_TOP_N", "10"))
+    WARMUP_HISTORY_DAYS: int = int(os.getenv("WARMUP_HISTORY_DAYS", "28"))
+    WARMUP_MAX_CALLS: int = int(os.getenv("WARMUP_MAX_CALLS", "20"))
+    WARMUP_CACHE_TTL_SECONDS: int = int(os.getenv("WARMUP_CACHE_TTL_SECONDS", "43200"))
+    
+    # Per-endpoint model configuration, reloadable at runtime (SIGHUP or the admin endpoint)
+    MODEL_CONFIG_PATH: str = os.getenv("MODEL_CONFIG_PATH", "config/models.json")
+    
+    # End-to-end deadline for generation requests (X-Request-Timeout header, capped)
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+    MAX_REQUEST_DEADLINE_SECONDS: float = float(os.getenv("MAX_REQUEST_DEADLINE_SECONDS", "600"))
+    
+    # Output token budgets derived from request parameters (scaled, plus room for thinking)
+    OUTPUT_BUDGET_SCALE: float = float(os.getenv("OUTPUT_BUDGET_SCALE", "1.0"))
+    OUTPUT_THINKING_ALLOWANCE: int = int(os.getenv("OUTPUT_THINKING_ALLOWANCE", "2048"))
+    
+    # Model-side caching of static prompt prefixes (gemini, local stand-in, or off)
+    CONTEXT_CACHE_BACKEND: str = os.getenv("CONTEXT_CACHE_BACKEND", "gemini")
+    CONTEXT_CACHE_TTL_SECONDS: int = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+    CONTEXT_CACHE_MIN_TOKENS: int = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+    
+    # Stored per-question evaluations, reused when a resubmission leaves an answer unchanged
+    QUESTION_EVAL_TTL_SECONDS: int = int(os.getenv("QUESTION_EVAL_TTL_SECONDS", "2592000"))
+    EVAL_QUESTION_CONCURRENCY: int = int(os.getenv("EVAL_QUESTION_CONCURRENCY", "8"))
+    
+    # Responses stored for Idempotency-Key replays of generation requests
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_RESPONSE_BYTES: int = int(os.getenv("IDEMPOTENCY_MAX_RESPONSE_BYTES", str(2 * 1024 * 1024)))
+    # Beyond either limit the records closest to expiry are evicted
+    IDEMPOTENCY_MAX_RECORDS: int = int(os.getenv("IDEMPOTENCY_MAX_RECORDS", "10000"))
+    IDEMPOTENCY_MAX_STORED_BYTES: int = int(os.getenv("IDEMPOTENCY_MAX_STORED_BYTES", str(256 * 1024 * 1024)))
+    
+    # Live tutoring WebSocket (/student-assistant/ws)
+    STUDENT_WS_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("STUDENT_WS_IDLE_TIMEOUT_SECONDS", "300"))
+    STUDENT_WS_HISTORY_RUNS: int = int(os.getenv("STUDENT_WS_HISTORY_RUNS", "5"))
+    STUDENT_WS_MAX_CONNECTIONS: int = int(os.getenv("STUDENT_WS_MAX_CONNECTIONS", "200"))
+    
+    # Saturation signals served by /ready (READY_MAX_LOAD_FACTOR 0 never reports not ready on load)
+    SATURATION_WINDOW_SECONDS: float = float(os.getenv("SATURATION_WINDOW_SECONDS", "60"))
+    SATURATION_PUBLISH_INTERVAL_SECONDS: float = float(os.getenv("SATURATION_PUBLISH_INTERVAL_SECONDS", "2"))
+    READY_MAX_LOAD_FACTOR: float = float(os.getenv("READY_MAX_LOAD_FACTOR", "0"))
+    
+    # Graceful drain on SIGTERM, then SHUTDOWN_GRACE_SECONDS for whatever is still running
+    DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "90"))
+    SHUTDOWN_GRACE_SECONDS: int = int(os.getenv("SHUTDOWN_GRACE_SECONDS", "5"))
+    
+    # Web search tool of the assistant and planning agents (queries per call run in parallel,
+    # at most WEB_SEARCH_MAX_CONCURRENT at a time per worker; searches and total search time
+    # are capped per agent run)
+    WEB_SEARCH_BACKEND: str = os.getenv("WEB_SEARCH_BACKEND", "duckduckgo")
+    WEB_SEARCH_MAX_RESULTS: int = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "5"))
+    WEB_SEARCH_TIMEOUT_SECONDS: float = float(os.getenv("WEB_SEARCH_TIMEOUT_SECONDS", "8"))
+    WEB_SEARCH_MAX_SEARCHES_PER_RUN: int = int(os.getenv("WEB_SEARCH_MAX_SEARCHES_PER_RUN", "6"))
+    WEB_SEARCH_RUN_BUDGET_SECONDS: float = float(os.getenv("WEB_SEARCH_RUN_BUDGET_SECONDS", "20"))
+    WEB_SEARCH_MAX_CONCURRENT: int = int(os.getenv("WEB_SEARCH_MAX_CONCURRENT", "20"))
+    
+    # Admin endpoints are disabled unless a token is configured
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    
+    # Rate Limiting (0 disables it). Clients are identified by their address; X-Forwarded-For
+    # is only read from the TRUSTED_PROXIES addresses ("*" trusts any peer, only behind a proxy)
+    RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "0"))
+    TRUSTED_PROXIES: list = [proxy.strip() for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()]
+    
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.model_config import get_model_config
+from app.services.metrics import metrics
+from app.services.saturation import saturation
+
+# Generation routes and the endpoint whose configuration provides their default deadline
+ENDPOINT_PREFIXES = (
+    ("/api/v1/lesson-plan/", "lesson_plan"),
+    ("/api/v1/term-plan/", "term_plan"),
+    ("/api/v1/assessment/", "assessment"),
+    ("/api/v1/assessment-eval/", "assessment_eval"),
+    ("/api/v1/student-assistant/", "student_assistant"),
+    ("/api/v1/teacher-assistant/", "teacher_assistant"),
+    ("/api/v1/homework-generator/", "homework_generator")
+)
+
+# Streaming routes that run for as long as their work takes; they apply deadlines per unit
+# of work instead (the batch applies one per group of topics)
+UNBOUNDED_PATHS = ("/api/v1/homework-generator/batch",)
+
+DEADLINE_HEADER = "x-request-timeout"
+
+requests_cancelled_total = metrics.counter(
+    "requests_cancelled_total",
+    "Generation requests cancelled before completion, by endpoint and reason (disconnect or deadline)"
+)
+
+
+def endpoint_for_path(path: str) -> Optional[str]:
+    for prefix, endpoint in ENDPOINT_PREFIXES:
+        if path.startswith(prefix):
+            return endpoint
+    return None
+
+
+def resolve_deadline(headers: Headers, endpoint: str) -> float:
+    """Deadline in seconds from the X-Request-Timeout header, else the endpoint default
+
+    Client-supplied deadlines are capped at MAX_REQUEST_DEADLINE_SECONDS.
+    """
+    default = get_model_config(endpoint).deadline_seconds or settings.REQUEST_DEADLINE_SECONDS
+    try:
+        requested = float(headers.get(DEADLINE_HEADER, ""))
+    except ValueError:
+        return default
+    if requested <= 0:
+        return default
+    return min(requested, settings.MAX_REQUEST_DEADLINE_SECONDS)
+
+
+class RequestDeadlineMiddleware:
+    """Cancel generation requests when the client disconnects or their deadline passes
+
+    The handler runs as a task. Once the request body has been read, a watcher keeps
+    listening for the client's disconnect and cancels the task when it arrives; a timer
+    cancels it at the deadline and answers 504 if no response was started yet. The
+    cancellation propagates into generate_content, which stops the upstream model call
+    when no other request is waiting for the same result.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        endpoint = endpoint_for_path(scope.get("path", "")) if scope["type"] == "http" else None
+        if endpoint is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "").rstrip("/")
+        deadline = None if path in UNBOUNDED_PATHS else resolve_deadline(Headers(scope=scope), endpoint)
+        disconnected = asyncio.Event()
+        state = {"body_done": False, "response_started": False, "response_done": False, "reason": None}
+        watcher: Optional[asyncio.Task] = None
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    cancel("disconnect")
+                    return
+
+        async def wrapped_receive() -> Message:
+            nonlocal watcher
+            if state["body_done"]:
+                # Only the watcher reads from the server once the body is complete
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                state["body_done"] = True
+                watcher = asyncio.ensure_future(watch_disconnect())
+            return message
+
+        async def wrapped_send(message: Message):
+            if message["type"] == "http.response.start":
+                state["response_started"] = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                state["response_done"] = True
+            await send(message)
+
+        async def serve():
+            with saturation.request():
+                await self.app(scope, wrapped_receive, wrapped_send)
+
+        task = asyncio.ensure_future(serve())
+
+        def cancel(reason: str):
+            # A completed response only has its handler left to return, nothing to save
+            if not task.done() and state["reason"] is None and not state["response_done"]:
+                state["reason"] = reason
+                task.cancel()
+
+        timer = asyncio.get_running_loop().call_later(deadline, cancel, "deadline") if deadline is not None else None
+        try:
+            await asyncio.wait({task})
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if watcher is not None:
+                watcher.cancel()
+            if not task.done():
+                # The server itself is cancelling this request
+                task.cancel()
+
+        if not task.cancelled():
+            task.result()
+            return
+
+        requests_cancelled_total.inc(labels={"endpoint": endpoint, "reason": state["reason"] or "unknown"})
+        if state["reason"] != "deadline" or state["response_done"]:
+            return
+        if state["response_started"]:
+            # End a streaming response cleanly with what was sent so far
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            body = json.dumps({"detail": f"Request exceeded its {deadline:g} s deadline"}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))]
+            })
+            await send({"type": "http.response.body", "body": body})
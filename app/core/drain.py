@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.deadlines import endpoint_for_path
+from app.services.metrics import metrics
+from app.services.saturation import saturation
+
+logger = logging.getLogger("app.drain")
+
+drain_rejected_total = metrics.counter(
+    "drain_rejected_requests_total",
+    "Generation requests refused with 503 because the worker was draining, by endpoint"
+)
+
+
+class DrainState:
+    """Whether this worker is draining before shutdown"""
+
+    def __init__(self):
+        self.draining = False
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        if not self.draining:
+            self.draining = True
+            self.started_at = time.monotonic()
+
+    def busy(self) -> bool:
+        return bool(saturation.requests or saturation.upstream or saturation.queued)
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no generation work is left, up to timeout seconds; True when idle"""
+        deadline = time.monotonic() + timeout
+        while self.busy():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+
+drain_state = DrainState()
+
+
+class DrainMiddleware:
+    """Refuse new generation requests with 503 while the worker drains
+
+    Requests already running are not affected; stored Idempotency-Key responses are still
+    replayed by the middleware in front of this one.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        endpoint = endpoint_for_path(scope.get("path", "")) if scope["type"] == "http" else None
+        if not drain_state.draining or endpoint is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        drain_rejected_total.inc(labels={"endpoint": endpoint})
+        body = json.dumps({"detail": "Server is restarting, please retry"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", b"1"),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def _drain_then_exit(loop: asyncio.AbstractEventLoop, previous_handler):
+    logger.info("Draining: waiting up to %g s for in-flight generations", settings.DRAIN_TIMEOUT_SECONDS)
+    if await drain_state.wait_idle(settings.DRAIN_TIMEOUT_SECONDS):
+        logger.info("Drained in %.1f s", time.monotonic() - drain_state.started_at)
+    else:
+        logger.warning(
+            "Drain timeout reached with %d requests and %d model calls still running",
+            saturation.requests,
+            saturation.upstream
+        )
+    # Hand the signal to the server's own handler to shut down
+    loop.remove_signal_handler(signal.SIGTERM)
+    signal.signal(signal.SIGTERM, previous_handler)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def install_drain_signal_handler(loop: asyncio.AbstractEventLoop):
+    """Drain on SIGTERM before the server shuts down, where the platform supports it
+
+    The first SIGTERM flips /ready to not ready and refuses new generation requests, then
+    waits up to DRAIN_TIMEOUT_SECONDS for running generations, whose results land in the
+    response cache, the artifact store and the idempotency records for retrying clients.
+    The signal is then passed on to the handler that was installed before (uvicorn's).
+    """
+    if settings.DRAIN_TIMEOUT_SECONDS <= 0:
+        return
+    previous_handler = signal.getsignal(signal.SIGTERM)
+    if previous_handler is None:
+        # Installed outside Python, nothing to hand the signal back to
+        return
+
+    def on_sigterm():
+        if drain_state.draining:
+            return
+        drain_state.start()
+        loop.create_task(_drain_then_exit(loop, previous_handler))
+
+    try:
+        loop.add_signal_handler(signal.SIGTERM, on_sigterm)
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+        # No SIGTERM handling on this platform, or not running in the main thread
+        pass
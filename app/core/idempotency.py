@@ -0,0 +1,184 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import uuid
+from typing import Dict, List
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.deadlines import endpoint_for_path
+from app.services.metrics import metrics
+from app.services.shared_store import get_shared_store
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+STORE_NAMESPACE = "idempotency"
+
+# Identifies this process as a lease owner in the shared store
+_WORKER_ID = f"idempotency-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+idempotency_requests_total = metrics.counter(
+    "idempotency_requests_total",
+    "Generation requests with an Idempotency-Key, by endpoint and result (new, replayed, waited or conflict)"
+)
+
+# Requests running in this process, keyed by their record key
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _json_response(status: int, detail: str) -> List[Message]:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    return [
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))]
+        },
+        {"type": "http.response.body", "body": body}
+    ]
+
+
+def _store_record(record_key: str, record: bytes):
+    """Store a response record, evicting expired and then the oldest records beyond the limits"""
+    store = get_shared_store()
+    store.set(STORE_NAMESPACE, record_key, record, ttl=settings.IDEMPOTENCY_TTL_SECONDS)
+    store.trim(STORE_NAMESPACE, settings.IDEMPOTENCY_MAX_RECORDS, settings.IDEMPOTENCY_MAX_STORED_BYTES)
+
+
+class IdempotencyMiddleware:
+    """Honor Idempotency-Key on POST generation requests
+
+    The first request with a key runs; duplicates arriving while it runs (in any worker)
+    wait for it, and duplicates within IDEMPOTENCY_TTL_SECONDS get its stored response
+    back without a new model call. Reusing a key for a different request body or query
+    string is a 422.
+    Only successful responses up to IDEMPOTENCY_MAX_RESPONSE_BYTES are stored; after an
+    error the next request with the key runs again. The stored records are capped at
+    IDEMPOTENCY_MAX_RECORDS and IDEMPOTENCY_MAX_STORED_BYTES, evicting the oldest first.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        endpoint = endpoint_for_path(scope.get("path", "")) if scope["type"] == "http" else None
+        idempotency_key = Headers(scope=scope).get(IDEMPOTENCY_HEADER) if endpoint else None
+        if not idempotency_key or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        # Read the whole body up front: it identifies the request and is replayed to the app
+        body_messages: List[Message] = []
+        digest = hashlib.sha256()
+        # The query string selects the representation (?fields=, ?sections=, ?include_input=),
+        # so a retry asking for a different one is a different request
+        digest.update(scope.get("query_string", b"") + b"\n")
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body_messages.append(message)
+            digest.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        fingerprint = digest.hexdigest()
+        record_key = hashlib.sha256(f"{scope['path']}\n{idempotency_key}".encode("utf-8")).hexdigest()
+        labels = {"endpoint": endpoint}
+
+        async def replay_receive() -> Message:
+            if body_messages:
+                return body_messages.pop(0)
+            return await receive()
+
+        store = get_shared_store()
+        lease_name = f"{STORE_NAMESPACE}:{record_key}"
+        waited = False
+        while True:
+            record = await run_in_threadpool(store.get, STORE_NAMESPACE, record_key)
+            if record is not None:
+                await self._replay(json.loads(record), fingerprint, send, labels, waited)
+                return
+
+            inflight = _inflight.get(record_key)
+            if inflight is not None:
+                # A duplicate in this process is running: wait for it, then replay its result
+                waited = True
+                await asyncio.shield(inflight)
+                continue
+
+            # Claim the key in this process before awaiting the lease, so duplicates arriving
+            # meanwhile wait on the future instead of sharing this worker's lease
+            future = asyncio.get_running_loop().create_future()
+            _inflight[record_key] = future
+            acquired = False
+            try:
+                acquired = await run_in_threadpool(store.acquire_lease, lease_name, _WORKER_ID, settings.MAX_REQUEST_DEADLINE_SECONDS + 30)
+            finally:
+                if not acquired:
+                    _inflight.pop(record_key, None)
+                    future.set_result(None)
+            if acquired:
+                break
+            # Another worker runs the first request with this key
+            waited = True
+            await asyncio.sleep(0.25)
+
+        try:
+            record = await run_in_threadpool(store.get, STORE_NAMESPACE, record_key)
+            if record is not None:
+                # Stored by another worker between our last look and the lease
+                await self._replay(json.loads(record), fingerprint, send, labels, waited)
+                return
+            idempotency_requests_total.inc(labels={**labels, "result": "new"})
+            await self._run_and_store(scope, replay_receive, send, record_key, fingerprint)
+        finally:
+            await run_in_threadpool(store.release_lease, lease_name, _WORKER_ID)
+            _inflight.pop(record_key, None)
+            future.set_result(None)
+
+    async def _run_and_store(self, scope: Scope, receive: Receive, send: Send, record_key: str, fingerprint: str):
+        response: dict = {"status": None, "headers": [], "body": b""}
+        storable = True
+
+        async def capture_send(message: Message):
+            nonlocal storable
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body" and storable:
+                response["body"] += message.get("body", b"")
+                if len(response["body"]) > settings.IDEMPOTENCY_MAX_RESPONSE_BYTES:
+                    storable = False
+                    response["body"] = b""
+            await send(message)
+
+        await self.app(scope, receive, capture_send)
+
+        if storable and response["status"] is not None and 200 <= response["status"] < 300:
+            record = {
+                "fingerprint": fingerprint,
+                "status": response["status"],
+                "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in response["headers"]],
+                "body": base64.b64encode(response["body"]).decode("ascii")
+            }
+            await run_in_threadpool(_store_record, record_key, json.dumps(record).encode("utf-8"))
+
+    async def _replay(self, record: dict, fingerprint: str, send: Send, labels: Dict[str, str], waited: bool):
+        if record["fingerprint"] != fingerprint:
+            idempotency_requests_total.inc(labels={**labels, "result": "conflict"})
+            messages = _json_response(422, "Idempotency-Key was already used for a different request")
+        else:
+            idempotency_requests_total.inc(labels={**labels, "result": "waited" if waited else "replayed"})
+            headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+            messages = [
+                {"type": "http.response.start", "status": record["status"], "headers": headers + [(REPLAYED_HEADER, b"true")]},
+                {"type": "http.response.body", "body": base64.b64decode(record["body"])}
+            ]
+        for message in messages:
+            await send(message)
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.services.metrics import metrics
+
+logger = logging.getLogger("app.loop_monitor")
+
+loop_lag_seconds = metrics.histogram(
+    "event_loop_lag_seconds",
+    "Delay between when a periodic event-loop callback was due and when it ran",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+loop_blocked_total = metrics.counter(
+    "event_loop_blocked_total",
+    "Number of times the event loop was blocked longer than the configured threshold"
+)
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag and, in debug mode, reports callbacks that block the loop
+
+    The sampler sleeps for a fixed interval and records how late it wakes up. The blocking
+    detector runs a watchdog thread that notices when the loop stops ticking for longer than
+    the threshold and logs the stack the loop thread is stuck in.
+    """
+
+    def __init__(self, interval: float = 0.5, block_threshold: float = 0.1, debug: bool = False):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.debug = debug
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._task = self._loop.create_task(self._sample())
+        if self.debug:
+            self._heartbeat = time.monotonic()
+            self._loop.call_soon(self._beat)
+            self._watchdog = threading.Thread(target=self._watch, name="loop-block-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            loop_lag_seconds.observe(max(0.0, loop.time() - expected))
+
+    def _beat(self):
+        """Loop-side heartbeat, rescheduled continuously while debug mode is on"""
+        self._heartbeat = time.monotonic()
+        if not self._stopping.is_set():
+            self._loop.call_later(self.block_threshold / 4, self._beat)
+
+    def _watch(self):
+        """Watchdog thread: log the loop thread's stack whenever the heartbeat stalls"""
+        reported_heartbeat = None
+        while not self._stopping.wait(self.block_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat
+            if stalled_for < self.block_threshold or heartbeat == reported_heartbeat:
+                continue
+
+            # Report each stall once, with the frame the loop thread is currently executing
+            reported_heartbeat = heartbeat
+            loop_blocked_total.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>\n"
+            logger.warning(
+                "Event loop blocked for more than %.0f ms (%.0f ms so far). Loop thread stack:\n%s",
+                self.block_threshold * 1000,
+                stalled_for * 1000,
+                stack
+            )
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.model_config")
+
+# Endpoints whose agents read their model settings from the configuration file
+ENDPOINTS = (
+    "lesson_plan",
+    "term_plan",
+    "assessment",
+    "assessment_eval",
+    "student_assistant",
+    "teacher_assistant",
+    "homework_generator",
+    "content_digest",
+    "json_repair"
+)
+
+# How often a worker checks whether another worker reloaded the configuration
+SHARED_CHECK_INTERVAL_SECONDS = 1.0
+
+
+class ModelConfigError(Exception):
+    """Raised when the model configuration file cannot be read or is invalid"""
+
+
+class EndpointModelConfig(BaseModel):
+    """Model settings for one endpoint's agent"""
+
+    model_config = ConfigDict(extra="forbid", frozen=True, protected_namespaces=())
+
+    model_id: str = Field("gemini-2.5-flash", min_length=1)
+    temperature: Optional[float] = Field(None, ge=0, le=2)
+    top_p: Optional[float] = Field(None, gt=0, le=1)
+    max_output_tokens: Optional[int] = Field(None, ge=1)
+    thinking_budget: Optional[int] = Field(None, ge=0)
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    deadline_seconds: Optional[float] = Field(None, gt=0)
+    retries: Optional[int] = Field(None, ge=0, le=5)
+    tools_enabled: bool = True
+    show_tool_calls: bool = True
+    markdown: bool = True
+
+
+class ModelConfigFile(BaseModel):
+    """Schema of the model configuration file: defaults plus per-endpoint overrides"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    defaults: Dict[str, object] = Field(default_factory=dict)
+    endpoints: Dict[str, Dict[str, object]] = Field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ModelConfigSnapshot:
+    """Validated configuration for every endpoint; replaced as a whole on reload"""
+    version: str
+    loaded_at: float
+    source: Optional[str]
+    endpoints: Dict[str, EndpointModelConfig] = field(default_factory=dict)
+
+    def for_endpoint(self, endpoint: str) -> EndpointModelConfig:
+        return self.endpoints.get(endpoint) or EndpointModelConfig()
+
+
+def parse_model_config(raw: dict, source: Optional[str] = None) -> ModelConfigSnapshot:
+    """Validate a configuration document and resolve the settings of every endpoint"""
+    try:
+        document = ModelConfigFile.model_validate(raw)
+        unknown = sorted(set(document.endpoints) - set(ENDPOINTS))
+        if unknown:
+            raise ModelConfigError(f"Unknown endpoints in model configuration: {', '.join(unknown)}")
+        defaults = EndpointModelConfig.model_validate(document.defaults)
+        endpoints = {
+            endpoint: EndpointModelConfig.model_validate({
+                **defaults.model_dump(exclude_unset=True),
+                **document.endpoints.get(endpoint, {})
+            })
+            for endpoint in ENDPOINTS
+        }
+    except ValidationError as e:
+        raise ModelConfigError(f"Invalid model configuration: {e}") from e
+
+    canonical = json.dumps(raw, sort_keys=True, separators=(",", ":"))
+    return ModelConfigSnapshot(
+        version=hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12],
+        loaded_at=time.time(),
+        source=source,
+        endpoints=endpoints
+    )
+
+
+def load_model_config_file(path: str) -> ModelConfigSnapshot:
+    """Load and validate the configuration file; a missing file means built-in defaults"""
+    if not os.path.exists(path):
+        return parse_model_config({})
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ModelConfigError(f"Could not read model configuration {path}: {str(e)}") from e
+    if not isinstance(raw, dict):
+        raise ModelConfigError("Model configuration must be a JSON object")
+    return parse_model_config(raw, source=path)
+
+
+_snapshot: Optional[ModelConfigSnapshot] = None
+_snapshot_lock = threading.Lock()
+_shared_generation: Optional[bytes] = None
+_last_shared_check = 0.0
+
+
+def _shared_store():
+    # Imported lazily, the shared store itself depends on this package's settings
+    from app.services.shared_store import get_shared_store
+    return get_shared_store()
+
+
+def reload_model_config(broadcast: bool = False) -> ModelConfigSnapshot:
+    """Reload the configuration file and atomically swap in the new snapshot
+
+    On error the current snapshot stays active and ModelConfigError is raised. With
+    broadcast, the other worker processes on the host pick the new file up as well.
+    """
+    global _snapshot, _shared_generation
+    with _snapshot_lock:
+        snapshot = load_model_config_file(settings.MODEL_CONFIG_PATH)
+        # Agents are built per request from the snapshot, so in-flight requests keep
+        # the configuration they started with
+        _snapshot = snapshot
+        if broadcast:
+            generation = f"{time.time()}:{snapshot.version}".encode("utf-8")
+            _shared_store().set("model_config", "generation", generation)
+            _shared_generation = generation
+    logger.info("Loaded model configuration version %s from %s", snapshot.version, snapshot.source or "defaults")
+    return snapshot
+
+
+def _check_shared_generation():
+    """Reload when another worker broadcast a reload since we last looked"""
+    global _shared_generation, _last_shared_check
+    now = time.monotonic()
+    if now - _last_shared_check < SHARED_CHECK_INTERVAL_SECONDS:
+        return
+    _last_shared_check = now
+    try:
+        generation = _shared_store().get("model_config", "generation")
+    except Exception:
+        return
+    if generation is None:
+        return
+    if _shared_generation is None:
+        _shared_generation = generation
+    elif generation != _shared_generation:
+        _shared_generation = generation
+        try:
+            reload_model_config()
+        except ModelConfigError:
+            logger.exception("Keeping the previous model configuration")
+
+
+def get_model_config_snapshot() -> ModelConfigSnapshot:
+    """Current configuration snapshot, loaded lazily on first use"""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = load_model_config_file(settings.MODEL_CONFIG_PATH)
+    _check_shared_generation()
+    return _snapshot
+
+
+def get_model_config(endpoint: str) -> EndpointModelConfig:
+    """Model settings for an endpoint's agent from the current snapshot"""
+    return get_model_config_snapshot().for_endpoint(endpoint)
+
+
+def install_reload_signal_handler(loop: asyncio.AbstractEventLoop):
+    """Reload the configuration on SIGHUP in single-worker mode, where the platform supports it
+
+    With several workers SIGHUP goes to uvicorn's supervisor, which restarts every worker
+    (dropping in-flight generations); there the admin endpoint's broadcast reloads them.
+    """
+    try:
+        workers = int(os.getenv("WEB_CONCURRENCY") or 1)
+    except ValueError:
+        workers = 1
+    if workers > 1:
+        return
+
+    def on_sighup():
+        try:
+            reload_model_config()
+        except ModelConfigError:
+            logger.exception("Keeping the previous model configuration")
+
+    try:
+        loop.add_signal_handler(signal.SIGHUP, on_sighup)
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+        # No SIGHUP on this platform, or not running in the main thread
+        pass
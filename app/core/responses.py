@@ -0,0 +1,47 @@
+from typing import Any, Optional, Set
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+
+class ModelJSONResponse(JSONResponse):
+    """JSON response rendered directly by a pydantic model's compiled serializer
+
+    Returning this from a handler skips FastAPI's generic jsonable_encoder + json.dumps
+    pass, which dominates serialization time for large generated markdown payloads.
+    """
+
+    def __init__(self, content: Any, exclude: Optional[Set[str]] = None, include: Optional[Set[str]] = None, **kwargs):
+        self.exclude = exclude
+        self.include = include
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json(include=self.include, exclude=self.exclude).encode("utf-8")
+        return super().render(content)
+
+
+def etag_for(artifact_id: str) -> str:
+    """Strong ETag for a content-addressed artifact (the id is already a content hash)"""
+    return f'"{artifact_id}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header matches the given ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def artifact_response(request: Request, body: bytes, artifact_id: str) -> Response:
+    """Serve a stored artifact body, answering 304 when the client already has it"""
+    etag = etag_for(artifact_id)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
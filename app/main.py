@@ -1,5 +1,9 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 
@@ -8,25 +12,77 @@ load_dotenv()
 
 # Import routers
 from app.api.v1.endpoints import (
+    admin,
     lesson_plan,
     term_plan,
     assessment,
     assessment_eval,
     student_assistant,
     teacher_assistant,
-    homework_generator
+    homework_generator,
+    search
 )
+from app.api.deps import rate_limit, require_admin
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.deadlines import RequestDeadlineMiddleware
+from app.core.drain import DrainMiddleware, drain_state, install_drain_signal_handler
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.loop_monitor import LoopLagMonitor
+from app.core.model_config import install_reload_signal_handler, reload_model_config
+from app.services.curriculum_kb import get_curriculum_index
+from app.services.metrics import metrics
+from app.services.saturation import SaturationPublisher, host_snapshot, saturation
+from app.services.shared_store import SharedStorePurger
+from app.services.warmup import WarmupScheduler
 
 # Get environment variables with defaults for deployment
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Validate the model configuration up front; the admin endpoint (or SIGHUP with a single
+    # worker) reloads it later
+    reload_model_config()
+    install_reload_signal_handler(asyncio.get_running_loop())
+    # On SIGTERM, finish in-flight generations before shutting down
+    install_drain_signal_handler(asyncio.get_running_loop())
+    # Sample event-loop lag for the whole lifetime of the worker
+    loop_monitor = LoopLagMonitor(
+        interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+        block_threshold=settings.LOOP_BLOCK_THRESHOLD_MS / 1000,
+        debug=settings.LOOP_BLOCK_DEBUG
+    )
+    loop_monitor.start()
+    # Share this worker's load so /ready can report the whole host
+    saturation_publisher = SaturationPublisher()
+    saturation_publisher.start()
+    # Expired cache entries, idempotency records and rate limit windows are deleted periodically
+    store_purger = SharedStorePurger()
+    store_purger.start()
+    # Load the curriculum index (if built) before the first request needs it
+    await run_in_threadpool(get_curriculum_index)
+    # Pre-generate popular requests off-peak so peak traffic hits the response cache
+    warmup_scheduler = WarmupScheduler() if settings.WARMUP_ENABLED else None
+    if warmup_scheduler is not None:
+        warmup_scheduler.start()
+    yield
+    if warmup_scheduler is not None:
+        await warmup_scheduler.stop()
+    await store_purger.stop()
+    await saturation_publisher.stop()
+    await loop_monitor.stop()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="EAD Teachers Tool Backend",
     description="AI-powered educational tools for teachers including lesson planning, assessment generation, and educational assistance",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware with production-ready configuration
@@ -39,6 +95,17 @@ else:
     # In development, allow all origins
     allowed_origins = ["*"]
 
+# Refuse new generation requests with 503 while draining before shutdown
+app.add_middleware(DrainMiddleware)
+
+# Replay stored responses for retried requests carrying an Idempotency-Key (inside the
+# deadline middleware, so a duplicate waiting for the first request keeps its own deadline)
+app.add_middleware(IdempotencyMiddleware)
+
+# Cancel generations whose client disconnected or whose deadline passed (inside CORS so
+# a 504 still carries CORS headers)
+app.add_middleware(RequestDeadlineMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -47,47 +114,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large generated payloads (brotli when installed, otherwise gzip)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+)
+
 # Include routers
 app.include_router(
     lesson_plan.router,
     prefix="/api/v1/lesson-plan",
-    tags=["Lesson Plan"]
+    tags=["Lesson Plan"],
+    dependencies=[Depends(rate_limit)]
 )
 
 app.include_router(
     term_plan.router,
     prefix="/api/v1/term-plan",
-    tags=["Term Plan"]
+    tags=["Term Plan"],
+    dependencies=[Depends(rate_limit)]
 )
 
 app.include_router(
     assessment.router,
     prefix="/api/v1/assessment",
-    tags=["Assessment"]
+    tags=["Assessment"],
+    dependencies=[Depends(rate_limit)]
 )
 
 app.include_router(
     assessment_eval.router,
     prefix="/api/v1/assessment-eval",
-    tags=["Assessment Evaluation"]
+    tags=["Assessment Evaluation"],
+    dependencies=[Depends(rate_limit)]
 )
 
 app.include_router(
     student_assistant.router,
     prefix="/api/v1/student-assistant",
-    tags=["Student Assistant"]
+    tags=["Student Assistant"],
+    dependencies=[Depends(rate_limit)]
 )
 
 app.include_router(
     teacher_assistant.router,
     prefix="/api/v1/teacher-assistant",
-    tags=["Teacher Assistant"]
+    tags=["Teacher Assistant"],
+    dependencies=[Depends(rate_limit)]
 )
 
 app.include_router(
     homework_generator.router,
     prefix="/api/v1/homework-generator",
-    tags=["Homework Generator"]
+    tags=["Homework Generator"],
+    dependencies=[Depends(rate_limit)]
+)
+
+app.include_router(
+    search.router,
+    prefix="/api/v1/search",
+    tags=["Search"],
+    dependencies=[Depends(rate_limit)]
+)
+
+app.include_router(
+    admin.router,
+    prefix="/api/v1/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)]
 )
 
 @app.get("/")
@@ -103,6 +197,23 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness with the saturation signals of this worker and of all workers on the host"""
+    host = await run_in_threadpool(host_snapshot)
+    worker = saturation.snapshot()
+    overloaded = settings.READY_MAX_LOAD_FACTOR > 0 and worker["load_factor"] >= settings.READY_MAX_LOAD_FACTOR
+    ready = not (drain_state.draining or overloaded)
+    return JSONResponse(
+        {"ready": ready, "draining": drain_state.draining, "worker": worker, "host": host},
+        status_code=200 if ready else 503
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics of this worker process"""
+    return metrics.render()
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host=HOST, port=PORT)
+    from app.server import main
+    main()
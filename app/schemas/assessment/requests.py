@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
+
+# Longer inputs are condensed chunk by chunk before prompting; beyond this they are rejected
+MAX_CONTENT_LENGTH = 500000
 
 
 class AssessmentRequest(BaseModel):
@@ -35,6 +38,7 @@ class AssessmentRequest(BaseModel):
         None,
         description="Detailed text content to base the assessment on (alternative to curriculum-based)",
         min_length=10,
+        max_length=MAX_CONTENT_LENGTH,
         example="Mathematics curriculum covering algebra fundamentals including linear equations, inequalities, and graphing. Students will learn to solve equations, graph linear functions, and apply algebraic concepts to real-world problems."
     )
     
@@ -78,3 +82,21 @@ class AssessmentEvalRequest(BaseModel):
         min_length=10,
         example="Question 1: What is photosynthesis?\nAnswer: Photosynthesis is the process by which plants convert sunlight into energy using chlorophyll.\n\nQuestion 2: Name the main parts of a plant cell.\nAnswer: Cell wall, cell membrane, nucleus, cytoplasm, chloroplasts, and mitochondria."
     )
+    
+    question_set: Optional[str] = Field(
+        None,
+        description="Questions and marking rubric shared by every submission of this assessment; when given, assessment_data only needs the student's answers and the shared part is cached across evaluations",
+        example="Question 1: What is photosynthesis? (2 marks)\nQuestion 2: Name the main parts of a plant cell. (3 marks)"
+    )
+    
+    mode: Literal["combined", "per_question"] = Field(
+        "combined",
+        description="combined evaluates the submission in one call; per_question evaluates each question/answer pair concurrently and computes totals and grade on the server"
+    )
+    
+    submission_key: Optional[str] = Field(
+        None,
+        description="Identifies one student's submission of this assessment; resubmitting with the same key re-evaluates only the answers that changed. Without it every answer is evaluated afresh",
+        max_length=200,
+        example="term-2-science-quiz:student-1042"
+    )
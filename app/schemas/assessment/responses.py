@@ -99,9 +99,9 @@ class AssessmentEvalResponse(BaseModel):
         description="Unique identifier for the evaluation"
     )
     
-    assessment_data: str = Field(
-        ..., 
-        description="The original assessment data that was evaluated"
+    assessment_data: Optional[str] = Field(
+        None,
+        description="The original assessment data that was evaluated (omitted when include_input=false)"
     )
     
     total_marks_obtained: float = Field(
@@ -110,9 +110,10 @@ class AssessmentEvalResponse(BaseModel):
         ge=0
     )
     
-    total_marks: int = Field(
+    total_marks: float = Field(
         ...,
-        description="Total possible marks for the assessment"
+        description="Total possible marks for the assessment",
+        ge=0
     )
     
     percentage: float = Field(
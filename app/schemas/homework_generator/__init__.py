@@ -1,8 +1,9 @@
-from .requests import HomeworkGeneratorRequest
+from .requests import HomeworkGeneratorRequest, HomeworkBatchRequest
 from .responses import HomeworkGeneratorResponse, HomeworkGeneratorListResponse
 
 __all__ = [
     "HomeworkGeneratorRequest",
+    "HomeworkBatchRequest",
     "HomeworkGeneratorResponse", 
     "HomeworkGeneratorListResponse"
 ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class HomeworkGeneratorRequest(BaseModel):
@@ -40,3 +40,30 @@ class HomeworkGeneratorRequest(BaseModel):
         description="Additional requirements or specific focus areas",
         example="Include word problems, focus on practical applications"
     )
+
+
+class HomeworkBatchRequest(BaseModel):
+    """Request schema for generating homework for many topics in one call"""
+    
+    items: List[HomeworkGeneratorRequest] = Field(
+        ...,
+        description="Homework requests; items sharing curriculum, subject and grade are generated together",
+        min_length=1,
+        max_length=100
+    )
+    
+    max_concurrency: int = Field(
+        4,
+        description="Maximum number of model calls running at the same time",
+        ge=1,
+        le=16,
+        example=4
+    )
+    
+    topics_per_call: int = Field(
+        5,
+        description="Maximum number of topics generated in a single model call",
+        ge=1,
+        le=10,
+        example=5
+    )
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 
+# Longer inputs are condensed chunk by chunk before prompting; beyond this they are rejected
+MAX_CONTENT_LENGTH = 500000
+
 
 class LessonPlanRequest(BaseModel):
     """Request schema for generating a lesson plan based on the UI form"""
@@ -9,6 +12,7 @@ class LessonPlanRequest(BaseModel):
         ...,
         description="The text content of the syllabus or curriculum to base the lesson plan on",
         min_length=10,
+        max_length=MAX_CONTENT_LENGTH,
         example="Mathematics curriculum covering algebra fundamentals including linear equations, inequalities, and graphing. Students will learn to solve equations, graph linear functions, and apply algebraic concepts to real-world problems."
     )
     
@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+from app.schemas.sections import DocumentSection
+
 
 class LessonPlanResponse(BaseModel):
     """Response schema for lesson plan generation"""
@@ -41,6 +43,11 @@ class LessonPlanResponse(BaseModel):
         description="The complete generated lesson plan content"
     )
     
+    sections: Optional[List[DocumentSection]] = Field(
+        None,
+        description="Parsed sections of generated_plan, included when requested with ?sections= or ?fields=sections"
+    )
+    
     created_at: datetime = Field(
         default_factory=datetime.utcnow,
         description="Timestamp when the plan was generated"
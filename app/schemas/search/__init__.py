@@ -0,0 +1,6 @@
+from .responses import SearchResult, SearchResponse
+
+__all__ = [
+    "SearchResult",
+    "SearchResponse"
+]
@@ -0,0 +1,66 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class SearchResult(BaseModel):
+    """A generated artifact matching a search"""
+    
+    id: str = Field(
+        ..., 
+        description="Artifact id, fetched from the GET endpoint of its kind"
+    )
+    
+    kind: str = Field(
+        ..., 
+        description="Artifact kind, e.g. lesson_plan, term_plan or homework"
+    )
+    
+    title: str = Field(
+        ..., 
+        description="Topic, question or syllabus the artifact was generated for"
+    )
+    
+    curriculum: str = Field(
+        default="",
+        description="Curriculum of the request, when it had one"
+    )
+    
+    subject: str = Field(
+        default="",
+        description="Subject of the request, when it had one"
+    )
+    
+    grade: str = Field(
+        default="",
+        description="Grade of the request, when it had one"
+    )
+    
+    snippet: str = Field(
+        ..., 
+        description="Excerpt of the generated content around the matching words"
+    )
+    
+    score: float = Field(
+        ..., 
+        description="Relevance score (higher is better, 0 without a query)"
+    )
+    
+    created_at: datetime = Field(
+        ..., 
+        description="When the artifact was first stored"
+    )
+
+
+class SearchResponse(BaseModel):
+    """Response schema for artifact search"""
+    
+    results: List[SearchResult] = Field(
+        ..., 
+        description="Matching artifacts, best match first (newest first without a query)"
+    )
+    
+    next_offset: Optional[int] = Field(
+        None,
+        description="Offset of the next page, or null when there are no more results"
+    )
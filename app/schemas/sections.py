@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class DocumentSection(BaseModel):
+    """A section of generated markdown, parsed from its headings"""
+    
+    number: Optional[int] = Field(
+        None,
+        description="Section number when the heading is numbered (e.g. 5 for '5. HOMEWORK ASSIGNMENTS')"
+    )
+    
+    key: str = Field(
+        ...,
+        description="Stable slug of the section title, usable in ?sections=",
+        example="homework-assignments"
+    )
+    
+    title: str = Field(
+        ...,
+        description="Section title as written in the heading"
+    )
+    
+    level: int = Field(
+        ...,
+        description="Heading level, 1 being the outermost"
+    )
+    
+    content: str = Field(
+        ...,
+        description="Markdown between this heading and the next one"
+    )
+    
+    subsections: List["DocumentSection"] = Field(
+        default_factory=list,
+        description="Nested sections"
+    )
+
+
+class SectionRegenerationRequest(BaseModel):
+    """Request schema for regenerating one section of a stored plan or assessment"""
+    
+    instructions: Optional[str] = Field(
+        None,
+        description="What to change in the section; without instructions it is rewritten afresh",
+        max_length=2000,
+        example="Make the homework shorter and add one real-world problem"
+    )
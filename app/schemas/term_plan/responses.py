@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+from app.schemas.sections import DocumentSection
+
 
 class TermPlanResponse(BaseModel):
     """Response schema for term plan generation"""
@@ -36,6 +38,11 @@ class TermPlanResponse(BaseModel):
         description="The complete generated term plan content"
     )
     
+    sections: Optional[List[DocumentSection]] = Field(
+        None,
+        description="Parsed sections of generated_plan, included when requested with ?sections= or ?fields=sections"
+    )
+    
     created_at: datetime = Field(
         default_factory=datetime.utcnow,
         description="Timestamp when the plan was generated"
@@ -0,0 +1,44 @@
+import math
+import os
+
+import uvicorn
+
+from app.core.config import settings
+
+
+def resolve_worker_count() -> int:
+    """Resolve the number of uvicorn worker processes
+
+    WORKERS may be an explicit number or "auto". In auto mode enough workers are started
+    to serve TARGET_CONCURRENCY generations at WORKER_CONCURRENCY per worker, capped at
+    the number of available cores.
+    """
+    if settings.WORKERS.strip().lower() != "auto":
+        return max(1, int(settings.WORKERS))
+
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    needed = math.ceil(settings.TARGET_CONCURRENCY / max(1, settings.WORKER_CONCURRENCY))
+    return max(1, min(cores, needed))
+
+
+def main():
+    """Start the API with the configured number of worker processes"""
+    workers = resolve_worker_count()
+    # Uvicorn's own worker count variable, inherited by the workers so they know their mode
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        # Workers drain first (DRAIN_TIMEOUT_SECONDS); this bounds what is still running after that
+        timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_SECONDS
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -7,102 +8,126 @@ load_dotenv()
 # Import agno modules once
 from agno.agent import Agent
 from agno.models.google.gemini import Gemini
-from agno.tools.duckduckgo import DuckDuckGoTools
 
-def get_lesson_plan_agent():
-    """Get lesson plan agent with lazy initialization"""
+from app.core.model_config import get_model_config
+from app.services.curriculum_kb import get_curriculum_index, search_curriculum_standards
+from app.services.web_search import web_search_tool
+
+def _build_agent(
+    endpoint: str,
+    description: str,
+    tools: Optional[list] = None,
+    cached_content: Optional[str] = None,
+    history_runs: int = 0
+):
+    """Build an agent using the endpoint's current model configuration
+    
+    With cached_content the description and instructions live in the cached context, so
+    the agent sends no system message (Gemini rejects one alongside cached content).
+    With history_runs the agent keeps that many previous exchanges of its conversation.
+    """
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     if not GOOGLE_API_KEY:
         raise ValueError("GOOGLE_API_KEY environment variable is required")
     
+    config = get_model_config(endpoint)
+    # Only pass the options that are configured, leaving the model defaults otherwise
+    model_options = config.model_dump(
+        include={"temperature", "top_p", "max_output_tokens", "thinking_budget", "retries"},
+        exclude_none=True
+    )
+    if config.timeout_seconds:
+        model_options["client_params"] = {"http_options": {"timeout": int(config.timeout_seconds * 1000)}}
+    
+    if cached_content:
+        return Agent(
+            model=Gemini(api_key=GOOGLE_API_KEY, id=config.model_id, cached_content=cached_content, **model_options),
+            create_default_system_message=False,
+            markdown=False
+        )
+    
+    history_options = {"add_history_to_messages": True, "num_history_runs": history_runs} if history_runs else {}
+    
     return Agent(
-        model=Gemini(api_key=GOOGLE_API_KEY, id="gemini-2.5-flash"),
-        description="You are an expert educational consultant specializing in lesson planning and curriculum development. You help teachers create engaging, standards-aligned lesson plans that incorporate best practices in pedagogy.",
-        tools=[],
-        show_tool_calls=True,
-        markdown=True
+        model=Gemini(api_key=GOOGLE_API_KEY, id=config.model_id, **model_options),
+        description=description,
+        tools=(tools or []) if config.tools_enabled else [],
+        show_tool_calls=config.show_tool_calls,
+        markdown=config.markdown,
+        **history_options
+    )
+
+def _curriculum_tools():
+    """Look up standards in the local knowledge base when one is built, otherwise on the web"""
+    if get_curriculum_index() is not None:
+        return [search_curriculum_standards]
+    return [web_search_tool()]
+
+def get_lesson_plan_agent():
+    """Get lesson plan agent with lazy initialization"""
+    return _build_agent(
+        "lesson_plan",
+        description="You are an expert educational consultant specializing in lesson planning and curriculum development. You help teachers create engaging, standards-aligned lesson plans that incorporate best practices in pedagogy."
     )
 
 def get_term_plan_agent():
     """Get term plan agent with lazy initialization"""
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is required")
-    
-    return Agent(
-        model=Gemini(api_key=GOOGLE_API_KEY, id="gemini-2.5-flash"),
+    return _build_agent(
+        "term_plan",
         description="You are a curriculum specialist who creates comprehensive term plans that align with educational standards and learning objectives. You help teachers plan entire terms with proper pacing and assessment strategies.",
-        tools=[DuckDuckGoTools()],
-        show_tool_calls=True,
-        markdown=True
+        tools=_curriculum_tools()
     )
 
 def get_assessment_agent():
     """Get assessment agent with lazy initialization"""
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is required")
-    
-    return Agent(
-        model=Gemini(api_key=GOOGLE_API_KEY, id="gemini-2.5-flash"),
-        description="You are an assessment expert who creates structured educational assessments with customizable numbers of multiple choice questions and short answer questions. You ensure all questions are directly related to the provided content (curriculum-based or text-based), generate only questions without answers, and create engaging assessments that test understanding, application, and critical thinking.",
-        tools=[],
-        show_tool_calls=True,
-        markdown=True
+    return _build_agent(
+        "assessment",
+        description="You are an assessment expert who creates structured educational assessments with customizable numbers of multiple choice questions and short answer questions. You ensure all questions are directly related to the provided content (curriculum-based or text-based), generate only questions without answers, and create engaging assessments that test understanding, application, and critical thinking."
     )
 
-def get_student_assistant_agent():
+def get_student_assistant_agent(history_runs: int = 0):
     """Get student assistant agent with lazy initialization"""
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is required")
-    
-    return Agent(
-        model=Gemini(api_key=GOOGLE_API_KEY, id="gemini-2.5-flash"),
+    return _build_agent(
+        "student_assistant",
+        history_runs=history_runs,
         description="You are a patient and knowledgeable tutor who helps students understand complex concepts, solve problems, and develop critical thinking skills. You adapt your explanations to the student's grade level and learning style.",
-        tools=[DuckDuckGoTools()],
-        show_tool_calls=True,
-        markdown=True
+        tools=[web_search_tool()]
     )
 
 def get_teacher_assistant_agent():
     """Get teacher assistant agent with lazy initialization"""
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is required")
-    
-    return Agent(
-        model=Gemini(api_key=GOOGLE_API_KEY, id="gemini-2.5-flash"),
+    return _build_agent(
+        "teacher_assistant",
         description="You are an experienced educational consultant who provides teachers with practical advice on lesson planning, teaching strategies, classroom management, and educational resources. You offer evidence-based recommendations.",
-        tools=[DuckDuckGoTools()],
-        show_tool_calls=True,
-        markdown=True
+        tools=[web_search_tool()]
     )
 
 def get_homework_generator_agent():
     """Get homework generator agent with lazy initialization"""
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is required")
-    
-    return Agent(
-        model=Gemini(api_key=GOOGLE_API_KEY, id="gemini-2.5-flash"),
+    return _build_agent(
+        "homework_generator",
         description="You are a homework specialist who creates engaging and appropriate homework assignments that reinforce classroom learning, promote independent thinking, and provide meaningful practice opportunities for students.",
-        tools=[DuckDuckGoTools()],
-        show_tool_calls=True,
-        markdown=True
-    ) 
+        tools=_curriculum_tools()
+    )
 
-def get_assessment_eval_agent():
+def get_assessment_eval_agent(cached_content: Optional[str] = None):
     """Get assessment evaluation agent with lazy initialization"""
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY environment variable is required")
-    
-    return Agent(
-        model=Gemini(api_key=GOOGLE_API_KEY, id="gemini-2.5-flash"),
-        description="You are an expert educational assessor who evaluates student responses with fairness, accuracy, and constructive feedback. You provide detailed marks, comprehensive feedback, identify strengths and areas for improvement, and offer specific suggestions for student growth. You consider grade-appropriate standards and subject-specific criteria in your evaluations.",
-        tools=[],
-        show_tool_calls=True,
-        markdown=True
+    return _build_agent(
+        "assessment_eval",
+        cached_content=cached_content,
+        description="You are an expert educational assessor who evaluates student responses with fairness, accuracy, and constructive feedback. You provide detailed marks, comprehensive feedback, identify strengths and areas for improvement, and offer specific suggestions for student growth. You consider grade-appropriate standards and subject-specific criteria in your evaluations."
+    )
+
+def get_content_digest_agent():
+    """Get content digest agent with lazy initialization"""
+    return _build_agent(
+        "content_digest",
+        description="You are a precise educational content summarizer. You condense long syllabus and textbook excerpts into compact notes that keep every topic, learning objective, definition, formula and key fact a teacher would need to plan lessons or write assessments."
+    )
+
+def get_json_repair_agent():
+    """Get JSON repair agent with lazy initialization"""
+    return _build_agent(
+        "json_repair",
+        description="You fix malformed JSON. You correct syntax errors such as unescaped quotes, missing commas and unbalanced brackets without changing the content, and reply with the corrected JSON only."
     )
@@ -0,0 +1,94 @@
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, zlib is always available
+    zstandard = None
+
+# Stored bodies describe their own format: raw JSON starts with "{", zstd frames with their
+# magic number (and carry the id of the dictionary they need), anything else is zlib
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class ArtifactCodec:
+    """Compresses artifact bodies with zstd and a trained dictionary, or zlib without zstandard
+
+    Decoding handles every format ever written, so the method can be changed (or a new
+    dictionary trained) without rewriting stored artifacts.
+    """
+
+    def __init__(self, method: str = "zstd", level: int = 9):
+        if method == "zstd" and zstandard is None:
+            method = "zlib"
+        self.method = method
+        self.level = level
+        # Compression contexts are not thread-safe, so every thread keeps its own
+        self._local = threading.local()
+        self._dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._lock = threading.Lock()
+
+    def add_dictionary(self, data: bytes) -> int:
+        """Register a trained dictionary and return its id"""
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dictionary.precompute_compress(level=self.level)
+        with self._lock:
+            self._dictionaries[dictionary.dict_id()] = dictionary
+        return dictionary.dict_id()
+
+    def has_dictionary(self, dict_id: int) -> bool:
+        return dict_id in self._dictionaries
+
+    def _context(self, kind: str, dict_id: int):
+        contexts = getattr(self._local, kind, None)
+        if contexts is None:
+            contexts = {}
+            setattr(self._local, kind, contexts)
+        context = contexts.get(dict_id)
+        if context is None:
+            dictionary = self._dictionaries.get(dict_id) if dict_id else None
+            if kind == "compress":
+                context = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+            else:
+                context = zstandard.ZstdDecompressor(dict_data=dictionary)
+            contexts[dict_id] = context
+        return context
+
+    def encode(self, body: bytes, dict_id: Optional[int] = None) -> bytes:
+        """Compress a JSON body, with the given registered dictionary when using zstd"""
+        if self.method == "zstd":
+            return self._context("compress", dict_id if dict_id in self._dictionaries else 0).compress(body)
+        if self.method == "zlib":
+            return zlib.compress(body, min(self.level, 9))
+        return body
+
+    def dictionary_id(self, stored: bytes) -> int:
+        """Id of the dictionary a stored body was compressed with, 0 for none"""
+        if not stored.startswith(ZSTD_MAGIC) or zstandard is None:
+            return 0
+        return zstandard.get_frame_parameters(stored).dict_id
+
+    def decode(self, stored: bytes, load_dictionary: Optional[Callable[[int], Optional[bytes]]] = None) -> bytes:
+        """The JSON body of a stored artifact, loading its dictionary on first use"""
+        if stored[:1] == b"{":
+            return stored
+        if not stored.startswith(ZSTD_MAGIC):
+            return zlib.decompress(stored)
+        if zstandard is None:
+            raise RuntimeError("Artifact is zstd-compressed but the zstandard package is not installed")
+
+        dict_id = self.dictionary_id(stored)
+        if dict_id and dict_id not in self._dictionaries:
+            data = load_dictionary(dict_id) if load_dictionary else None
+            if data is None:
+                raise RuntimeError(f"Compression dictionary {dict_id} is missing")
+            self.add_dictionary(data)
+        return self._context("decompress", dict_id).decompress(stored)
+
+
+def train_dictionary(samples: List[bytes], size: int, level: int = 9) -> bytes:
+    """Train a zstd dictionary of up to size bytes on sample artifact bodies"""
+    if zstandard is None:
+        raise RuntimeError("Training a dictionary requires the zstandard package")
+    return zstandard.train_dictionary(size, samples, level=level).as_bytes()
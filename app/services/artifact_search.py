@@ -0,0 +1,137 @@
+import re
+from itertools import combinations
+from typing import Iterable, List, Optional
+
+# Full-text index over stored artifacts, kept in the artifact store's database. Titles and
+# request metadata are weighted above the generated body in the bm25 ranking. The filters
+# column holds a token for the kind and one for every combination of curriculum, subject
+# and grade, so any set of filters is a single index lookup. Rowids are the microsecond
+# timestamps the artifacts were stored at, so date filters are rowid ranges.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS artifact_search USING fts5(
+    title,
+    body,
+    metadata,
+    filters,
+    artifact_id UNINDEXED,
+    kind UNINDEXED,
+    curriculum UNINDEXED,
+    subject UNINDEXED,
+    grade UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+RANK_WEIGHTS = "bm25(4.0, 1.0, 2.0, 0.0)"
+
+# Fields giving an artifact its title, in order of preference
+TITLE_FIELDS = ("topic", "question", "syllabus_filename")
+
+# Request metadata of the artifacts generated for a curriculum, subject and grade
+METADATA_FIELDS = ("curriculum", "subject", "grade")
+
+# Fields not worth indexing: volatile or derived from the body
+SKIPPED_FIELDS = {"id", "created_at", "status", "sections"}
+
+# Words that carry no meaning in a search for an artifact
+STOP_WORDS = {
+    "a", "an", "and", "the", "of", "for", "from", "in", "on", "to", "with", "that", "this",
+    "my", "our", "is", "are", "was", "were", "about", "some", "me", "i", "find", "show"
+}
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _strings(value) -> Iterable[str]:
+    """Every string inside a JSON value"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def rowid_for(timestamp: float) -> int:
+    """Index rowid for a unix timestamp"""
+    return int(timestamp * 1_000_000)
+
+
+def filter_token(field: str, value: str) -> str:
+    """Single token standing for a metadata value, e.g. gradegrade5 for Grade 5"""
+    return field + "".join(TOKEN.findall(value.lower())).replace("_", "")
+
+
+def metadata_token(values: dict) -> str:
+    """Single token standing for a combination of metadata values, in METADATA_FIELDS order"""
+    return "".join(filter_token(field, values[field]) for field in METADATA_FIELDS if values.get(field))
+
+
+def search_document(kind: str, content: dict) -> dict:
+    """Column values to index for an artifact's JSON content"""
+    # Evaluations have a letter grade, not a class grade: only curriculum artifacts have metadata
+    metadata = {field: str(content.get(field) or "") for field in METADATA_FIELDS} if "curriculum" in content else {}
+    title = next((str(content[field]) for field in TITLE_FIELDS if content.get(field)), "")
+    if not title:
+        title = " ".join(value for field, value in metadata.items() if field != "curriculum" and value)
+    if not title:
+        title = kind.replace("_", " ")
+    body = "\n".join(
+        text
+        for field, value in content.items()
+        if field not in SKIPPED_FIELDS and field not in TITLE_FIELDS and field not in metadata
+        for text in _strings(value)
+    )
+    present = [field for field in METADATA_FIELDS if metadata.get(field)]
+    filters = [filter_token("kind", kind)] + [
+        metadata_token({field: metadata[field] for field in fields})
+        for size in range(1, len(present) + 1)
+        for fields in combinations(present, size)
+    ]
+    return {
+        "title": title,
+        "body": body,
+        "metadata": " ".join(value for value in metadata.values() if value),
+        "filters": " ".join(filters),
+        "curriculum": metadata.get("curriculum", ""),
+        "subject": metadata.get("subject", ""),
+        "grade": metadata.get("grade", "")
+    }
+
+
+def query_terms(query: str) -> List[str]:
+    """Searchable words of a free-text query"""
+    return [token for token in TOKEN.findall(query.lower()) if token not in STOP_WORDS]
+
+
+def text_expression(query: str, any_term: bool = False) -> Optional[str]:
+    """FTS5 expression for a free-text query over the searchable columns, or None when it has no words
+
+    Query words are quoted so user input is never parsed as FTS5 syntax; they must all
+    match unless any_term is set.
+    """
+    terms = ['"' + term + '"' for term in query_terms(query)]
+    if not terms:
+        return None
+    return "{title body metadata} : (" + (" OR " if any_term else " AND ").join(terms) + ")"
+
+
+def filter_expression(
+    kinds: Optional[List[str]] = None,
+    curriculum: Optional[str] = None,
+    subject: Optional[str] = None,
+    grade: Optional[str] = None
+) -> Optional[str]:
+    """FTS5 expression matching the filter tokens of kinds and metadata, or None without filters"""
+    parts = []
+    if kinds:
+        parts.append("(" + " OR ".join('"' + filter_token("kind", kind) + '"' for kind in kinds) + ")")
+    values = {
+        field: value
+        for field, value in (("curriculum", curriculum), ("subject", subject), ("grade", grade))
+        if value and TOKEN.search(value)
+    }
+    if values:
+        parts.append('"' + metadata_token(values) + '"')
+    return "filters : (" + " AND ".join(parts) + ")" if parts else None
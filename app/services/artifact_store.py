@@ -0,0 +1,433 @@
+"""
+Content-addressed store for generated artifacts.
+
+Bodies are stored compressed (zstd with a dictionary trained on stored artifacts of the
+same kind, or zlib without the zstandard package). Train or retrain the dictionaries with:
+
+    python -m app.services.artifact_store train [--kind lesson_plan] [--recompress]
+
+and show per-kind compression with `python -m app.services.artifact_store stats`. Artifacts
+are added to the full-text search index as they are stored; index artifacts stored before
+the index existed with `python -m app.services.artifact_store reindex`.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from typing import List, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.artifact_compression import ArtifactCodec, train_dictionary
+from app.services.artifact_search import (
+    RANK_WEIGHTS,
+    SEARCH_SCHEMA,
+    filter_expression,
+    query_terms,
+    rowid_for,
+    search_document,
+    text_expression
+)
+from app.services.shared_store import connect_sqlite
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Fields that vary between otherwise identical artifacts (or are derived from their
+# content) and are excluded from the hash
+VOLATILE_FIELDS = {"id", "created_at", "status", "sections"}
+
+
+def content_id(kind: str, model: BaseModel) -> str:
+    """Derive a stable artifact id from the artifact kind and its content"""
+    content = model.model_dump(mode="json", exclude=VOLATILE_FIELDS)
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{kind}\n{canonical}".encode("utf-8")).hexdigest()[:32]
+
+
+class ArtifactStore:
+    """Content-addressed local store for generated artifacts, deduplicated by content hash"""
+
+    def __init__(self, path: str, codec: Optional[ArtifactCodec] = None):
+        self.path = path
+        self.codec = codec or ArtifactCodec(settings.ARTIFACT_COMPRESSION, settings.ARTIFACT_COMPRESSION_LEVEL)
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                body BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                indexed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_artifacts_kind_created ON artifacts (kind, created_at);
+            CREATE TABLE IF NOT EXISTS artifact_dictionaries (
+                dict_id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_artifact_dictionaries_kind ON artifact_dictionaries (kind, created_at);
+            CREATE INDEX IF NOT EXISTS idx_artifacts_created ON artifacts (created_at);
+            """
+        )
+        conn.executescript(SEARCH_SCHEMA)
+        conn.execute("INSERT INTO artifact_search (artifact_search, rank) VALUES ('rank', ?)", (RANK_WEIGHTS,))
+        if "indexed" not in {row[1] for row in conn.execute("PRAGMA table_info(artifacts)")}:
+            # Stores created before the flag existed: mark what the search index already holds, once
+            conn.execute("ALTER TABLE artifacts ADD COLUMN indexed INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE artifacts SET indexed = 1 WHERE id IN (SELECT artifact_id FROM artifact_search)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_unindexed ON artifacts (id) WHERE indexed = 0")
+
+    def save(self, kind: str, model: ModelT) -> ModelT:
+        """Store an artifact under its content id and return the stored version
+
+        If identical content was stored before, the existing artifact (with its original
+        created_at) is returned instead of writing a duplicate.
+        """
+        artifact_id = content_id(kind, model)
+        artifact = model.model_copy(update={"id": artifact_id})
+        body = self._encode(kind, artifact.model_dump_json().encode("utf-8"))
+        stored_at = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO artifacts (id, kind, body, created_at, indexed) VALUES (?, ?, ?, ?, 1)",
+                (artifact_id, kind, body, stored_at)
+            ).rowcount
+            if inserted:
+                # Indexed in the same transaction, so search never misses a stored artifact
+                self._index(kind, artifact_id, artifact.model_dump(mode="json"), stored_at)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        stored = self.get_raw(kind, artifact_id)
+        return type(model).model_validate_json(stored)
+
+    def get_raw(self, kind: str, artifact_id: str) -> Optional[bytes]:
+        """Return the serialized JSON body of an artifact, or None if it does not exist"""
+        row = self._connection().execute(
+            "SELECT body FROM artifacts WHERE id = ? AND kind = ?", (artifact_id, kind)
+        ).fetchone()
+        return self.codec.decode(row[0], self._load_dictionary) if row else None
+
+    def get(self, kind: str, artifact_id: str, model_type: Type[ModelT]) -> Optional[ModelT]:
+        body = self.get_raw(kind, artifact_id)
+        return model_type.model_validate_json(body) if body is not None else None
+
+    def list(self, kind: str, model_type: Type[ModelT], limit: int, offset: int = 0) -> List[ModelT]:
+        """Artifacts of a kind, newest first"""
+        rows = self._connection().execute(
+            "SELECT body FROM artifacts WHERE kind = ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (kind, limit, offset)
+        ).fetchall()
+        return [model_type.model_validate_json(self.codec.decode(row[0], self._load_dictionary)) for row in rows]
+
+    def count(self, kind: str) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM artifacts WHERE kind = ?", (kind,)).fetchone()[0]
+
+    # Full-text search
+
+    def _index(self, kind: str, artifact_id: str, content: dict, stored_at: float):
+        conn = self._connection()
+        document = search_document(kind, content)
+        # Called inside a write transaction, so no other writer can take the rowid meanwhile
+        rowid = rowid_for(stored_at)
+        while conn.execute("SELECT 1 FROM artifact_search WHERE rowid = ?", (rowid,)).fetchone():
+            rowid += 1
+        conn.execute(
+            "INSERT INTO artifact_search (rowid, title, body, metadata, filters, artifact_id, kind, curriculum, subject, grade) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                rowid, document["title"], document["body"], document["metadata"], document["filters"], artifact_id,
+                kind, document["curriculum"], document["subject"], document["grade"]
+            )
+        )
+
+    def search(
+        self,
+        query: str = "",
+        kinds: Optional[List[str]] = None,
+        curriculum: Optional[str] = None,
+        subject: Optional[str] = None,
+        grade: Optional[str] = None,
+        created_from: Optional[float] = None,
+        created_to: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[dict]:
+        """Artifacts matching a free-text query and filters, best match first
+
+        Every query word must match; when no artifact has all of them, artifacts matching
+        any word are ranked instead. To keep latency flat as the store grows, bm25 ranks the
+        ARTIFACT_SEARCH_CANDIDATES most recent matches. Without a query the newest matching
+        artifacts are returned. Created times are unix timestamps.
+        """
+        filters = filter_expression(kinds, curriculum, subject, grade)
+        text = text_expression(query)
+        if text is None and filters is None:
+            return self._recent(kinds, created_from, created_to, limit, offset)
+        if text is None:
+            return self._match(filters, created_from, created_to, limit, offset, ranked=False)
+
+        hits = self._match(" AND ".join(filter(None, (text, filters))), created_from, created_to, limit, offset, ranked=True)
+        if not hits and offset == 0 and len(query_terms(query)) > 1:
+            any_term = " AND ".join(filter(None, (text_expression(query, any_term=True), filters)))
+            hits = self._match(any_term, created_from, created_to, limit, offset, ranked=True)
+        return hits
+
+    def _match(
+        self,
+        expression: str,
+        created_from: Optional[float],
+        created_to: Optional[float],
+        limit: int,
+        offset: int,
+        ranked: bool
+    ) -> List[dict]:
+        conditions, params = ["artifact_search MATCH ?"], [expression]
+        if created_from is not None:
+            conditions.append("rowid >= ?")
+            params.append(rowid_for(created_from))
+        if created_to is not None:
+            conditions.append("rowid < ?")
+            params.append(rowid_for(created_to))
+        # Matches are scanned newest first (rowids are the time each artifact was stored), which stops early;
+        # stored columns are read only for the returned page
+        candidates = (
+            f"SELECT rowid AS match_rowid, {'rank' if ranked else '0.0'} AS score FROM artifact_search "
+            f"WHERE {' AND '.join(conditions)} ORDER BY rowid DESC LIMIT ?"
+        )
+        if ranked:
+            page = f"SELECT * FROM ({candidates}) ORDER BY score LIMIT ? OFFSET ?"
+            params.extend([settings.ARTIFACT_SEARCH_CANDIDATES, limit, offset])
+        else:
+            page = f"{candidates} OFFSET ?"
+            params.extend([limit, offset])
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT s.rowid, s.artifact_id, s.kind, s.title, s.curriculum, s.subject, s.grade, page.score "
+            f"FROM ({page}) page JOIN artifact_search s ON s.rowid = page.match_rowid ORDER BY page.score, s.rowid DESC",
+            params
+        ).fetchall()
+
+        hits = []
+        for rowid, artifact_id, kind, title, curriculum, subject, grade, score in rows:
+            # Snippets only for the returned page: they are the costliest part of a match
+            snippet = conn.execute(
+                "SELECT snippet(artifact_search, 1, '**', '**', '...', 16) FROM artifact_search "
+                "WHERE artifact_search MATCH ? AND rowid = ?",
+                (expression, rowid)
+            ).fetchone()
+            hits.append({
+                "id": artifact_id, "kind": kind, "created_at": rowid / 1_000_000, "title": title, "curriculum": curriculum,
+                "subject": subject, "grade": grade, "snippet": snippet[0] if snippet else "", "score": round(-score, 4)
+            })
+        return hits
+
+    def _recent(
+        self,
+        kinds: Optional[List[str]],
+        created_from: Optional[float],
+        created_to: Optional[float],
+        limit: int,
+        offset: int
+    ) -> List[dict]:
+        conditions, params = [], []
+        if kinds:
+            conditions.append(f"kind IN ({', '.join('?' for _ in kinds)})")
+            params.extend(kinds)
+        if created_from is not None:
+            conditions.append("created_at >= ?")
+            params.append(created_from)
+        if created_to is not None:
+            conditions.append("created_at < ?")
+            params.append(created_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection().execute(
+            f"SELECT id, kind, created_at, body FROM artifacts {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        ).fetchall()
+        hits = []
+        for artifact_id, kind, created_at, stored in rows:
+            document = search_document(kind, json.loads(self.codec.decode(stored, self._load_dictionary)))
+            hits.append({
+                "id": artifact_id, "kind": kind, "created_at": created_at, "title": document["title"],
+                "curriculum": document["curriculum"], "subject": document["subject"], "grade": document["grade"],
+                "snippet": document["body"][:200], "score": 0.0
+            })
+        return hits
+
+    def reindex(self, batch_size: int = 500) -> int:
+        """Index the artifacts stored before the search index existed"""
+        conn = self._connection()
+        indexed = 0
+        while True:
+            # Served by the partial index on unindexed rows, so each batch skips the indexed ones
+            rows = conn.execute(
+                "SELECT id, kind, body, created_at FROM artifacts WHERE indexed = 0 ORDER BY id LIMIT ?",
+                (batch_size,)
+            ).fetchall()
+            if not rows:
+                return indexed
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for artifact_id, kind, stored, created_at in rows:
+                    self._index(kind, artifact_id, json.loads(self.codec.decode(stored, self._load_dictionary)), created_at)
+                    conn.execute("UPDATE artifacts SET indexed = 1 WHERE id = ?", (artifact_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            indexed += len(rows)
+
+    # Compression dictionaries
+
+    def _encode(self, kind: str, body: bytes) -> bytes:
+        dict_id = self.latest_dictionary_id(kind) if self.codec.method == "zstd" else None
+        if dict_id and not self.codec.has_dictionary(dict_id):
+            self._load_and_add_dictionary(dict_id)
+        return self.codec.encode(body, dict_id)
+
+    def _load_dictionary(self, dict_id: int) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT data FROM artifact_dictionaries WHERE dict_id = ?", (dict_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _load_and_add_dictionary(self, dict_id: int):
+        data = self._load_dictionary(dict_id)
+        if data is not None:
+            self.codec.add_dictionary(data)
+
+    def latest_dictionary_id(self, kind: str) -> Optional[int]:
+        """Id of the newest dictionary trained for a kind, used for new artifacts"""
+        row = self._connection().execute(
+            "SELECT dict_id FROM artifact_dictionaries WHERE kind = ? ORDER BY created_at DESC LIMIT 1", (kind,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def kinds(self) -> List[str]:
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT kind FROM artifacts ORDER BY kind")]
+
+    def sample_bodies(self, kind: str, limit: int) -> List[bytes]:
+        """JSON bodies of the most recent artifacts of a kind"""
+        rows = self._connection().execute(
+            "SELECT body FROM artifacts WHERE kind = ? ORDER BY created_at DESC LIMIT ?", (kind, limit)
+        ).fetchall()
+        return [self.codec.decode(row[0], self._load_dictionary) for row in rows]
+
+    def train(self, kind: str, size: int, max_samples: int) -> Optional[int]:
+        """Train a dictionary for a kind on its recent artifacts; None when there are too few"""
+        samples = self.sample_bodies(kind, max_samples)
+        if len(samples) < settings.ARTIFACT_DICTIONARY_MIN_SAMPLES:
+            return None
+        return self.add_dictionary(kind, train_dictionary(samples, size, self.codec.level))
+
+    def add_dictionary(self, kind: str, data: bytes) -> int:
+        """Store a trained dictionary; new artifacts of the kind are compressed with it"""
+        dict_id = self.codec.add_dictionary(data)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO artifact_dictionaries (dict_id, kind, data, created_at) VALUES (?, ?, ?, ?)",
+            (dict_id, kind, data, time.time())
+        )
+        return dict_id
+
+    def recompress(self, kind: str, batch_size: int = 500) -> int:
+        """Rewrite the artifacts of a kind in the current format and dictionary"""
+        conn = self._connection()
+        rewritten = 0
+        last_id = ""
+        while True:
+            rows = conn.execute(
+                "SELECT id, body FROM artifacts WHERE kind = ? AND id > ? ORDER BY id LIMIT ?",
+                (kind, last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return rewritten
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for artifact_id, stored in rows:
+                    body = self.codec.decode(stored, self._load_dictionary)
+                    conn.execute("UPDATE artifacts SET body = ? WHERE id = ?", (self._encode(kind, body), artifact_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            rewritten += len(rows)
+            last_id = rows[-1][0]
+
+    def stats(self, kind: str) -> dict:
+        row = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM artifacts WHERE kind = ?", (kind,)
+        ).fetchone()
+        return {"artifacts": row[0], "stored_bytes": row[1], "dictionary_id": self.latest_dictionary_id(kind)}
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Get the process-wide artifact store with lazy initialization"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore(settings.ARTIFACT_STORE_PATH)
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage compression and search indexing of the artifact store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="Train compression dictionaries on stored artifacts")
+    train.add_argument("--kind", action="append", help="Artifact kind to train (repeatable), default all")
+    train.add_argument("--size", type=int, default=settings.ARTIFACT_DICTIONARY_BYTES)
+    train.add_argument("--samples", type=int, default=5000, help="Most recent artifacts per kind to train on")
+    train.add_argument("--recompress", action="store_true", help="Rewrite stored artifacts with the new dictionary")
+
+    commands.add_parser("stats", help="Show stored size per artifact kind")
+    commands.add_parser("reindex", help="Add artifacts stored before search indexing to the search index")
+
+    args = parser.parse_args()
+    store = get_artifact_store()
+    if args.command == "train":
+        for kind in args.kind or store.kinds():
+            started = time.perf_counter()
+            dict_id = store.train(kind, args.size, args.samples)
+            if dict_id is None:
+                print(f"{kind}: fewer than {settings.ARTIFACT_DICTIONARY_MIN_SAMPLES} artifacts, skipped")
+                continue
+            message = f"{kind}: trained dictionary {dict_id} in {time.perf_counter() - started:.2f} s"
+            if args.recompress:
+                message += f", recompressed {store.recompress(kind)} artifacts"
+            print(message)
+    elif args.command == "reindex":
+        started = time.perf_counter()
+        print(f"Indexed {store.reindex()} artifacts in {time.perf_counter() - started:.2f} s")
+    else:
+        for kind in store.kinds():
+            stats = store.stats(kind)
+            print(f"{kind}: {stats['artifacts']} artifacts, {stats['stored_bytes']} bytes, dictionary {stats['dictionary_id']}")
+
+
+if __name__ == "__main__":
+    main()
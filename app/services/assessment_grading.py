@@ -0,0 +1,174 @@
+import hashlib
+import json
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.services.metrics import metrics
+from app.services.shared_store import get_shared_store
+
+# Percentage thresholds for letter grades, highest first
+GRADE_BOUNDARIES = ((90, "A+"), (80, "A"), (70, "B"), (60, "C"), (50, "D"), (0, "F"))
+
+QUESTION_LINE = re.compile(r"^\s*(?:question|q)\s*\.?\s*(\d+)\s*[:.)\-]\s*(.*)$", re.IGNORECASE)
+ANSWER_LINE = re.compile(r"^\s*(?:answer|ans)\s*\.?\s*(\d+)?\s*[:.)\-]\s*(.*)$", re.IGNORECASE)
+MARKS = re.compile(r"[(\[]\s*(\d+(?:\.\d+)?)\s*marks?\s*[)\]]", re.IGNORECASE)
+
+questions_evaluated_total = metrics.counter(
+    "assessment_eval_questions_total",
+    "Questions in evaluated submissions, by result (reused from a stored evaluation or evaluated)"
+)
+
+
+@dataclass
+class QuestionAnswer:
+    """A question of a submission and the student's answer to it"""
+    number: int
+    question: str
+    answer: str
+    max_marks: Optional[float] = None
+
+
+def _parse_blocks(text: str, with_answers: bool) -> Dict[int, dict]:
+    """Questions by number, with the text that follows each "Question n:" line"""
+    blocks: Dict[int, dict] = {}
+    current = None
+    for line in text.splitlines():
+        question = QUESTION_LINE.match(line)
+        if question:
+            current = {"question": [question.group(2)], "answer": []}
+            blocks[int(question.group(1))] = current
+            continue
+        answer = ANSWER_LINE.match(line) if with_answers else None
+        if answer and current is not None:
+            current["answer"].append(answer.group(2))
+            current["in_answer"] = True
+        elif current is not None:
+            current["answer" if current.get("in_answer") else "question"].append(line)
+    return blocks
+
+
+def _parse_answers(text: str) -> Dict[int, str]:
+    """Answers by number from "Answer n:" lines"""
+    answers: Dict[int, List[str]] = {}
+    current = None
+    for line in text.splitlines():
+        answer = ANSWER_LINE.match(line)
+        if answer and answer.group(1):
+            current = answers.setdefault(int(answer.group(1)), [])
+            current.append(answer.group(2))
+        elif current is not None:
+            current.append(line)
+    return {number: "\n".join(lines).strip() for number, lines in answers.items()}
+
+
+def _max_marks(question: str) -> Optional[float]:
+    match = MARKS.search(question)
+    return float(match.group(1)) if match else None
+
+
+def parse_submission(assessment_data: str, question_set: Optional[str] = None) -> List[QuestionAnswer]:
+    """Split a submission into question/answer pairs, or [] when its layout is not recognized
+
+    Submissions hold "Question n: ..." lines each followed by an "Answer: ..." line. With a
+    question set, the questions come from it and assessment_data holds "Answer n: ..." lines.
+    """
+    if question_set:
+        questions = _parse_blocks(question_set, with_answers=False)
+        answers = _parse_answers(assessment_data)
+        if not questions or not answers:
+            return []
+        pairs = [
+            QuestionAnswer(number, "\n".join(block["question"]).strip(), answers.get(number, ""))
+            for number, block in sorted(questions.items())
+        ]
+    else:
+        blocks = _parse_blocks(assessment_data, with_answers=True)
+        if not blocks or not all(block.get("in_answer") for block in blocks.values()):
+            return []
+        pairs = [
+            QuestionAnswer(number, "\n".join(block["question"]).strip(), "\n".join(block["answer"]).strip())
+            for number, block in sorted(blocks.items())
+        ]
+
+    for pair in pairs:
+        pair.max_marks = _max_marks(pair.question)
+    return pairs
+
+
+def question_hash(pair: QuestionAnswer, submission_key: str, question_set: Optional[str] = None) -> str:
+    """Identify a submission's answer to a question, independent of its position and surrounding whitespace"""
+    normalized = "\n".join(
+        " ".join(part.split()).lower()
+        for part in (question_set or "", pair.question, pair.answer)
+    )
+    # The submission key is kept as given, so one student's evaluations are never another's
+    return hashlib.sha256(f"{submission_key}\n{normalized}".encode("utf-8")).hexdigest()[:32]
+
+
+def load_question_evaluations(pairs: List[QuestionAnswer], submission_key: Optional[str], question_set: Optional[str] = None) -> Dict[int, dict]:
+    """Stored evaluations of the pairs this submission had evaluated before, by question number"""
+    if not submission_key:
+        return {}
+    store = get_shared_store()
+    found = {}
+    for pair in pairs:
+        stored = store.get("question_eval", question_hash(pair, submission_key, question_set))
+        if stored is not None:
+            found[pair.number] = {**json.loads(stored), "question_number": pair.number}
+    return found
+
+
+def save_question_evaluations(
+    pairs: List[QuestionAnswer],
+    evaluations: Dict[int, dict],
+    submission_key: Optional[str],
+    question_set: Optional[str] = None
+):
+    """Store per-question evaluations so resubmissions under the same key only re-evaluate changed answers"""
+    if not submission_key:
+        return
+    store = get_shared_store()
+    for pair in pairs:
+        evaluation = evaluations.get(pair.number)
+        if evaluation is not None:
+            store.set(
+                "question_eval",
+                question_hash(pair, submission_key, question_set),
+                json.dumps(evaluation).encode("utf-8"),
+                ttl=settings.QUESTION_EVAL_TTL_SECONDS
+            )
+
+
+def to_marks(value, default: float = 0.0) -> float:
+    """A mark from a model reply as a non-negative number, or default when missing or malformed"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, number) if math.isfinite(number) else default
+
+
+def letter_grade(percentage: float) -> str:
+    for threshold, grade in GRADE_BOUNDARIES:
+        if percentage >= threshold:
+            return grade
+    return "F"
+
+
+def compute_totals(evaluations: List[dict]) -> dict:
+    """Totals, percentage and letter grade computed from per-question marks"""
+    total_marks = sum(to_marks(evaluation.get("max_marks")) for evaluation in evaluations)
+    obtained = sum(
+        min(to_marks(evaluation.get("marks_obtained")), to_marks(evaluation.get("max_marks")))
+        for evaluation in evaluations
+    )
+    percentage = round(obtained / total_marks * 100, 2) if total_marks else 0.0
+    return {
+        "total_marks": total_marks,
+        "total_marks_obtained": round(obtained, 2),
+        "percentage": percentage,
+        "grade": letter_grade(percentage)
+    }
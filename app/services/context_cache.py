@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.metrics import metrics
+from app.services.shared_store import get_shared_store
+
+logger = logging.getLogger("app.context_cache")
+
+context_cache_requests_total = metrics.counter(
+    "context_cache_requests_total",
+    "Prompt prefix lookups in the model context cache, by namespace and result (hit, miss or skipped)"
+)
+context_cache_tokens_saved_total = metrics.counter(
+    "context_cache_input_tokens_saved_total",
+    "Estimated prompt input tokens served from a cached prefix instead of being resent, by namespace"
+)
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def prefix_key(model_id: str, system_instruction: str, prefix: str) -> str:
+    """Identify a cached prefix by everything that is stored with it"""
+    digest = hashlib.sha256(f"{model_id}\n{system_instruction}\n{prefix}".encode("utf-8")).hexdigest()
+    return digest[:32]
+
+
+class LocalContextCache:
+    """In-process stand-in for model-side context caching, for development and tests
+
+    Handles are issued and expire like cached contents on the model side, but the cached
+    prefix is prepended locally, so the model still receives the full prompt.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def handle_for(self, model_id: str, system_instruction: str, prefix: str) -> Tuple[Optional[str], bool]:
+        """(handle, created) for a prefix, creating the cached entry when missing or expired"""
+        handle = f"local/{prefix_key(model_id, system_instruction, prefix)}"
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None and entry[1] > now:
+                return handle, False
+            self._entries[handle] = (prefix, now + self.ttl)
+            return handle, True
+
+    def attach(self, agent_factory: Callable, handle: str, suffix: str):
+        """Agent and prompt for a request whose prefix is cached under handle"""
+        with self._lock:
+            prefix = self._entries[handle][0]
+        return agent_factory(), prefix + suffix
+
+
+class GeminiContextCache:
+    """Explicit Gemini context caching of prompt prefixes, shared by the workers on a host
+
+    The agent description becomes the cached system instruction and the prefix the cached
+    contents; requests then send only their suffix with a reference to the cached content.
+    """
+
+    def __init__(self, ttl: int, min_tokens: int):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self._client = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _get_client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        return self._client
+
+    async def handle_for(self, model_id: str, system_instruction: str, prefix: str) -> Tuple[Optional[str], bool]:
+        """(handle, created) for a prefix, or (None, False) when it is too short to cache"""
+        if _estimate_tokens(system_instruction + prefix) < self.min_tokens:
+            return None, False
+
+        key = prefix_key(model_id, system_instruction, prefix)
+        store = get_shared_store()
+        cached = await run_in_threadpool(store.get, "context_cache", key)
+        if cached is not None:
+            return cached.decode("utf-8"), False
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = await run_in_threadpool(store.get, "context_cache", key)
+            if cached is not None:
+                return cached.decode("utf-8"), False
+
+            from google.genai import types
+            try:
+                content = await self._get_client().aio.caches.create(
+                    model=model_id,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_instruction,
+                        contents=[prefix],
+                        ttl=f"{self.ttl}s",
+                        display_name=f"prefix-{key[:16]}"
+                    )
+                )
+            finally:
+                self._locks.pop(key, None)
+            # Stop handing out the name a little before the model side expires it
+            await run_in_threadpool(store.set, "context_cache", key, content.name.encode("utf-8"), max(1, self.ttl - 60))
+            return content.name, True
+
+    def attach(self, agent_factory: Callable, handle: str, suffix: str):
+        return agent_factory(cached_content=handle), suffix
+
+
+_context_cache = None
+_context_cache_lock = threading.Lock()
+
+
+def get_context_cache():
+    """Get the configured context cache backend, or None when context caching is off"""
+    global _context_cache
+    if settings.CONTEXT_CACHE_BACKEND == "off":
+        return None
+    if _context_cache is None:
+        with _context_cache_lock:
+            if _context_cache is None:
+                if settings.CONTEXT_CACHE_BACKEND == "local":
+                    _context_cache = LocalContextCache(settings.CONTEXT_CACHE_TTL_SECONDS)
+                else:
+                    _context_cache = GeminiContextCache(settings.CONTEXT_CACHE_TTL_SECONDS, settings.CONTEXT_CACHE_MIN_TOKENS)
+    return _context_cache
+
+
+async def prepare_cached_prompt(namespace: str, agent_factory: Callable, prefix: str, suffix: str):
+    """Agent and prompt for a request made of a static prefix and a per-request suffix
+
+    The prefix (with the agent description) is cached on first use; later requests with the
+    same prefix send only their suffix. Without a usable cache, or if creating the cache
+    fails, the full prompt is sent to a regular agent.
+    """
+    agent = agent_factory()
+    cache = get_context_cache()
+    labels = {"namespace": namespace}
+    if cache is None:
+        return agent, prefix + suffix
+
+    system_instruction = getattr(agent, "description", None) or ""
+    model_id = getattr(getattr(agent, "model", None), "id", "") or ""
+    try:
+        handle, created = await cache.handle_for(model_id, system_instruction, prefix)
+    except Exception:
+        logger.exception("Could not create a cached context for %s, sending the full prompt", namespace)
+        handle, created = None, False
+
+    if handle is None:
+        context_cache_requests_total.inc(labels={**labels, "result": "skipped"})
+        return agent, prefix + suffix
+
+    context_cache_requests_total.inc(labels={**labels, "result": "miss" if created else "hit"})
+    if not created:
+        context_cache_tokens_saved_total.inc(_estimate_tokens(system_instruction + prefix), labels=labels)
+    return cache.attach(agent_factory, handle, suffix)
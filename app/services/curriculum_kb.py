@@ -0,0 +1,323 @@
+"""
+Local curriculum knowledge base: an inverted index over curriculum standards with BM25 ranking.
+
+Build the index from a directory of .txt, .md and .jsonl files:
+
+    python -m app.services.curriculum_kb build corpus/ --output data/curriculum_index.json
+
+Text files may start with "curriculum: ...", "subject: ..." and "grade: ..." lines; their
+body is split into passages at headings and blank lines. JSONL files hold one passage per
+line with a "text" field and optional "title", "curriculum", "subject" and "grade" fields.
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.services.metrics import metrics
+
+INDEX_VERSION = 1
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Passages longer than this are split further when ingesting text files
+MAX_PASSAGE_CHARS = 1500
+
+METADATA_FIELDS = ("curriculum", "subject", "grade")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the their "
+    "them these this to was were will with students student should can able".split()
+)
+
+TOKEN = re.compile(r"[a-z0-9]+")
+HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$")
+METADATA_LINE = re.compile(r"^\s*(curriculum|subject|grade)\s*:\s*(.+?)\s*$", re.IGNORECASE)
+
+search_seconds = metrics.histogram(
+    "curriculum_search_seconds",
+    "Curriculum knowledge base retrieval latency",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _normalize_grade(value: str) -> str:
+    """Grade values such as "Grade 8" compare by their number when they have one"""
+    digits = re.findall(r"\d+", value)
+    return digits[0] if digits else value.strip().lower()
+
+
+def _metadata_matches(passage: dict, filters: Dict[str, str]) -> bool:
+    """Passages without a value for a field match any filter on it"""
+    for field, wanted in filters.items():
+        value = passage.get(field)
+        if not value or not wanted:
+            continue
+        if field == "grade":
+            if _normalize_grade(value) != _normalize_grade(wanted):
+                return False
+        elif value.lower() not in wanted.lower() and wanted.lower() not in value.lower():
+            return False
+    return True
+
+
+def _split_passages(body: str) -> Iterator[tuple]:
+    """Yield (title, text) passages split at markdown headings and paragraph boundaries"""
+    title = ""
+    paragraphs: List[str] = []
+
+    def flush():
+        current = ""
+        for paragraph in paragraphs:
+            if current and len(current) + len(paragraph) > MAX_PASSAGE_CHARS:
+                yield title, current
+                current = paragraph
+            else:
+                current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current:
+            yield title, current
+
+    block: List[str] = []
+    for line in body.splitlines() + [""]:
+        heading = HEADING.match(line)
+        if heading or not line.strip():
+            if block:
+                paragraphs.append("\n".join(block).strip())
+                block = []
+            if heading:
+                yield from flush()
+                paragraphs = []
+                title = heading.group(1).strip()
+            continue
+        block.append(line)
+    yield from flush()
+
+
+def _read_text_file(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = f.read().splitlines()
+
+    # Leading "field: value" lines describe every passage in the file
+    metadata = {}
+    while lines and (METADATA_LINE.match(lines[0]) or (metadata and not lines[0].strip())):
+        match = METADATA_LINE.match(lines.pop(0))
+        if match:
+            metadata[match.group(1).lower()] = match.group(2)
+
+    default_title = os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+    for title, text in _split_passages("\n".join(lines)):
+        yield {"title": title or default_title, "text": text, "source": path, **metadata}
+
+
+def _read_jsonl_file(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not record.get("text"):
+                continue
+            passage = {"title": record.get("title", ""), "text": record["text"], "source": f"{path}:{line_number}"}
+            passage.update({field: str(record[field]) for field in METADATA_FIELDS if record.get(field)})
+            yield passage
+
+
+def iter_corpus(corpus_dir: str) -> Iterator[dict]:
+    """Yield passages from every supported file under corpus_dir"""
+    for root, _, files in sorted(os.walk(corpus_dir)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            extension = os.path.splitext(name)[1].lower()
+            if extension in (".txt", ".md"):
+                yield from _read_text_file(path)
+            elif extension == ".jsonl":
+                yield from _read_jsonl_file(path)
+
+
+def build_index(passages: Iterator[dict]) -> dict:
+    """Build the serializable inverted index for a set of passages"""
+    docs: List[dict] = []
+    postings: Dict[str, List[List[int]]] = {}
+    for passage in passages:
+        # Metadata is matched by filters rather than indexed, otherwise terms like "grade" or
+        # the curriculum name would have postings covering most of the corpus
+        counts = Counter(tokenize(f"{passage.get('title', '')} {passage['text']}"))
+        doc_id = len(docs)
+        docs.append({**passage, "length": sum(counts.values())})
+        for term, count in counts.items():
+            postings.setdefault(term, []).append([doc_id, count])
+
+    return {
+        "version": INDEX_VERSION,
+        "built_at": time.time(),
+        "docs": docs,
+        "postings": postings
+    }
+
+
+class CurriculumIndex:
+    """In-memory BM25 retriever over a built index"""
+
+    def __init__(self, data: dict):
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError("Unsupported curriculum index version, rebuild the index")
+        self.docs: List[dict] = data["docs"]
+        self.postings: Dict[str, List[List[int]]] = data["postings"]
+        total_length = sum(doc["length"] for doc in self.docs)
+        self.average_length = total_length / len(self.docs) if self.docs else 0.0
+
+        # Precompute IDF and per-document length normalization once at load time
+        count = len(self.docs)
+        self.idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        self.length_norm = [
+            K1 * (1 - B + B * doc["length"] / self.average_length) if self.average_length else K1
+            for doc in self.docs
+        ]
+
+    @classmethod
+    def load(cls, path: str) -> "CurriculumIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def search(self, query: str, limit: int = 5, **filters: Optional[str]) -> List[dict]:
+        """Top passages for a query, restricted to passages compatible with the metadata filters"""
+        started = time.perf_counter()
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, frequency in self.postings[term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + self.length_norm[doc_id])
+
+        active_filters = {field: value for field, value in filters.items() if value}
+        ranked = heapq.nlargest(
+            limit,
+            (
+                (score, doc_id) for doc_id, score in scores.items()
+                if not active_filters or _metadata_matches(self.docs[doc_id], active_filters)
+            )
+        )
+        search_seconds.observe(time.perf_counter() - started)
+        return [{**self.docs[doc_id], "score": round(score, 4)} for score, doc_id in ranked]
+
+
+_index: Optional[CurriculumIndex] = None
+_index_mtime: Optional[float] = None
+_index_lock = threading.Lock()
+
+
+def get_curriculum_index() -> Optional[CurriculumIndex]:
+    """Get the curriculum index, loading it lazily and again whenever the file is rebuilt
+
+    Returns None when no index has been built.
+    """
+    global _index, _index_mtime
+    try:
+        mtime = os.path.getmtime(settings.CURRICULUM_INDEX_PATH)
+    except OSError:
+        return None
+    if _index is None or mtime != _index_mtime:
+        with _index_lock:
+            if _index is None or mtime != _index_mtime:
+                _index = CurriculumIndex.load(settings.CURRICULUM_INDEX_PATH)
+                _index_mtime = mtime
+    return _index
+
+
+def format_passages(passages: List[dict]) -> str:
+    lines = []
+    for passage in passages:
+        context = ", ".join(passage[field] for field in METADATA_FIELDS if passage.get(field))
+        heading = f"{passage['title']} ({context})" if context else passage["title"]
+        lines.append(f"- {heading}: {passage['text']}")
+    return "\n".join(lines)
+
+
+def search_curriculum_standards(query: str, curriculum: str = "", subject: str = "", grade: str = "", limit: int = 5) -> str:
+    """Search the local curriculum knowledge base for standards and learning objectives.
+
+    Args:
+        query: Topic or standard to look up, e.g. "fractions word problems".
+        curriculum: Curriculum name to restrict results to, e.g. "CBSE".
+        subject: Subject to restrict results to, e.g. "Mathematics".
+        grade: Grade to restrict results to, e.g. "Grade 5".
+        limit: Maximum number of passages to return.
+
+    Returns:
+        Matching curriculum passages, one per line.
+    """
+    index = get_curriculum_index()
+    if index is None:
+        return "The curriculum knowledge base is not available."
+    passages = index.search(query, limit=max(1, min(limit, 20)), curriculum=curriculum, subject=subject, grade=grade)
+    return format_passages(passages) or "No matching curriculum standards found."
+
+
+def standards_context(curriculum: str, subject: str, grade: str, topic: Optional[str] = None) -> str:
+    """Prompt block with the standards most relevant to a request, or "" without an index"""
+    index = get_curriculum_index()
+    if index is None:
+        return ""
+    query = " ".join(filter(None, [topic, subject]))
+    passages = index.search(query, limit=settings.CURRICULUM_CONTEXT_PASSAGES, curriculum=curriculum, subject=subject, grade=grade)
+    if not passages:
+        return ""
+    return "Relevant curriculum standards (from the local knowledge base):\n" + format_passages(passages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the local curriculum knowledge base")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index a corpus directory of .txt, .md and .jsonl files")
+    build.add_argument("corpus_dir")
+    build.add_argument("--output", default=settings.CURRICULUM_INDEX_PATH)
+
+    search = commands.add_parser("search", help="Query a built index")
+    search.add_argument("query")
+    search.add_argument("--curriculum", default="")
+    search.add_argument("--subject", default="")
+    search.add_argument("--grade", default="")
+    search.add_argument("--limit", type=int, default=5)
+    search.add_argument("--index", default=settings.CURRICULUM_INDEX_PATH)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        started = time.perf_counter()
+        index = build_index(iter_corpus(args.corpus_dir))
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        # Write to a temporary file first so running workers never load a partial index
+        temporary = f"{args.output}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary, args.output)
+        print(
+            f"Indexed {len(index['docs'])} passages ({len(index['postings'])} terms) "
+            f"into {args.output} in {time.perf_counter() - started:.2f} s"
+        )
+    else:
+        index = CurriculumIndex.load(args.index)
+        for passage in index.search(args.query, args.limit, curriculum=args.curriculum, subject=args.subject, grade=args.grade):
+            print(f"[{passage['score']}] {passage['title']} ({passage['source']})\n    {passage['text'][:200]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import codecs
+import hashlib
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import Iterator
+from xml.etree import ElementTree
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.metrics import metrics
+from app.services.shared_store import get_shared_store
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF extraction is optional
+    PdfReader = None
+
+TEXT_NAMESPACE = "document_text"
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+SUPPORTED_TYPES = {
+    ".pdf": "pdf",
+    ".docx": "docx",
+    ".txt": "txt",
+    ".md": "txt",
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/plain": "txt",
+    "text/markdown": "txt"
+}
+
+uploads_total = metrics.counter(
+    "document_uploads_total",
+    "Uploaded documents by type and whether text extraction was skipped (dedup hit)"
+)
+
+
+@dataclass
+class ExtractedDocument:
+    filename: str
+    sha256: str
+    size: int
+    text: str
+
+
+def document_kind(upload: UploadFile) -> str:
+    """Resolve the document type from the file extension, falling back to the content type"""
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    kind = SUPPORTED_TYPES.get(extension) or SUPPORTED_TYPES.get((upload.content_type or "").split(";")[0])
+    if kind is None:
+        raise HTTPException(status_code=415, detail="Unsupported document type, upload a PDF, DOCX or TXT file")
+    return kind
+
+
+async def spool_upload(upload: UploadFile) -> tuple:
+    """Copy an upload to a spool file chunk by chunk, hashing it on the way
+
+    Returns (path, sha256, size). The caller owns the spool file and must delete it.
+    """
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=settings.UPLOAD_SPOOL_DIR, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = await upload.read(settings.UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Uploaded document is too large")
+                digest.update(chunk)
+                await run_in_threadpool(spool.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def _iter_txt(path: str) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(settings.UPLOAD_CHUNK_BYTES)
+            if not block:
+                break
+            yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def _iter_docx(path: str) -> Iterator[str]:
+    """Stream paragraphs out of word/document.xml without loading the whole tree"""
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise ValueError("File is not a valid DOCX document")
+    with archive, archive.open("word/document.xml") as document:
+        paragraph = []
+        for event, element in ElementTree.iterparse(document, events=("end",)):
+            if element.tag == f"{WORD_NAMESPACE}t" and element.text:
+                paragraph.append(element.text)
+            elif element.tag == f"{WORD_NAMESPACE}tab":
+                paragraph.append("\t")
+            elif element.tag == f"{WORD_NAMESPACE}p":
+                yield "".join(paragraph) + "\n"
+                paragraph = []
+                # Free parsed paragraphs as we go
+                element.clear()
+
+
+def _iter_pdf(path: str) -> Iterator[str]:
+    if PdfReader is None:
+        raise ValueError("PDF support requires the pypdf package")
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield (page.extract_text() or "") + "\n\n"
+
+
+EXTRACTORS = {"txt": _iter_txt, "docx": _iter_docx, "pdf": _iter_pdf}
+
+
+def extract_text(path: str, kind: str, max_chars: int) -> str:
+    """Extract text incrementally, stopping once max_chars have been collected"""
+    parts = []
+    collected = 0
+    for piece in EXTRACTORS[kind](path):
+        parts.append(piece)
+        collected += len(piece)
+        if collected >= max_chars:
+            break
+    return "".join(parts)[:max_chars].strip()
+
+
+async def extract_upload(upload: UploadFile, max_chars: int) -> ExtractedDocument:
+    """Spool an uploaded document to disk and extract its text
+
+    Extraction results are cached by the document's content hash, so re-uploading the
+    same file (from any worker) skips extraction entirely.
+    """
+    kind = document_kind(upload)
+    path, sha256, size = await spool_upload(upload)
+    store = get_shared_store()
+    try:
+        cached = await run_in_threadpool(store.get, TEXT_NAMESPACE, sha256)
+        if cached is not None:
+            uploads_total.inc(labels={"kind": kind, "dedup": "hit"})
+            text = cached.decode("utf-8")
+        else:
+            uploads_total.inc(labels={"kind": kind, "dedup": "miss"})
+            try:
+                # Parsing is CPU-bound, keep it off the event loop
+                text = await run_in_threadpool(extract_text, path, kind, max_chars)
+            except Exception as e:
+                raise HTTPException(status_code=422, detail=f"Could not extract text from document: {str(e)}")
+            await run_in_threadpool(store.set, TEXT_NAMESPACE, sha256, text.encode("utf-8"), settings.DOCUMENT_TEXT_TTL_SECONDS)
+    finally:
+        os.unlink(path)
+
+    return ExtractedDocument(filename=upload.filename or "uploaded document", sha256=sha256, size=size, text=text)
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.drain import drain_state
+from app.services.context_cache import prepare_cached_prompt
+from app.services.metrics import metrics
+from app.services.output_budget import apply_token_limit, record_output
+from app.services.saturation import saturation
+from app.services.shared_store import get_shared_store
+
+logger = logging.getLogger("app.generation")
+
+CACHE_NAMESPACE = "response_cache"
+
+cache_requests_total = metrics.counter(
+    "response_cache_requests_total",
+    "Response cache lookups by endpoint namespace and result (hit or miss)"
+)
+generation_seconds = metrics.histogram(
+    "generation_duration_seconds",
+    "Duration of completed upstream model calls by endpoint namespace"
+)
+generations_cancelled_total = metrics.counter(
+    "generations_cancelled_total",
+    "Upstream model calls cancelled because every caller disconnected or hit its deadline"
+)
+cancelled_seconds_saved_total = metrics.counter(
+    "generation_cancelled_seconds_saved_total",
+    "Estimated upstream seconds saved by cancellation (mean completed duration minus time already spent)"
+)
+
+# Identifies this process as a lease owner in the shared store
+_WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class _Inflight:
+    """A generation running in this process and the number of callers awaiting it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+# Generations in flight in this process, keyed by cache key
+_inflight: Dict[str, _Inflight] = {}
+
+
+def cache_key(namespace: str, prompt: str) -> str:
+    """Build the shared cache key for a prompt sent to an endpoint's agent"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def extract_content(response) -> str:
+    """Extract the generated text from an agent RunResponse object"""
+    if hasattr(response, 'content'):
+        return response.content
+    elif hasattr(response, 'text'):
+        return response.text
+    else:
+        return str(response)
+
+
+async def generate_content(
+    namespace: str,
+    prompt: str,
+    agent_factory: Callable,
+    cache_ttl: Optional[int] = None,
+    output_budget: Optional[int] = None,
+    context_prefix: Optional[str] = None
+) -> str:
+    """Run an agent prompt, sharing cached and in-flight results across requests and workers
+
+    Identical prompts are answered from the shared response cache (for cache_ttl seconds,
+    RESPONSE_CACHE_TTL_SECONDS by default). Concurrent identical prompts are coalesced:
+    within a process they await the same task, across processes one worker holds a lease
+    in the shared store while the others wait for its result. When every caller awaiting a
+    generation is cancelled (client disconnect or deadline), the upstream call is cancelled.
+
+    output_budget, computed from the request parameters, caps the model's output tokens;
+    output that runs into the cap is returned but not cached.
+
+    With context_prefix, the full prompt is context_prefix + prompt; the prefix is static
+    across requests and is cached on the model side, so only prompt is sent each time.
+    """
+    key = cache_key(namespace, (context_prefix or "") + prompt)
+    store = get_shared_store()
+
+    # Shared store calls are SQLite I/O, kept off the event loop
+    cached = await run_in_threadpool(store.get, CACHE_NAMESPACE, key)
+    if cached is not None:
+        cache_requests_total.inc(labels={"namespace": namespace, "result": "hit"})
+        return cached.decode("utf-8")
+    cache_requests_total.inc(labels={"namespace": namespace, "result": "miss"})
+
+    # Coalesce with an identical generation already running in this process; the
+    # generation runs as its own task so one caller going away does not cancel it for
+    # the others
+    inflight = _inflight.get(key)
+    if inflight is None:
+        ttl = settings.RESPONSE_CACHE_TTL_SECONDS if cache_ttl is None else cache_ttl
+        inflight = _Inflight(asyncio.ensure_future(_generate_once(namespace, key, prompt, agent_factory, ttl, output_budget, context_prefix)))
+        _inflight[key] = inflight
+        inflight.task.add_done_callback(lambda _: _inflight.pop(key, None) if _inflight.get(key) is inflight else None)
+
+    inflight.waiters += 1
+    try:
+        return await asyncio.shield(inflight.task)
+    except asyncio.CancelledError:
+        # Cancel the upstream call once nobody is waiting for its result any more, unless the
+        # worker is draining: then it finishes and is cached for the client's retry
+        if inflight.waiters == 1 and not inflight.task.done() and not drain_state.draining:
+            inflight.task.cancel()
+        raise
+    finally:
+        inflight.waiters -= 1
+
+
+def _record_cancelled(labels: Dict[str, str], elapsed: float):
+    generations_cancelled_total.inc(labels=labels)
+    completed = generation_seconds.snapshot(labels)
+    if completed["count"]:
+        cancelled_seconds_saved_total.inc(max(0.0, completed["sum"] / completed["count"] - elapsed), labels=labels)
+
+
+async def _generate_once(
+    namespace: str,
+    key: str,
+    prompt: str,
+    agent_factory: Callable,
+    cache_ttl: int,
+    output_budget: Optional[int],
+    context_prefix: Optional[str]
+) -> str:
+    """Generate content for a key, or wait for another worker that is already generating it"""
+    store = get_shared_store()
+    lease_name = f"generate:{key}"
+
+    with saturation.waiting():
+        while not await run_in_threadpool(store.acquire_lease, lease_name, _WORKER_ID, settings.COALESCE_LEASE_SECONDS):
+            # Another worker owns this generation, poll for its result
+            await asyncio.sleep(0.25)
+            cached = await run_in_threadpool(store.get, CACHE_NAMESPACE, key)
+            if cached is not None:
+                return cached.decode("utf-8")
+
+    try:
+        # The previous owner may have finished between our last poll and the lease
+        cached = await run_in_threadpool(store.get, CACHE_NAMESPACE, key)
+        if cached is not None:
+            return cached.decode("utf-8")
+
+        # Use the async run so the model call never blocks the event loop
+        if context_prefix is not None:
+            agent, prompt = await prepare_cached_prompt(namespace, agent_factory, context_prefix, prompt)
+        else:
+            agent = agent_factory()
+        if output_budget:
+            limit = apply_token_limit(agent, output_budget)
+        labels = {"namespace": namespace}
+        started = time.monotonic()
+        try:
+            with saturation.upstream_call():
+                response = await agent.arun(prompt)
+        except asyncio.CancelledError:
+            _record_cancelled(labels, time.monotonic() - started)
+            raise
+        generation_seconds.observe(time.monotonic() - started, labels=labels)
+        content = extract_content(response)
+
+        truncated = False
+        if output_budget:
+            truncated = record_output(namespace, output_budget, limit, response, content)
+            if truncated:
+                # A cut-off response is still returned, but a retry should get a fresh one
+                logger.warning("Output for %s reached its %d token limit and may be truncated", namespace, limit)
+
+        if content is not None and cache_ttl > 0 and not truncated:
+            await run_in_threadpool(store.set, CACHE_NAMESPACE, key, content.encode("utf-8"), cache_ttl)
+        return content
+    finally:
+        await run_in_threadpool(store.release_lease, lease_name, _WORKER_ID)
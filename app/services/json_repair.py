@@ -0,0 +1,160 @@
+import json
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from app.services.agent import get_json_repair_agent
+from app.services.generation import generate_content
+from app.services.long_content import estimate_tokens
+from app.services.metrics import metrics
+from app.services.output_budget import json_repair_budget
+
+logger = logging.getLogger("app.json_repair")
+
+# Candidate cut points tried when closing a truncated reply, from the end backwards
+MAX_TRUNCATION_CANDIDATES = 50
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|$)", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+json_replies_total = metrics.counter(
+    "json_replies_total",
+    "JSON model replies by namespace and how they were parsed (valid, local_repair, model_repair or failed)"
+)
+repair_tokens_total = metrics.counter(
+    "json_repair_tokens_total",
+    "Estimated tokens (input and output) spent on repair calls, by namespace"
+)
+regeneration_tokens_total = metrics.counter(
+    "json_repair_regeneration_tokens_total",
+    "Estimated tokens a full regeneration would have cost for the replies that were repaired, by namespace"
+)
+
+
+def _loads_object(text: str) -> Optional[dict]:
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _fragment(reply: str) -> Optional[str]:
+    """The JSON object part of a reply: fences and surrounding prose removed"""
+    fenced = FENCE.search(reply)
+    if fenced and "{" in fenced.group(1):
+        reply = fenced.group(1)
+    start = reply.find("{")
+    if start < 0:
+        return None
+    end = reply.rfind("}")
+    fragment = reply[start:end + 1] if end > start else ""
+    if not fragment or fragment.count("{") > fragment.count("}"):
+        # Cut off before the closing brace: keep everything after the opening one
+        fragment = reply[start:]
+    return fragment
+
+
+def _truncation_candidates(text: str) -> List[str]:
+    """Versions of a truncated object closed at its end and at earlier commas, latest first"""
+    stack: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    in_string = escape = False
+    for position, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+        elif char == ",":
+            cuts.append((position, "".join(reversed(stack))))
+
+    candidates = []
+    closing = "".join(reversed(stack))
+    if in_string:
+        candidates.append(text + '"' + closing)
+    candidates.append(re.sub(r"[,:\s]+$", "", text) + closing)
+    for position, closers in reversed(cuts[-MAX_TRUNCATION_CANDIDATES:]):
+        candidates.append(text[:position] + closers)
+    return candidates
+
+
+def repair_locally(reply: str) -> Optional[dict]:
+    """Parse a reply with local fixes only: fences, surrounding text, trailing commas, truncation"""
+    fragment = _fragment(reply)
+    if fragment is None:
+        return None
+    for candidate in (fragment, TRAILING_COMMA.sub(r"\1", fragment)):
+        parsed = _loads_object(candidate)
+        if parsed is not None:
+            return parsed
+    for candidate in _truncation_candidates(TRAILING_COMMA.sub(r"\1", fragment)):
+        parsed = _loads_object(TRAILING_COMMA.sub(r"\1", candidate))
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def _repair_prompt(fragment: str) -> str:
+    return f"""
+        The following text was meant to be a single JSON object but is not valid JSON.
+        Fix only the syntax (quotes, escaping, commas, brackets) without changing, adding or
+        removing any content, and respond with the corrected JSON only.
+
+        {fragment}
+        """
+
+
+async def parse_json_reply(namespace: str, reply: str, prompt: str = "") -> dict:
+    """Parse a model's JSON reply, repairing it when needed
+
+    Local fixes are tried first; if they are not enough, only the malformed fragment is
+    sent to a small repair call instead of regenerating the whole reply from prompt.
+    Raises ValueError when the reply cannot be recovered.
+    """
+    labels = {"namespace": namespace}
+    fragment = _fragment(reply)
+    if fragment is not None:
+        parsed = _loads_object(fragment)
+        if parsed is not None:
+            json_replies_total.inc(labels={**labels, "result": "valid"})
+            return parsed
+
+    parsed = repair_locally(reply)
+    if parsed is not None:
+        json_replies_total.inc(labels={**labels, "result": "local_repair"})
+        regeneration_tokens_total.inc(estimate_tokens(prompt) + estimate_tokens(reply), labels=labels)
+        return parsed
+    if fragment is None:
+        json_replies_total.inc(labels={**labels, "result": "failed"})
+        raise ValueError("No valid JSON found in response")
+
+    repair_prompt = _repair_prompt(fragment)
+    try:
+        repaired = await generate_content(
+            "json_repair",
+            repair_prompt,
+            get_json_repair_agent,
+            output_budget=json_repair_budget(fragment)
+        )
+    except Exception:
+        logger.exception("JSON repair call failed for %s", namespace)
+        repaired = ""
+    repair_tokens_total.inc(estimate_tokens(repair_prompt) + estimate_tokens(repaired or ""), labels=labels)
+
+    parsed = repair_locally(repaired or "")
+    if parsed is None:
+        json_replies_total.inc(labels={**labels, "result": "failed"})
+        raise ValueError("Could not repair the JSON in the response")
+    json_replies_total.inc(labels={**labels, "result": "model_repair"})
+    regeneration_tokens_total.inc(estimate_tokens(prompt) + estimate_tokens(reply), labels=labels)
+    return parsed
@@ -0,0 +1,115 @@
+import asyncio
+import re
+from typing import List
+
+from app.core.config import settings
+from app.services.agent import get_content_digest_agent
+from app.services.generation import generate_content
+from app.services.metrics import metrics
+from app.services.output_budget import content_digest_budget
+from app.services.saturation import saturation
+
+digests_total = metrics.counter(
+    "long_content_digests_total",
+    "Long inputs condensed into a digest before prompting, by purpose"
+)
+chunks_total = metrics.counter(
+    "long_content_chunks_total",
+    "Chunks summarized while condensing long inputs, by purpose"
+)
+input_tokens_saved_total = metrics.counter(
+    "long_content_input_tokens_saved_total",
+    "Estimated prompt input tokens saved by sending a digest instead of the full input"
+)
+
+# What each kind of condensed input is, as described to the summarizer
+PURPOSE_DESCRIPTIONS = {
+    "syllabus": "a course syllabus",
+    "assessment_source": "source material for an assessment"
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for Gemini-style tokenizers (about 4 characters per token)"""
+    return len(text) // 4
+
+
+def chunk_text(text: str, chunk_chars: int) -> List[str]:
+    """Split text into chunks of at most chunk_chars, preferring paragraph and sentence breaks"""
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= chunk_chars:
+            pieces.append(paragraph)
+            continue
+        # Oversized paragraph: fall back to sentences, then to hard splits
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while len(sentence) > chunk_chars:
+                pieces.append(sentence[:chunk_chars])
+                sentence = sentence[chunk_chars:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > chunk_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _summary_prompt(chunk: str, purpose: str) -> str:
+    # The prompt depends only on the chunk and purpose, so its cache key is a content hash
+    # and a chunk shared by two uploads (e.g. the same chapter) is summarized once
+    return f"""
+        Condense the following excerpt of {PURPOSE_DESCRIPTIONS.get(purpose, purpose)} into compact notes.
+
+        Keep every topic, learning objective, definition, formula, date and key fact.
+        Drop examples, repetition and filler. Use short bullet points, no introduction.
+
+        EXCERPT:
+        {chunk}
+        """
+
+
+async def condense_content(text: str, purpose: str) -> str:
+    """Return text unchanged if it is short, otherwise a digest built by map-reduce
+
+    Long text is split into chunks that are summarized concurrently (bounded by
+    CONTENT_DIGEST_CONCURRENCY); summaries are cached by chunk content, so repeated
+    or partially repeated inputs only summarize the chunks that are new.
+    """
+    if len(text) <= settings.LONG_CONTENT_THRESHOLD_CHARS:
+        return text
+
+    chunks = chunk_text(text, settings.CONTENT_CHUNK_CHARS)
+    semaphore = asyncio.Semaphore(max(1, settings.CONTENT_DIGEST_CONCURRENCY))
+
+    async def summarize(chunk: str) -> str:
+        async with saturation.slot(semaphore):
+            return await generate_content(
+                "content_digest",
+                _summary_prompt(chunk, purpose),
+                get_content_digest_agent,
+                cache_ttl=settings.CHUNK_SUMMARY_TTL_SECONDS,
+                output_budget=content_digest_budget(chunk)
+            )
+
+    summaries = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+    digest = "\n\n".join(
+        f"[Part {index} of {len(chunks)}]\n{summary.strip()}"
+        for index, summary in enumerate(summaries, start=1)
+    )
+
+    labels = {"purpose": purpose}
+    digests_total.inc(labels=labels)
+    chunks_total.inc(len(chunks), labels=labels)
+    input_tokens_saved_total.inc(max(0, estimate_tokens(text) - estimate_tokens(digest)), labels=labels)
+    return digest
@@ -0,0 +1,216 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from app.schemas.sections import DocumentSection
+
+# "## 1. Learning Objectives" style markdown headings
+MARKDOWN_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+
+# "**1. LEARNING OBJECTIVES**" or "1. LEARNING OBJECTIVES" lines used as headings
+NUMBERED_HEADING = re.compile(r"^\s{0,3}(\*\*|__)?\s*(\d{1,2})[.)]\s+(.+?)\s*(?:\*\*|__)?\s*:?\s*$")
+
+# Level given to numbered headings that are not markdown headings
+NUMBERED_HEADING_LEVEL = 3
+
+SECTION_CACHE_SIZE = 512
+
+
+def slugify(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def _split_number(title: str):
+    """Split a leading "N." off a heading title"""
+    match = re.match(r"^(\d{1,2})[.)]\s+(.*)$", title)
+    if match:
+        return int(match.group(1)), match.group(2).strip()
+    return None, title
+
+
+def _clean_title(title: str) -> str:
+    return title.strip().strip("*_").strip().rstrip(":").strip()
+
+
+def _match_heading(line: str):
+    """Return (level, number, title) when the line is a section heading, otherwise None"""
+    match = MARKDOWN_HEADING.match(line)
+    if match:
+        number, title = _split_number(_clean_title(match.group(2)))
+        return len(match.group(1)), number, title
+
+    match = NUMBERED_HEADING.match(line)
+    if match:
+        emphasized, title = match.group(1), _clean_title(match.group(3))
+        letters = [c for c in title if c.isalpha()]
+        # Ordered list items look the same; only bold or ALL-CAPS titles are headings
+        if emphasized or (letters and sum(c.isupper() for c in letters) / len(letters) > 0.8):
+            return NUMBERED_HEADING_LEVEL, int(match.group(2)), title
+    return None
+
+
+def parse_sections(markdown: str) -> List[DocumentSection]:
+    """Parse generated markdown into a tree of sections based on its headings"""
+    roots: List[DocumentSection] = []
+    stack: List[DocumentSection] = []
+    body: List[str] = []
+    in_code_block = False
+
+    def flush():
+        if stack:
+            stack[-1].content = "\n".join(body).strip()
+        body.clear()
+
+    for line in (markdown or "").splitlines():
+        if line.lstrip().startswith("```"):
+            in_code_block = not in_code_block
+        heading = None if in_code_block else _match_heading(line)
+        if heading is None:
+            body.append(line)
+            continue
+
+        flush()
+        level, number, title = heading
+        section = DocumentSection(number=number, key=slugify(title), title=title, level=level, content="")
+        while stack and stack[-1].level >= level:
+            stack.pop()
+        if stack:
+            stack[-1].subsections.append(section)
+        else:
+            roots.append(section)
+        stack.append(section)
+
+    flush()
+    return roots
+
+
+_cache: "OrderedDict[str, List[DocumentSection]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_sections(artifact_id: str, markdown: str) -> List[DocumentSection]:
+    """Parsed sections of an artifact, parsed once and cached by its content-addressed id"""
+    with _cache_lock:
+        sections = _cache.get(artifact_id)
+        if sections is not None:
+            _cache.move_to_end(artifact_id)
+            return sections
+
+    sections = parse_sections(markdown)
+    with _cache_lock:
+        _cache[artifact_id] = sections
+        while len(_cache) > SECTION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return sections
+
+
+def _matches_heading(number: Optional[int], key: str, selector: str) -> bool:
+    if selector.isdigit():
+        return number == int(selector)
+    return key == selector or key.startswith(selector)
+
+
+def _matches(section: DocumentSection, selector: str) -> bool:
+    return _matches_heading(section.number, section.key, selector)
+
+
+def _normalize_selector(selector: str) -> str:
+    return selector.strip() if selector.strip().isdigit() else slugify(selector)
+
+
+def select_sections(sections: Sequence[DocumentSection], selectors: Sequence[str]) -> List[DocumentSection]:
+    """Pick sections by number or key (a key prefix also matches), searching the whole tree
+
+    Each selector matches at the shallowest depth where it finds anything, so "1" selects
+    the numbered section rather than a nested list item further down.
+    """
+    selected: List[DocumentSection] = []
+    seen = set()
+    for selector in (_normalize_selector(s) for s in selectors):
+        if not selector:
+            continue
+        level = list(sections)
+        while level:
+            found = [section for section in level if _matches(section, selector)]
+            if found:
+                for section in found:
+                    if id(section) not in seen:
+                        seen.add(id(section))
+                        selected.append(section)
+                break
+            level = [child for section in level for child in section.subsections]
+    return selected
+
+
+def parse_selectors(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query parameter into its non-empty items"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class SectionSpan(NamedTuple):
+    """Where a section sits in its markdown, as line indexes"""
+    start: int  # The heading line
+    end: int  # First line after the section and its subsections
+    depth: int
+    number: Optional[int]
+    title: str
+
+
+def section_spans(markdown: str) -> List[SectionSpan]:
+    """Every section of the markdown in document order, nested the way parse_sections nests them"""
+    lines = (markdown or "").splitlines()
+    headings: List[Tuple[int, int, int, Optional[int], str]] = []
+    levels: List[int] = []
+    in_code_block = False
+    for index, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_code_block = not in_code_block
+        heading = None if in_code_block else _match_heading(line)
+        if heading is None:
+            continue
+        level, number, title = heading
+        while levels and levels[-1] >= level:
+            levels.pop()
+        headings.append((index, level, len(levels), number, title))
+        levels.append(level)
+
+    spans = []
+    for position, (index, level, depth, number, title) in enumerate(headings):
+        end = next((later[0] for later in headings[position + 1:] if later[1] <= level), len(lines))
+        spans.append(SectionSpan(index, end, depth, number, title))
+    return spans
+
+
+def find_section(markdown: str, selector: str) -> Optional[SectionSpan]:
+    """The section a number or key picks, matched like select_sections (first match at the shallowest depth)"""
+    selector = _normalize_selector(selector)
+    if not selector:
+        return None
+    found = [span for span in section_spans(markdown) if _matches_heading(span.number, slugify(span.title), selector)]
+    return min(found, key=lambda span: span.depth) if found else None
+
+
+def section_text(markdown: str, span: SectionSpan) -> str:
+    """Body of a section, subsections included, without its heading"""
+    return "\n".join(markdown.splitlines()[span.start + 1:span.end]).strip()
+
+
+def replace_section(markdown: str, span: SectionSpan, content: str) -> str:
+    """The markdown with a section's body replaced, keeping its original heading line
+
+    A heading at the top of the new content is dropped, so a model echoing the section
+    title does not duplicate it.
+    """
+    lines = markdown.splitlines()
+    body = content.strip().splitlines()
+    if body and _match_heading(body[0]) is not None:
+        body = body[1:]
+    # Keep the document's spacing between a heading and its body
+    spacing = [""] if span.start + 1 < len(lines) and not lines[span.start + 1].strip() else []
+    replacement = [lines[span.start]] + spacing + "\n".join(body).strip().splitlines()
+    if span.end < len(lines):
+        replacement.append("")
+    return "\n".join(lines[:span.start] + replacement + lines[span.end:])
@@ -0,0 +1,155 @@
+from typing import Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.services.metrics import metrics
+
+# Output token buckets, from a short answer to a multi-class lesson plan
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000)
+
+# Responses using at least this share of their token limit are treated as cut off
+TRUNCATION_RATIO = 0.98
+
+budget_tokens = metrics.histogram(
+    "output_budget_tokens",
+    "Output token budget computed from the request parameters, by endpoint namespace",
+    buckets=TOKEN_BUCKETS
+)
+output_tokens = metrics.histogram(
+    "output_tokens",
+    "Output tokens actually generated (excluding thinking), by endpoint namespace",
+    buckets=TOKEN_BUCKETS
+)
+budget_utilization = metrics.histogram(
+    "output_budget_utilization_ratio",
+    "Generated output tokens divided by the output budget, by endpoint namespace",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 0.98, 1.0, 1.25, 1.5)
+)
+truncated_total = metrics.counter(
+    "output_truncated_total",
+    "Generations that ran into their output token limit, by endpoint namespace"
+)
+
+# Expected output size per difficulty level of a homework assignment
+HOMEWORK_TOKENS = {"easy": 1500, "medium": 2000, "hard": 2600}
+
+
+def _scaled(tokens: float, ceiling: int) -> int:
+    return max(256, min(ceiling, int(tokens * settings.OUTPUT_BUDGET_SCALE)))
+
+
+def lesson_plan_budget(number_of_classes: int) -> int:
+    """A shared introduction plus one fully detailed plan per class"""
+    return _scaled(1200 + 350 * number_of_classes, 9000)
+
+
+def term_plan_budget() -> int:
+    return _scaled(4000, 6000)
+
+
+def section_budget(section: str) -> int:
+    """A rewritten section, with room to grow a third beyond the current one"""
+    return _scaled(300 + len(section) / 3, 4000)
+
+
+def assessment_budget(mcq_count: int, short_question_count: int) -> int:
+    """A header plus four options per MCQ and a prompt per short question"""
+    return _scaled(300 + 110 * mcq_count + 80 * short_question_count, 6000)
+
+
+def _homework_tokens(difficulty_level: Optional[str]) -> int:
+    return HOMEWORK_TOKENS.get((difficulty_level or "medium").strip().lower(), HOMEWORK_TOKENS["medium"])
+
+
+def homework_budget(difficulty_level: Optional[str]) -> int:
+    return _scaled(_homework_tokens(difficulty_level), 4000)
+
+
+def homework_batch_budget(difficulty_levels: Iterable[Optional[str]]) -> int:
+    """One homework section per topic in a combined call"""
+    return _scaled(sum(_homework_tokens(level) for level in difficulty_levels), 24000)
+
+
+def assistant_budget() -> int:
+    return _scaled(1500, 3000)
+
+
+def assessment_eval_budget(assessment_data: str) -> int:
+    """Per-question feedback grows with the submission, about half its length in tokens"""
+    return _scaled(800 + len(assessment_data) / 8, 6000)
+
+
+def question_eval_budget(answer: str) -> int:
+    """Marks and feedback for a single answer"""
+    return _scaled(250 + len(answer) / 16, 1500)
+
+
+def eval_summary_budget() -> int:
+    return _scaled(900, 2000)
+
+
+def json_repair_budget(fragment: str) -> int:
+    """The corrected fragment, slightly longer than the malformed one"""
+    return _scaled(len(fragment) / 3, 8000)
+
+
+def content_digest_budget(chunk: str) -> int:
+    """A digest keeps about a third of the chunk"""
+    return _scaled(len(chunk) / 12, 4000)
+
+
+def apply_token_limit(agent, budget: int) -> int:
+    """Set the agent model's max_output_tokens for an output budget and return the limit
+
+    Gemini counts thinking tokens against max_output_tokens, so the model's thinking_budget
+    (or OUTPUT_THINKING_ALLOWANCE when it thinks dynamically) is added on top. A
+    max_output_tokens from the endpoint's model configuration still acts as a ceiling.
+    """
+    model = getattr(agent, "model", None)
+    thinking = getattr(model, "thinking_budget", None)
+    limit = budget + (thinking if thinking is not None else settings.OUTPUT_THINKING_ALLOWANCE)
+    configured = getattr(model, "max_output_tokens", None)
+    if configured:
+        limit = min(limit, configured)
+    if model is not None:
+        model.max_output_tokens = limit
+    return limit
+
+
+def token_usage(response) -> Optional[Tuple[int, int]]:
+    """(output, thinking) tokens reported by an agent run, or None when not reported"""
+    run_metrics = getattr(response, "metrics", None)
+    if run_metrics is None:
+        return None
+    if isinstance(run_metrics, dict):
+        # Per model call lists, one entry for every call made during the run
+        output = run_metrics.get("output_tokens")
+        thinking = run_metrics.get("reasoning_tokens") or 0
+        if output is None:
+            return None
+        output = output[-1] if isinstance(output, list) and output else output
+        thinking = thinking[-1] if isinstance(thinking, list) and thinking else thinking
+        return int(output or 0), int(thinking or 0)
+    output = getattr(run_metrics, "output_tokens", None)
+    if output is None:
+        return None
+    return int(output), int(getattr(run_metrics, "reasoning_tokens", 0) or 0)
+
+
+def record_output(namespace: str, budget: int, limit: int, response, content: Optional[str]) -> bool:
+    """Record budget against actual output for a completed generation; True when it was truncated"""
+    labels = {"namespace": namespace}
+    usage = token_usage(response)
+    if usage is None:
+        # No usage reported: estimate from the text (about 4 characters per token)
+        output, thinking = len(content or "") // 4, 0
+        truncated = output >= budget * TRUNCATION_RATIO
+    else:
+        output, thinking = usage
+        truncated = output + thinking >= limit * TRUNCATION_RATIO
+
+    budget_tokens.observe(budget, labels=labels)
+    output_tokens.observe(output, labels=labels)
+    budget_utilization.observe(output / budget, labels=labels)
+    if truncated:
+        truncated_total.inc(labels=labels)
+    return truncated
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.metrics import metrics
+from app.services.shared_store import get_shared_store
+
+logger = logging.getLogger("app.saturation")
+
+STORE_NAMESPACE = "saturation"
+
+# Identifies this process among the workers publishing their load
+_WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SaturationTracker:
+    """Live generation load of this worker: requests, upstream calls, queued work and recent outcomes
+
+    CPU stays near zero while workers wait on the model, so these are the signals to scale on.
+    The load factor is the busier of requests in flight and upstream calls plus queued work,
+    relative to WORKER_CONCURRENCY; 1.0 means the worker is at its planned capacity.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self.requests = 0
+        self.upstream = 0
+        self.queued = 0
+        # (finished at, duration, failed) of upstream calls within the window
+        self._calls: Deque[Tuple[float, float, bool]] = deque()
+
+    @contextmanager
+    def request(self):
+        """Count a generation request for as long as it is being served"""
+        self.requests += 1
+        try:
+            yield
+        finally:
+            self.requests -= 1
+
+    @contextmanager
+    def upstream_call(self):
+        """Count a running model call and record its latency and outcome; cancelled calls are not recorded"""
+        self.upstream += 1
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self._record(started, failed=True)
+            raise
+        else:
+            self._record(started, failed=False)
+        finally:
+            self.upstream -= 1
+
+    @contextmanager
+    def waiting(self):
+        """Count work waiting for a result being produced elsewhere"""
+        self.queued += 1
+        try:
+            yield
+        finally:
+            self.queued -= 1
+
+    @asynccontextmanager
+    async def slot(self, semaphore: asyncio.Semaphore):
+        """Hold a slot of a concurrency limit, counted as queued while waiting for it"""
+        with self.waiting():
+            await semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def _record(self, started: float, failed: bool):
+        now = time.monotonic()
+        self._calls.append((now, now - started, failed))
+        self._trim(now)
+
+    def _trim(self, now: float):
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+
+    def load_factor(self) -> float:
+        active = max(self.requests, self.upstream + self.queued)
+        return round(active / max(1, settings.WORKER_CONCURRENCY), 3)
+
+    def snapshot(self) -> dict:
+        self._trim(time.monotonic())
+        durations = [duration for _, duration, _ in self._calls]
+        failures = sum(1 for _, _, failed in self._calls if failed)
+        return {
+            "requests_in_flight": self.requests,
+            "upstream_in_flight": self.upstream,
+            "queue_depth": self.queued,
+            "upstream_calls": len(durations),
+            "upstream_latency_mean_seconds": round(sum(durations) / len(durations), 3) if durations else 0.0,
+            "upstream_latency_p95_seconds": round(_percentile(durations, 0.95), 3),
+            "upstream_error_rate": round(failures / len(durations), 3) if durations else 0.0,
+            "load_factor": self.load_factor()
+        }
+
+
+saturation = SaturationTracker(settings.SATURATION_WINDOW_SECONDS)
+
+metrics.gauge(
+    "generation_requests_in_flight",
+    "Generation requests being served by this worker",
+    lambda: saturation.requests
+)
+metrics.gauge(
+    "upstream_calls_in_flight",
+    "Model calls running in this worker",
+    lambda: saturation.upstream
+)
+metrics.gauge(
+    "generation_queue_depth",
+    "Generations waiting for a concurrency slot or for a result being produced by another worker",
+    lambda: saturation.queued
+)
+metrics.gauge(
+    "saturation_load_factor",
+    "Active generation work relative to WORKER_CONCURRENCY (1.0 = at planned capacity)",
+    saturation.load_factor
+)
+
+
+def publish_snapshot():
+    """Share this worker's snapshot with the other workers on the host"""
+    get_shared_store().set(
+        STORE_NAMESPACE,
+        _WORKER_ID,
+        json.dumps(saturation.snapshot()).encode("utf-8"),
+        ttl=settings.SATURATION_PUBLISH_INTERVAL_SECONDS * 3
+    )
+
+
+def host_snapshot() -> dict:
+    """Load of all workers on the host that published recently, including this one"""
+    publish_snapshot()
+    workers = [json.loads(value) for value in get_shared_store().scan(STORE_NAMESPACE).values()]
+    calls = sum(worker["upstream_calls"] for worker in workers)
+    capacity = len(workers) * max(1, settings.WORKER_CONCURRENCY)
+    active = sum(worker["load_factor"] for worker in workers) * max(1, settings.WORKER_CONCURRENCY)
+    return {
+        "workers": len(workers),
+        "requests_in_flight": sum(worker["requests_in_flight"] for worker in workers),
+        "upstream_in_flight": sum(worker["upstream_in_flight"] for worker in workers),
+        "queue_depth": sum(worker["queue_depth"] for worker in workers),
+        "upstream_calls": calls,
+        "upstream_latency_mean_seconds": round(
+            sum(worker["upstream_latency_mean_seconds"] * worker["upstream_calls"] for worker in workers) / calls, 3
+        ) if calls else 0.0,
+        # Percentiles do not combine across workers; the slowest worker's is reported
+        "upstream_latency_p95_seconds": max((worker["upstream_latency_p95_seconds"] for worker in workers), default=0.0),
+        "upstream_error_rate": round(
+            sum(worker["upstream_error_rate"] * worker["upstream_calls"] for worker in workers) / calls, 3
+        ) if calls else 0.0,
+        "load_factor": round(active / capacity, 3) if capacity else 0.0
+    }
+
+
+class SaturationPublisher:
+    """Publishes this worker's snapshot every SATURATION_PUBLISH_INTERVAL_SECONDS"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        get_shared_store().delete(STORE_NAMESPACE, _WORKER_ID)
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(publish_snapshot)
+            except Exception:
+                logger.exception("Could not publish the saturation snapshot")
+            await asyncio.sleep(settings.SATURATION_PUBLISH_INTERVAL_SECONDS)
@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Callable, List, Optional, TypeVar
+
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from app.services.artifact_store import get_artifact_store
+from app.services.generation import generate_content
+from app.services.markdown_sections import SectionSpan, find_section, replace_section, section_spans, section_text
+from app.services.output_budget import section_budget
+
+# Characters of the neighbouring sections shown around the one being rewritten
+NEIGHBOUR_EXCERPT_CHARS = 600
+
+# Request fields are shown up to this length, so long source text does not resend the document
+FIELD_EXCERPT_CHARS = 300
+
+# Response fields that describe the stored artifact rather than the request behind it
+ARTIFACT_FIELDS = {"id", "sections", "created_at", "status"}
+
+Artifact = TypeVar("Artifact", bound=BaseModel)
+
+
+def _excerpt(text: str, limit: int, from_end: bool = False) -> str:
+    text = text.strip()
+    if len(text) <= limit:
+        return text
+    return "..." + text[-limit:] if from_end else text[:limit] + "..."
+
+
+def _request_details(artifact: BaseModel, markdown_field: str) -> str:
+    details = []
+    for field, value in artifact.model_dump(exclude=ARTIFACT_FIELDS | {markdown_field}).items():
+        if value in (None, "", []):
+            continue
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        details.append(f"{field.replace('_', ' ').title()}: {_excerpt(str(value), FIELD_EXCERPT_CHARS)}")
+    return "\n".join(details)
+
+
+def _outline(spans: List[SectionSpan], target: SectionSpan) -> str:
+    return "\n".join(
+        "  " * span.depth + (f"{span.number}. " if span.number is not None else "") + span.title
+        + ("  <- the section to rewrite" if span == target else "")
+        for span in spans
+    )
+
+
+def build_section_prompt(kind: str, artifact: BaseModel, markdown_field: str, span: SectionSpan, instructions: Optional[str] = None) -> str:
+    """Prompt rewriting one section, with the outline and neighbouring excerpts instead of the whole document"""
+    markdown = getattr(artifact, markdown_field)
+    lines = markdown.splitlines()
+    spans = section_spans(markdown)
+    before = "\n".join(lines[max(0, span.start - 40):span.start])
+    after = "\n".join(lines[span.end:span.end + 40])
+    return f"""
+        You are revising one section of an existing {kind.replace('_', ' ')}. Rewrite only this section;
+        the rest of the document stays exactly as it is.
+
+        Document details:
+        {_request_details(artifact, markdown_field)}
+
+        Document outline:
+        {_outline(spans, span)}
+
+        End of the preceding text:
+        {_excerpt(before, NEIGHBOUR_EXCERPT_CHARS, from_end=True) or 'None (this is the first section)'}
+
+        Start of the following text:
+        {_excerpt(after, NEIGHBOUR_EXCERPT_CHARS) or 'None (this is the last section)'}
+
+        Section to rewrite: {lines[span.start].strip()}
+        Current content:
+        {section_text(markdown, span)}
+
+        Teacher's instructions: {instructions or 'None given, write a fresh and improved version of this section'}
+
+        Return only the new content of this section in markdown, without its heading and without
+        any other section. Keep the formatting, numbering and level of detail consistent with the
+        rest of the document.
+        """
+
+
+async def regenerate_section(
+    kind: str,
+    artifact: Artifact,
+    markdown_field: str,
+    selector: str,
+    agent_factory: Callable,
+    instructions: Optional[str] = None
+) -> Artifact:
+    """Regenerate one section of a stored artifact and store the result as a new artifact
+
+    Only the section, the document outline and short excerpts of its neighbours are sent,
+    so the model writes one section instead of the whole document. The original artifact
+    is left untouched; the spliced copy gets its own content-addressed id.
+    """
+    markdown = getattr(artifact, markdown_field)
+    span = find_section(markdown, selector)
+    if span is None:
+        raise ValueError(f"Section '{selector}' not found")
+
+    content = await generate_content(
+        f"{kind}_section",
+        build_section_prompt(kind, artifact, markdown_field, span, instructions),
+        agent_factory,
+        # A teacher asking again for the same section wants a different version
+        cache_ttl=0,
+        output_budget=section_budget(section_text(markdown, span))
+    )
+    regenerated = artifact.model_copy(update={
+        "id": "",  # Replaced by the content hash when stored
+        markdown_field: replace_section(markdown, span, content),
+        "created_at": datetime.utcnow()
+    })
+    return await run_in_threadpool(get_artifact_store().save, kind, regenerated)
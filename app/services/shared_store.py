@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.shared_store")
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """Open a SQLite connection in WAL mode, safe for concurrent use by several processes"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+class SharedStore:
+    """SQLite (WAL) backed key-value store shared by all worker processes on a host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection for the current thread, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv (expires_at);
+            CREATE INDEX IF NOT EXISTS idx_counters_expires ON counters (expires_at);
+            """
+        )
+
+    # Key-value entries
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Return the stored value, or None if it is missing or expired"""
+        row = self._connection().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None):
+        """Store a value, optionally expiring after ttl seconds"""
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, expires_at)
+        )
+
+    def scan(self, namespace: str) -> Dict[str, bytes]:
+        """All unexpired entries of a namespace"""
+        rows = self._connection().execute(
+            "SELECT key, value FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, time.time())
+        ).fetchall()
+        return {key: value for key, value in rows}
+
+    def trim(self, namespace: str, max_entries: int, max_bytes: int) -> int:
+        """Delete a namespace's expired entries, then the ones expiring first until it fits the limits"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?", (namespace, now)
+            ).rowcount
+            count, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM kv WHERE namespace = ?", (namespace,)
+            ).fetchone()
+            evicted = []
+            if count > max_entries or size > max_bytes:
+                rows = conn.execute(
+                    "SELECT key, LENGTH(value) FROM kv WHERE namespace = ? ORDER BY expires_at IS NULL, expires_at",
+                    (namespace,)
+                )
+                for key, length in rows:
+                    if count <= max_entries and size <= max_bytes:
+                        break
+                    evicted.append((namespace, key))
+                    count -= 1
+                    size -= length
+                conn.executemany("DELETE FROM kv WHERE namespace = ? AND key = ?", evicted)
+            conn.execute("COMMIT")
+            return deleted + len(evicted)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, namespace: str, key: str):
+        self._connection().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    # Leases (cross-process single-flight)
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Try to take the named lease; succeeds if it is free, expired or already ours"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + ttl)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def lease_held(self, name: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM leases WHERE name = ? AND expires_at > ?", (name, time.time())
+        ).fetchone()
+        return row is not None
+
+    def release_lease(self, name: str, owner: str):
+        self._connection().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    # Windowed counters (rate limits)
+
+    def incr(self, name: str, amount: int = 1, ttl: float = 60) -> int:
+        """Increment a counter that resets after ttl seconds and return the new value"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM counters WHERE name = ? AND expires_at <= ?", (name, now))
+            conn.execute(
+                "INSERT INTO counters (name, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount, now + ttl)
+            )
+            value = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+            conn.execute("COMMIT")
+            return value
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, leases and counters (such as past rate limit windows)"""
+        now = time.time()
+        conn = self._connection()
+        deleted = conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+        deleted += conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,)).rowcount
+        deleted += conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,)).rowcount
+        return deleted
+
+
+class SharedStorePurger:
+    """Deletes expired shared store rows every SHARED_STORE_PURGE_INTERVAL_SECONDS
+
+    Reads already ignore expired rows; this keeps them from piling up in the file. Each
+    worker runs one, but a lease lets only one of them purge per interval.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._owner = f"purge-{os.getpid()}"
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        interval = settings.SHARED_STORE_PURGE_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                deleted = await run_in_threadpool(self.purge_once, interval)
+                if deleted:
+                    logger.debug("Purged %d expired shared store rows", deleted)
+            except Exception:
+                logger.exception("Shared store purge failed")
+
+    def purge_once(self, interval: float) -> int:
+        store = get_shared_store()
+        # Held until it expires, so the other workers skip the rest of this interval
+        if not store.acquire_lease("shared_store_purge", self._owner, interval * 0.9):
+            return 0
+        return store.purge_expired()
+
+
+_store: Optional[SharedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> SharedStore:
+    """Get the process-wide shared store with lazy initialization"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SharedStore(settings.SHARED_STORE_PATH)
+    return _store
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.generation import CACHE_NAMESPACE, cache_key, generate_content
+from app.services.metrics import metrics
+from app.services.shared_store import connect_sqlite, get_shared_store
+
+logger = logging.getLogger("app.warmup")
+
+warmup_generations_total = metrics.counter(
+    "warmup_generations_total",
+    "Popular requests processed by cache warming, by namespace and result (generated, cached or failed)"
+)
+
+
+@dataclass
+class WarmupTarget:
+    """An endpoint whose popular requests can be replayed to fill the response cache"""
+    namespace: str
+    request_model: Type[BaseModel]
+    build_prompt: Callable[[BaseModel], str]
+    agent_factory: Callable
+    output_budget: Optional[Callable[[BaseModel], int]] = None
+
+
+_targets: Dict[str, WarmupTarget] = {}
+
+
+def register_warmup_target(
+    namespace: str,
+    request_model: Type[BaseModel],
+    build_prompt: Callable,
+    agent_factory: Callable,
+    output_budget: Optional[Callable] = None
+):
+    """Make an endpoint's recorded requests eligible for cache warming"""
+    _targets[namespace] = WarmupTarget(namespace, request_model, build_prompt, agent_factory, output_budget)
+
+
+class RequestHistory:
+    """Daily request counts per distinct request payload, shared by all workers on a host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS request_payloads (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS request_counts (
+                key TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (key, day)
+            );
+            """
+        )
+
+    def record(self, namespace: str, request: BaseModel):
+        """Count one request; identical payloads share a key"""
+        payload = json.dumps(request.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+        key = hashlib.sha256(f"{namespace}\n{payload}".encode("utf-8")).hexdigest()[:32]
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR IGNORE INTO request_payloads (key, namespace, payload) VALUES (?, ?, ?)",
+            (key, namespace, payload)
+        )
+        conn.execute(
+            "INSERT INTO request_counts (key, day, count) VALUES (?, ?, 1) "
+            "ON CONFLICT(key, day) DO UPDATE SET count = count + 1",
+            (key, int(time.time() // 86400))
+        )
+
+    def top(self, namespace: str, limit: int, days: int) -> List[dict]:
+        """Most requested payloads for a namespace over the last `days` days"""
+        rows = self._connection().execute(
+            "SELECT p.payload, SUM(c.count) AS total FROM request_counts c "
+            "JOIN request_payloads p ON p.key = c.key "
+            "WHERE p.namespace = ? AND c.day >= ? "
+            "GROUP BY c.key ORDER BY total DESC LIMIT ?",
+            (namespace, int(time.time() // 86400) - days, limit)
+        ).fetchall()
+        return [json.loads(payload) for payload, _ in rows]
+
+    def purge_older_than(self, days: int):
+        conn = self._connection()
+        conn.execute("DELETE FROM request_counts WHERE day < ?", (int(time.time() // 86400) - days,))
+        conn.execute("DELETE FROM request_payloads WHERE key NOT IN (SELECT DISTINCT key FROM request_counts)")
+
+
+_history: Optional[RequestHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_request_history() -> RequestHistory:
+    """Get the process-wide request history with lazy initialization"""
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = RequestHistory(settings.SHARED_STORE_PATH)
+    return _history
+
+
+def record_request(namespace: str, request: BaseModel):
+    """Record a request for cache warming; history is best effort and never fails a request"""
+    if not settings.WARMUP_ENABLED:
+        return
+    try:
+        get_request_history().record(namespace, request)
+    except Exception:
+        logger.exception("Could not record request history for %s", namespace)
+
+
+def in_warmup_window(now: datetime) -> bool:
+    """Whether the current UTC hour falls in the off-peak window (which may wrap midnight)"""
+    start, end = settings.WARMUP_WINDOW_START_HOUR, settings.WARMUP_WINDOW_END_HOUR
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+async def run_warmup() -> Dict[str, int]:
+    """Pre-generate the most popular requests of every target, within the upstream call budget
+
+    Requests whose responses are already cached do not count against the budget.
+    """
+    history = get_request_history()
+    store = get_shared_store()
+    budget = settings.WARMUP_MAX_CALLS
+    results = {"generated": 0, "cached": 0, "failed": 0}
+
+    for target in list(_targets.values()):
+        for payload in history.top(target.namespace, settings.WARMUP_TOP_N, settings.WARMUP_HISTORY_DAYS):
+            try:
+                request = target.request_model.model_validate(payload)
+                prompt = target.build_prompt(request)
+            except Exception:
+                # The request schema changed since this payload was recorded
+                continue
+
+            labels = {"namespace": target.namespace}
+            if store.get(CACHE_NAMESPACE, cache_key(target.namespace, prompt)) is not None:
+                results["cached"] += 1
+                warmup_generations_total.inc(labels={**labels, "result": "cached"})
+                continue
+            if budget <= 0:
+                return results
+
+            budget -= 1
+            try:
+                await generate_content(
+                    target.namespace,
+                    prompt,
+                    target.agent_factory,
+                    cache_ttl=settings.WARMUP_CACHE_TTL_SECONDS,
+                    output_budget=target.output_budget(request) if target.output_budget else None
+                )
+                results["generated"] += 1
+                warmup_generations_total.inc(labels={**labels, "result": "generated"})
+            except Exception:
+                results["failed"] += 1
+                warmup_generations_total.inc(labels={**labels, "result": "failed"})
+                logger.exception("Warmup generation failed for %s", target.namespace)
+    return results
+
+
+class WarmupScheduler:
+    """Runs cache warming once a day inside the off-peak window, on a single worker"""
+
+    def __init__(self, check_interval: float = 300):
+        self.check_interval = check_interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self._maybe_warm()
+            except Exception:
+                logger.exception("Cache warmup run failed")
+
+    async def _maybe_warm(self):
+        now = datetime.now(timezone.utc)
+        if not in_warmup_window(now):
+            return
+
+        store = get_shared_store()
+        today = now.date().isoformat().encode("utf-8")
+        if store.get("warmup", "last_run") == today:
+            return
+
+        # One worker warms per day; the others see the last_run marker afterwards
+        owner = f"warmup-{os.getpid()}"
+        if not store.acquire_lease("warmup", owner, 3600):
+            return
+        try:
+            if store.get("warmup", "last_run") == today:
+                return
+            started = time.monotonic()
+            results = await run_warmup()
+            store.set("warmup", "last_run", today, ttl=2 * 86400)
+            get_request_history().purge_older_than(settings.WARMUP_HISTORY_DAYS)
+            store.purge_expired()
+            logger.info(
+                "Cache warmup finished in %.1f s: %d generated, %d already cached, %d failed",
+                time.monotonic() - started,
+                results["generated"],
+                results["cached"],
+                results["failed"]
+            )
+        finally:
+            store.release_lease("warmup", owner)
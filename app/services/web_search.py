@@ -0,0 +1,208 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from ddgs import DDGS
+
+from app.core.config import settings
+from app.services.metrics import metrics
+
+search_seconds = metrics.histogram(
+    "web_search_duration_seconds",
+    "Duration of web searches made by agent tools, by backend and result (ok, error or timeout)"
+)
+searches_total = metrics.counter(
+    "web_search_requests_total",
+    "Web search queries requested by agents, by result (ok, error, timeout, cached or over_budget)"
+)
+
+
+class SearchResult(NamedTuple):
+    title: str
+    url: str
+    snippet: str
+
+
+class DuckDuckGoBackend:
+    """Searches through ddgs (the library behind the agents' DuckDuckGo tool), which needs no API key
+
+    ddgs blocks, so each search runs in a worker thread. A DDGS client keeps its engines'
+    HTTP connections between searches but is not safe to share between threads, so every
+    worker thread reuses its own. A search holds one of WEB_SEARCH_MAX_CONCURRENT slots
+    until its thread returns, even when the caller has stopped waiting, so abandoned
+    searches cannot pile up threads.
+    """
+
+    name = "duckduckgo"
+
+    def __init__(self, max_concurrent: Optional[int] = None):
+        self._slots = asyncio.Semaphore(max_concurrent or settings.WEB_SEARCH_MAX_CONCURRENT)
+        self._local = threading.local()
+
+    def _client(self) -> DDGS:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = DDGS(timeout=settings.WEB_SEARCH_TIMEOUT_SECONDS)
+        return client
+
+    def _search(self, query: str, max_results: int) -> List[SearchResult]:
+        rows = self._client().text(query, max_results=max_results) or []
+        return [SearchResult(row.get("title", ""), row.get("href", ""), row.get("body", "")) for row in rows]
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        await self._slots.acquire()
+        search = asyncio.ensure_future(asyncio.to_thread(self._search, query, max_results))
+        search.add_done_callback(lambda _: self._slots.release())
+        return (await asyncio.shield(search))[:max_results]
+
+
+class FakeSearchBackend:
+    """Canned results after a fixed latency, for tests and benchmarks without network access"""
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, results: Optional[Callable[[str], List[SearchResult]]] = None):
+        self.latency = latency
+        self.results = results or (lambda query: [SearchResult(f"About {query}", f"https://example.com/{query.replace(' ', '-')}", f"Notes on {query}.")])
+        self.queries: List[str] = []
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        self.queries.append(query)
+        await asyncio.sleep(self.latency)
+        return self.results(query)[:max_results]
+
+
+BACKENDS = {"duckduckgo": DuckDuckGoBackend, "fake": FakeSearchBackend}
+
+_backend = None
+_lock = threading.Lock()
+
+
+def get_search_backend():
+    """The configured search backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = BACKENDS.get(settings.WEB_SEARCH_BACKEND, DuckDuckGoBackend)()
+    return _backend
+
+
+def set_search_backend(backend):
+    """Replace the search backend, e.g. with a FakeSearchBackend in tests"""
+    global _backend
+    _backend = backend
+
+
+class SearchBudget:
+    """Searches and search time left to one agent run; repeated queries are answered from the run's results"""
+
+    def __init__(self, max_searches: Optional[int] = None, budget_seconds: Optional[float] = None):
+        self.max_searches = settings.WEB_SEARCH_MAX_SEARCHES_PER_RUN if max_searches is None else max_searches
+        self.budget_seconds = settings.WEB_SEARCH_RUN_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+        self.reset()
+
+    def reset(self):
+        self.searches = 0
+        self.started: Optional[float] = None
+        self.results: Dict[str, List[SearchResult]] = {}
+
+    def remaining_seconds(self) -> float:
+        if self.started is None:
+            self.started = time.monotonic()
+        return self.budget_seconds - (time.monotonic() - self.started)
+
+
+async def _timed_search(backend, query: str, max_results: int) -> List[SearchResult]:
+    labels = {"backend": backend.name, "result": "ok"}
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(
+            backend.search(query, max_results),
+            timeout=settings.WEB_SEARCH_TIMEOUT_SECONDS
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        # Cancelled searches ran past the run's search time budget
+        labels["result"] = "timeout"
+        raise
+    except Exception:
+        labels["result"] = "error"
+        raise
+    finally:
+        search_seconds.observe(time.monotonic() - started, labels=labels)
+
+
+async def run_searches(queries: List[str], budget: SearchBudget, max_results: Optional[int] = None) -> Dict[str, object]:
+    """Run queries in parallel within a run's budget: results per query, or why there are none"""
+    max_results = max_results or settings.WEB_SEARCH_MAX_RESULTS
+    backend = get_search_backend()
+    outcome: Dict[str, object] = {}
+    pending: Dict[asyncio.Task, str] = {}
+    remaining = budget.remaining_seconds()
+
+    ordered = list(dict.fromkeys(query.strip() for query in queries if isinstance(query, str) and query.strip()))
+    for query in ordered:
+        if query in budget.results:
+            searches_total.inc(labels={"result": "cached"})
+            outcome[query] = budget.results[query]
+        elif budget.searches >= budget.max_searches or remaining <= 0:
+            searches_total.inc(labels={"result": "over_budget"})
+            outcome[query] = "Not searched: the " + ("search" if remaining > 0 else "search time") + " budget for this answer is used up"
+        else:
+            budget.searches += 1
+            pending[asyncio.ensure_future(_timed_search(backend, query, max_results))] = query
+
+    if not pending:
+        return outcome
+    try:
+        done, not_done = await asyncio.wait(pending, timeout=remaining)
+    finally:
+        for task in pending:
+            task.cancel()
+    for task in not_done:
+        searches_total.inc(labels={"result": "timeout"})
+        outcome[pending[task]] = "Not searched: the search time budget for this answer ran out"
+    for task in done:
+        query = pending[task]
+        error = task.exception()
+        if error is None:
+            searches_total.inc(labels={"result": "ok"})
+            budget.results[query] = outcome[query] = task.result()
+        else:
+            timed_out = isinstance(error, asyncio.TimeoutError)
+            searches_total.inc(labels={"result": "timeout" if timed_out else "error"})
+            outcome[query] = "Search timed out" if timed_out else f"Search failed: {error}"
+    return {query: outcome[query] for query in ordered}
+
+
+def web_search_tool(budget: Optional[SearchBudget] = None):
+    """A web search tool for one agent, with its own per-run search budget"""
+    budget = budget or SearchBudget()
+
+    async def web_search(queries: List[str]) -> str:
+        """Search the web. Pass every query you need in one call: they run in parallel.
+
+        Args:
+            queries: Search queries, e.g. ["CBSE grade 5 fractions learning outcomes", "fraction games for kids"].
+
+        Returns:
+            JSON object mapping each query to its results (title, url and snippet), or to the reason it was not searched.
+        """
+        outcome = await run_searches(queries, budget)
+        return json.dumps({
+            query: [result._asdict() for result in results] if isinstance(results, list) else results
+            for query, results in outcome.items()
+        })
+
+    web_search.budget = budget
+    return web_search
+
+
+def start_search_run(agent):
+    """Give an agent's web search tool a fresh budget, for agents that are reused across runs"""
+    for tool in getattr(agent, "tools", None) or []:
+        budget = getattr(tool, "budget", None)
+        if isinstance(budget, SearchBudget):
+            budget.reset()
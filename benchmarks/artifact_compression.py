@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark artifact storage formats: compression ratio, write time and read latency.
+
+Synthetic lesson plans with the section layout the lesson plan prompt asks for are stored
+as raw JSON, zlib, zstd and zstd with a dictionary trained on a separate set of plans, then
+read back through ArtifactStore.get_raw the way the GET endpoints read them.
+
+Usage:
+    python benchmarks/artifact_compression.py --train 500 --artifacts 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.lesson_plan.responses import LessonPlanResponse
+from app.services.artifact_compression import ArtifactCodec, train_dictionary, zstandard
+from app.services.artifact_store import ArtifactStore
+
+SECTIONS = [
+    ("LEARNING OBJECTIVES", ["Students will be able to {verb} {topic}", "Students will {verb} {topic} in real-world contexts", "Alignment with {curriculum} standards for {grade}"]),
+    ("LESSON STRUCTURE AND ACTIVITIES", ["**Class {n} ({duration}):** {activity} on {topic}", "Warm-up (5 minutes): quick recap of {topic}", "Group work: students {verb} {topic} in pairs"]),
+    ("TEACHING STRATEGIES", ["{style} approach: {activity}", "Differentiation: extra scaffolding for learners who struggle with {topic}", "Use of visual aids and manipulatives"]),
+    ("ASSESSMENT METHODS", ["Formative: exit ticket with three questions on {topic}", "Summative: short quiz at the end of class {n}", "Peer feedback using a simple rubric"]),
+    ("HOMEWORK ASSIGNMENTS", ["{level} level worksheet on {topic} (20 minutes)", "Practice problems that {verb} {topic}", "Reflection: write two sentences about what you learned"]),
+    ("TIMELINE AND PACING", ["Class {n}: {topic}, {duration}", "Allow extra time for review before the assessment", "Flexible buffer for questions"]),
+    ("RESOURCES AND MATERIALS", ["Textbook chapter on {topic}", "Interactive simulation for {topic}", "Printed worksheets and chart paper"]),
+    ("EVALUATION AND REFLECTION", ["Success criteria: most students can {verb} {topic}", "Reflection question: which activity engaged students most?", "Adapt pacing for the next unit"]),
+]
+TOPICS = ["fractions", "linear equations", "photosynthesis", "forces and motion", "persuasive writing", "the water cycle", "probability", "ancient civilizations", "electric circuits", "poetry analysis"]
+VERBS = ["identify", "explain", "apply", "compare", "analyse", "evaluate", "model", "solve problems involving"]
+ACTIVITIES = ["Think-pair-share", "Hands-on experiment", "Guided discovery", "Jigsaw reading", "Gallery walk", "Mini lecture with questions"]
+
+
+def synthetic_plan(rng: random.Random) -> LessonPlanResponse:
+    classes = rng.randint(2, 8)
+    values = {
+        "topic": rng.choice(TOPICS),
+        "curriculum": rng.choice(["CBSE", "IB", "Cambridge", "National Curriculum"]),
+        "grade": f"Grade {rng.randint(1, 12)}",
+        "duration": rng.choice(["40 minutes", "45 minutes", "60 minutes"]),
+        "style": rng.choice(["Interactive", "Inquiry-based", "Traditional"]),
+        "level": rng.choice(["Easy", "Moderate", "Challenging"]),
+    }
+    parts = []
+    for number, (title, lines) in enumerate(SECTIONS, start=1):
+        parts.append(f"## {number}. {title}\n")
+        for n in range(1, classes + 1):
+            line = rng.choice(lines)
+            parts.append("- " + line.format(n=n, verb=rng.choice(VERBS), activity=rng.choice(ACTIVITIES), **values))
+        parts.append("")
+    return LessonPlanResponse(
+        id="",
+        syllabus_filename="Curriculum-based syllabus",
+        number_of_classes=classes,
+        class_duration=values["duration"],
+        teaching_style=values["style"],
+        homework_level=values["level"],
+        generated_plan="\n".join(parts),
+        created_at=datetime.utcnow()
+    )
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(name: str, codec: ArtifactCodec, train_plans, plans, dictionary_bytes: int) -> dict:
+    store = ArtifactStore(os.path.join(tempfile.mkdtemp(), f"{name}.sqlite3"), codec=codec)
+    if dictionary_bytes:
+        samples = [plan.model_dump_json().encode("utf-8") for plan in train_plans]
+        store.add_dictionary("lesson_plan", train_dictionary(samples, dictionary_bytes, codec.level))
+
+    started = time.perf_counter()
+    ids = [store.save("lesson_plan", plan).id for plan in plans]
+    write_seconds = time.perf_counter() - started
+
+    raw_bytes = sum(len(store.get_raw("lesson_plan", artifact_id)) for artifact_id in ids)
+    stored_bytes = store.stats("lesson_plan")["stored_bytes"]
+    latencies = []
+    for artifact_id in ids:
+        started = time.perf_counter()
+        store.get_raw("lesson_plan", artifact_id)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "name": name,
+        "ratio": raw_bytes / stored_bytes,
+        "mean_bytes": stored_bytes / len(ids),
+        "write_ms": write_seconds / len(ids) * 1000,
+        "read_p50_ms": percentile(latencies, 0.5) * 1000,
+        "read_p95_ms": percentile(latencies, 0.95) * 1000,
+        "read_mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", type=int, default=500, help="Plans used to train the dictionary")
+    parser.add_argument("--artifacts", type=int, default=2000, help="Plans stored and read back")
+    parser.add_argument("--dictionary-bytes", type=int, default=65536)
+    parser.add_argument("--level", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    train_plans = [synthetic_plan(rng) for _ in range(args.train)]
+    plans = [synthetic_plan(rng).model_copy(update={"syllabus_filename": f"syllabus-{uuid.uuid4().hex[:8]}"}) for _ in range(args.artifacts)]
+
+    results = [
+        run("raw", ArtifactCodec("off", args.level), train_plans, plans, 0),
+        run("zlib", ArtifactCodec("zlib", args.level), train_plans, plans, 0),
+    ]
+    if zstandard is not None:
+        results.append(run("zstd", ArtifactCodec("zstd", args.level), train_plans, plans, 0))
+        results.append(run("zstd+dict", ArtifactCodec("zstd", args.level), train_plans, plans, args.dictionary_bytes))
+    else:
+        print("zstandard is not installed, skipping zstd")
+
+    print(f"{'format':<10} {'ratio':>7} {'bytes/artifact':>15} {'write ms':>9} {'read p50 ms':>12} {'read p95 ms':>12}")
+    for result in results:
+        print(
+            f"{result['name']:<10} {result['ratio']:>7.2f} {result['mean_bytes']:>15.0f} {result['write_ms']:>9.3f} "
+            f"{result['read_p50_ms']:>12.3f} {result['read_p95_ms']:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark full-text search over stored artifacts: indexing cost and query latency.
+
+Synthetic homework assignments are stored through ArtifactStore.save (which indexes each
+one as it is stored), then searched with topic queries, with and without curriculum,
+subject, grade and date filters, the way GET /api/v1/search is.
+
+Usage:
+    python benchmarks/artifact_search.py --artifacts 100000 --queries 1000
+    python benchmarks/artifact_search.py --artifacts 1000000 --store data/search_bench.sqlite3
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.homework_generator.responses import HomeworkGeneratorResponse
+from app.services.artifact_store import ArtifactStore
+
+CURRICULA = ["CBSE", "ICSE", "IB", "Cambridge", "National Curriculum"]
+SUBJECTS = {
+    "Mathematics": ["fractions", "decimals", "algebra", "linear equations", "geometry", "angles", "probability", "statistics", "ratios", "polynomials"],
+    "Science": ["photosynthesis", "cells", "forces", "motion", "energy", "electricity", "magnetism", "ecosystems", "acids", "atoms"],
+    "English": ["grammar", "tenses", "poetry", "narrative writing", "comprehension", "vocabulary", "persuasive essays", "punctuation"],
+    "History": ["ancient civilizations", "industrial revolution", "world wars", "colonialism", "independence movements", "trade routes"],
+}
+TASKS = ["Solve", "Explain", "Compare", "Describe", "Draw a diagram of", "Write a paragraph about", "List three examples of", "Investigate"]
+
+
+def synthetic_homework(rng: random.Random, index: int) -> HomeworkGeneratorResponse:
+    subject = rng.choice(list(SUBJECTS))
+    topic = rng.choice(SUBJECTS[subject])
+    related = rng.sample(SUBJECTS[subject], 3)
+    questions = "\n".join(
+        f"{n}. {rng.choice(TASKS)} {rng.choice([topic] + related)} (exercise {index}-{n})"
+        for n in range(1, rng.randint(6, 12))
+    )
+    return HomeworkGeneratorResponse(
+        id="",
+        curriculum=rng.choice(CURRICULA),
+        subject=subject,
+        grade=f"Grade {rng.randint(1, 12)}",
+        topic=topic,
+        difficulty_level=rng.choice(["easy", "medium", "hard"]),
+        generated_homework=f"# Homework: {topic}\n\n## Instructions\nAnswer all questions.\n\n## Questions\n{questions}\n",
+        created_at=datetime.utcnow()
+    )
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(name: str, latencies, hits: int):
+    print(
+        f"{name:<22} mean {statistics.mean(latencies) * 1000:7.2f} ms   p50 {percentile(latencies, 0.5) * 1000:7.2f} ms   "
+        f"p95 {percentile(latencies, 0.95) * 1000:7.2f} ms   p99 {percentile(latencies, 0.99) * 1000:7.2f} ms   "
+        f"({hits} with results)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifacts", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--store", help="Store path; an existing store is searched without adding artifacts")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    path = args.store or os.path.join(tempfile.mkdtemp(), "artifacts.sqlite3")
+    existing = os.path.exists(path)
+    store = ArtifactStore(path)
+    rng = random.Random(args.seed)
+    if not existing:
+        started = time.perf_counter()
+        for index in range(args.artifacts):
+            store.save("homework", synthetic_homework(rng, index))
+        seconds = time.perf_counter() - started
+        print(f"stored and indexed    {args.artifacts} artifacts in {seconds:.1f} s ({seconds / args.artifacts * 1000:.3f} ms each)")
+    print(f"store size            {os.path.getsize(path) / 1e6:.1f} MB ({store.count('homework')} artifacts)")
+
+    day = time.time() - 86400
+    scenarios = {
+        "topic": lambda topic, subject: store.search(topic),
+        "topic + subject": lambda topic, subject: store.search(f"{topic} homework", subject=subject),
+        "topic + all filters": lambda topic, subject: store.search(
+            topic, curriculum=rng.choice(CURRICULA), subject=subject, grade=f"Grade {rng.randint(1, 12)}"
+        ),
+        "topic + date": lambda topic, subject: store.search(topic, created_from=day),
+        "filters only": lambda topic, subject: store.search(subject=subject, grade=f"Grade {rng.randint(1, 12)}"),
+        "newest (no query)": lambda topic, subject: store.search(),
+    }
+    for name, search in scenarios.items():
+        latencies, hits = [], 0
+        for _ in range(args.queries):
+            subject = rng.choice(list(SUBJECTS))
+            topic = rng.choice(SUBJECTS[subject])
+            started = time.perf_counter()
+            results = search(topic, subject)
+            latencies.append(time.perf_counter() - started)
+            hits += bool(results)
+        report(name, latencies, hits)
+
+
+if __name__ == "__main__":
+    main()
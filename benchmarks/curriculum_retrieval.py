@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local curriculum knowledge base: index build time, load time and query latency.
+
+A synthetic corpus of curriculum standards is generated (or pass --corpus to index a real
+one), built into an index and queried with curriculum/subject/grade style prompts, the way
+the term plan and homework routers query it.
+
+Usage:
+    python benchmarks/curriculum_retrieval.py --passages 20000 --queries 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.curriculum_kb import CurriculumIndex, build_index, iter_corpus
+
+CURRICULA = ["CBSE", "ICSE", "IB", "Cambridge", "National Curriculum"]
+SUBJECTS = {
+    "Mathematics": ["fractions", "decimals", "algebra", "linear equations", "geometry", "angles", "probability", "statistics", "ratios", "polynomials"],
+    "Science": ["photosynthesis", "cells", "forces", "motion", "energy", "electricity", "magnetism", "ecosystems", "acids", "atoms"],
+    "English": ["grammar", "tenses", "poetry", "narrative writing", "comprehension", "vocabulary", "persuasive essays", "punctuation"],
+    "History": ["ancient civilizations", "industrial revolution", "world wars", "colonialism", "independence movements", "trade routes"],
+}
+VERBS = ["identify", "explain", "apply", "compare", "analyse", "evaluate", "describe", "solve problems involving", "model", "investigate"]
+
+
+def synthetic_corpus(count: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        subject = rng.choice(list(SUBJECTS))
+        topic = rng.choice(SUBJECTS[subject])
+        related = rng.sample(SUBJECTS[subject], 3)
+        text = " ".join(
+            f"Learners {rng.choice(VERBS)} {term} in familiar and unfamiliar contexts."
+            for term in [topic] + related
+        )
+        yield {
+            "title": f"Standard {i}: {topic}",
+            "text": text,
+            "curriculum": rng.choice(CURRICULA),
+            "subject": subject,
+            "grade": f"Grade {rng.randint(1, 12)}",
+            "source": "synthetic"
+        }
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passages", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--corpus", help="Index this corpus directory instead of a synthetic one")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    passages = iter_corpus(args.corpus) if args.corpus else synthetic_corpus(args.passages, args.seed)
+    started = time.perf_counter()
+    data = build_index(passages)
+    build_seconds = time.perf_counter() - started
+
+    path = os.path.join(tempfile.mkdtemp(), "curriculum_index.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    started = time.perf_counter()
+    index = CurriculumIndex.load(path)
+    load_seconds = time.perf_counter() - started
+
+    rng = random.Random(args.seed + 1)
+    latencies = []
+    hits = 0
+    for _ in range(args.queries):
+        subject = rng.choice(list(SUBJECTS))
+        topic = rng.choice(SUBJECTS[subject])
+        curriculum = rng.choice(CURRICULA)
+        grade = f"Grade {rng.randint(1, 12)}"
+        started = time.perf_counter()
+        results = index.search(f"{topic} {subject}", args.limit, curriculum=curriculum, subject=subject, grade=grade)
+        latencies.append(time.perf_counter() - started)
+        hits += bool(results)
+
+    print(f"passages          {len(index.docs)} ({len(index.postings)} terms, {os.path.getsize(path) / 1e6:.1f} MB on disk)")
+    print(f"build             {build_seconds:.2f} s")
+    print(f"load              {load_seconds:.2f} s")
+    print(f"queries           {args.queries} ({hits} with results)")
+    print(f"latency mean      {statistics.mean(latencies) * 1000:.3f} ms")
+    print(f"latency p50       {percentile(latencies, 0.5) * 1000:.3f} ms")
+    print(f"latency p95       {percentile(latencies, 0.95) * 1000:.3f} ms")
+    print(f"latency p99       {percentile(latencies, 0.99) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark event-loop lag while every generation router is under concurrent load.
+
+Agents are replaced by a fake whose async run waits for a simulated upstream latency, so
+any lag recorded here comes from work done on the event loop by the routers themselves.
+Pass --blocking to simulate a router calling a synchronous agent.run (the regression this
+benchmark is meant to catch).
+
+Usage:
+    python benchmarks/event_loop_lag.py --requests 200 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("SHARED_STORE_PATH", os.path.join(_tmp, "shared_store.sqlite3"))
+os.environ.setdefault("ARTIFACT_STORE_PATH", os.path.join(_tmp, "artifacts.sqlite3"))
+os.environ["RATE_LIMIT_PER_MINUTE"] = "0"
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+import httpx
+
+from app.api.v1.endpoints import (
+    assessment, assessment_eval, homework_generator, lesson_plan,
+    student_assistant, teacher_assistant, term_plan
+)
+from app.core.loop_monitor import LoopLagMonitor, loop_blocked_total, loop_lag_seconds
+from app.main import app
+
+ROUTES = [
+    (lesson_plan, "get_lesson_plan_agent", "/api/v1/lesson-plan/generate",
+     {"syllabus_content": "Linear equations and graphing for beginners"}),
+    (term_plan, "get_term_plan_agent", "/api/v1/term-plan/generate",
+     {"curriculum": "CBSE", "subject": "Mathematics", "grade": "Grade 8"}),
+    (assessment, "get_assessment_agent", "/api/v1/assessment/generate",
+     {"text_content": "Photosynthesis converts light energy into chemical energy", "mcq_count": 3, "short_question_count": 1}),
+    (assessment_eval, "get_assessment_eval_agent", "/api/v1/assessment-eval/evaluate",
+     {"assessment_data": "Question 1: What is 2+2?\nAnswer: 4"}),
+    (student_assistant, "get_student_assistant_agent", "/api/v1/student-assistant/query",
+     {"curriculum": "CBSE", "subject": "Science", "grade": "Grade 6", "question": "Why is the sky blue?"}),
+    (teacher_assistant, "get_teacher_assistant_agent", "/api/v1/teacher-assistant/ask",
+     {"curriculum": "CBSE", "subject": "Science", "grade": "Grade 6", "question": "How do I teach density?"}),
+    (homework_generator, "get_homework_generator_agent", "/api/v1/homework-generator/generate",
+     {"curriculum": "CBSE", "subject": "Mathematics", "grade": "Grade 5", "topic": "Fractions"}),
+]
+
+
+class FakeRunResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeAgent:
+    """Stands in for an agno Agent, simulating upstream latency"""
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def arun(self, prompt: str, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return FakeRunResponse('{"total_marks_obtained": 4, "percentage": 100, "grade": "A"}\n\n## 1. SECTION\n' + prompt[:2000])
+
+
+def quantile(snapshot: dict, q: float) -> str:
+    """Upper bucket bound containing the q-quantile of a histogram snapshot"""
+    if not snapshot["count"]:
+        return "n/a"
+    target = q * snapshot["count"]
+    cumulative = 0
+    for bound, count in zip(loop_lag_seconds.buckets + (float("inf"),), snapshot["counts"]):
+        cumulative += count
+        if cumulative >= target:
+            return f"<= {bound * 1000:g} ms" if bound != float("inf") else "> 5000 ms"
+    return "n/a"
+
+
+async def run(total_requests: int, latency: float, blocking: bool):
+    for module, factory_name, _, _ in ROUTES:
+        setattr(module, factory_name, lambda: FakeAgent(latency, blocking))
+
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0.05, debug=True)
+    monitor.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        tasks = []
+        for i in range(total_requests):
+            _, _, path, payload = ROUTES[i % len(ROUTES)]
+            # Vary the payload so every request reaches the agent
+            body = dict(payload)
+            first_key = next(iter(body))
+            body[first_key] = f"{body[first_key]} #{i}"
+            tasks.append(client.post(path, json=body))
+        responses = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    failures = sum(1 for r in responses if r.status_code != 200)
+    snapshot = loop_lag_seconds.snapshot()
+    print(f"requests          {total_requests} ({failures} failed) in {elapsed:.2f} s")
+    print(f"loop lag samples  {snapshot['count']}")
+    print(f"loop lag p50      {quantile(snapshot, 0.5)}")
+    print(f"loop lag p99      {quantile(snapshot, 0.99)}")
+    print(f"loop blocked      {int(loop_blocked_total.value())} times > 50 ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=140)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--blocking", action="store_true", help="Simulate a synchronous agent call")
+    parser.add_argument("--show-stacks", action="store_true", help="Log the stack of each blocking callback")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING if args.show_stacks else logging.ERROR)
+    asyncio.run(run(args.requests, args.latency, args.blocking))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark request throughput of the API when served by 1..N worker processes.
+
+The shared response cache is seeded for a set of term plans so the benchmark measures
+the serving path (routing, rate limiting, shared-store lookups) without calling Gemini.
+
+Usage:
+    python benchmarks/multi_worker_throughput.py --max-workers 4 --requests 2000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLAN_COUNT = 50
+
+
+def seed_cache(store_path: str):
+    """Pre-populate the shared response cache with term plans for the benchmark payloads"""
+    os.environ["SHARED_STORE_PATH"] = store_path
+    from app.api.v1.endpoints.term_plan import build_term_plan_prompt
+    from app.schemas.term_plan.requests import TermPlanRequest
+    from app.services.generation import CACHE_NAMESPACE, cache_key
+    from app.services.shared_store import SharedStore
+
+    store = SharedStore(store_path)
+    body = ("## Week plan\n" + "Lorem ipsum dolor sit amet. " * 200).encode("utf-8")
+    for payload in _payloads():
+        prompt = build_term_plan_prompt(TermPlanRequest(**payload))
+        store.set(CACHE_NAMESPACE, cache_key("term_plan", prompt), body)
+
+
+def _payloads():
+    return [
+        {"curriculum": "CBSE", "subject": "Mathematics", "grade": f"Grade {i}"}
+        for i in range(PLAN_COUNT)
+    ]
+
+
+def _wait_until_ready(port: int, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+def _post(port: int, payload: dict):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/v1/term-plan/generate",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+
+
+def run(workers: int, total_requests: int, concurrency: int, store_path: str, port: int) -> float:
+    env = dict(
+        os.environ,
+        WORKERS=str(workers),
+        PORT=str(port),
+        HOST="127.0.0.1",
+        SHARED_STORE_PATH=store_path,
+        RATE_LIMIT_PER_MINUTE="0",
+        GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "benchmark")
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_until_ready(port)
+        payloads = _payloads()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda i: _post(port, payloads[i % len(payloads)]), range(total_requests)))
+        elapsed = time.perf_counter() - started
+        return total_requests / elapsed
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "shared_store.sqlite3")
+        seed_cache(store_path)
+
+        baseline = None
+        print(f"{'workers':>8} {'req/s':>10} {'scaling':>8}")
+        for workers in range(1, args.max_workers + 1):
+            throughput = run(workers, args.requests, args.concurrency, store_path, args.port)
+            baseline = baseline or throughput
+            print(f"{workers:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
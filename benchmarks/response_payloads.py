@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark payload size and serialization time for large generated responses.
+
+Compares FastAPI's generic serialization (jsonable_encoder + json.dumps) with
+ModelJSONResponse, and identity vs gzip vs brotli payload bytes, with and without the
+echoed assessment_data.
+
+Usage:
+    python benchmarks/response_payloads.py
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.compression import brotli, compress
+from app.core.responses import ModelJSONResponse
+from app.schemas.assessment.responses import AssessmentEvalResponse, QuestionEvaluation
+from app.schemas.lesson_plan.responses import LessonPlanResponse
+
+SECTION = """
+## {n}. SECTION TITLE
+
+- Clear, measurable learning outcomes aligned with the syllabus content
+- **Activity ({n}0 minutes):** Students work in pairs to solve linear equations
+- Formative assessment: exit ticket with three short questions
+"""
+
+
+def sample_lesson_plan() -> LessonPlanResponse:
+    plan = "".join(SECTION.format(n=i) for i in range(1, 120))
+    return LessonPlanResponse(
+        id=str(uuid.uuid4()),
+        syllabus_filename="Curriculum-based syllabus",
+        number_of_classes=10,
+        class_duration="45 minutes",
+        teaching_style="Interactive",
+        homework_level="Moderate",
+        generated_plan=plan,
+        created_at=datetime.utcnow()
+    )
+
+
+def sample_evaluation() -> AssessmentEvalResponse:
+    answers = "".join(
+        f"Question {i}: Explain concept {i}.\nAnswer: " + "The student explains the concept in detail. " * 20 + "\n\n"
+        for i in range(1, 30)
+    )
+    return AssessmentEvalResponse(
+        id=str(uuid.uuid4()),
+        assessment_data=answers,
+        total_marks_obtained=120,
+        total_marks=145,
+        percentage=82.7,
+        grade="A",
+        overall_feedback="Strong understanding overall. " * 20,
+        question_evaluations=[
+            QuestionEvaluation(
+                question_number=i, question=f"Explain concept {i}.",
+                student_answer="The student explains the concept in detail. " * 20,
+                marks_obtained=4, max_marks=5, feedback="Good answer, add an example. " * 5, is_correct=True
+            )
+            for i in range(1, 30)
+        ],
+        strengths=["Clear explanations"], areas_for_improvement=["Examples"],
+        suggestions=["Add worked examples"], evaluation_criteria="Accuracy and depth"
+    )
+
+
+def timed(fn, rounds: int = 200):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return result, (time.perf_counter() - started) / rounds * 1000
+
+
+def report(name: str, model, exclude=None):
+    legacy, legacy_ms = timed(lambda: json.dumps(jsonable_encoder(model, exclude=exclude)).encode("utf-8"))
+    fast, fast_ms = timed(lambda: ModelJSONResponse(model, exclude=exclude).body)
+    gzip_size = len(compress(fast, "gzip"))
+    br_size = len(compress(fast, "br")) if brotli is not None else None
+
+    print(f"{name}")
+    print(f"  serialize  generic {legacy_ms:7.3f} ms   ModelJSONResponse {fast_ms:7.3f} ms")
+    print(f"  bytes      identity {len(legacy):>8}   gzip {gzip_size:>8}   br {br_size if br_size else 'n/a':>8}")
+
+
+def main():
+    report("LessonPlanResponse", sample_lesson_plan())
+    report("AssessmentEvalResponse (include_input=true)", sample_evaluation())
+    report("AssessmentEvalResponse (include_input=false)", sample_evaluation(), exclude={"assessment_data"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark the agents' web search tool: queries one at a time versus in one parallel call.
+
+Uses the fake search backend with a fixed per-search latency, so it runs without network
+access. The sequential case is how the agents searched before (one tool call, one blocking
+search, per query); the parallel case passes every query to a single web_search call.
+
+Usage:
+    python benchmarks/web_search.py --queries 4 --latency 0.8 --runs 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.web_search import FakeSearchBackend, SearchBudget, set_search_backend, web_search_tool
+
+
+async def sequential(queries, budget_seconds: float) -> float:
+    tool = web_search_tool(SearchBudget(max_searches=len(queries), budget_seconds=budget_seconds))
+    started = time.perf_counter()
+    for query in queries:
+        await tool([query])
+    return time.perf_counter() - started
+
+
+async def parallel(queries, budget_seconds: float) -> float:
+    tool = web_search_tool(SearchBudget(max_searches=len(queries), budget_seconds=budget_seconds))
+    started = time.perf_counter()
+    await tool(queries)
+    return time.perf_counter() - started
+
+
+async def run(args):
+    set_search_backend(FakeSearchBackend(latency=args.latency))
+    budget_seconds = args.queries * args.latency * 2
+    for name, scenario in (("sequential", sequential), ("parallel", parallel)):
+        durations = []
+        for run_index in range(args.runs):
+            queries = [f"run {run_index} query {n}" for n in range(args.queries)]
+            durations.append(await scenario(queries, budget_seconds))
+        print(f"{name:<12} {args.queries} searches   mean {statistics.mean(durations) * 1000:8.1f} ms   max {max(durations) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=4, help="Searches per agent run")
+    parser.add_argument("--latency", type=float, default=0.8, help="Seconds per search")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from app.api.v1.endpoints import assessment_eval
+from app.services import artifact_store, shared_store
+from app.services.artifact_store import ArtifactStore
+from app.services.shared_store import SharedStore
+
+QUESTION_SET = "Question 1: What is 1/2 + 1/4? (2 marks)\nQuestion 2: Explain photosynthesis. (4 marks)"
+FIRST = "Answer 1: 3/4\nAnswer 2: Plants eat soil."
+REVISED = "Answer 1: 3/4\nAnswer 2: Plants turn light, water and carbon dioxide into sugar."
+
+
+@pytest.fixture
+def prompts(tmp_path, monkeypatch):
+    """Prompts sent to the model; each reply marks question 1 at 2 marks and question 2 at 1"""
+    monkeypatch.setattr(shared_store, "_store", SharedStore(str(tmp_path / "shared.sqlite3")))
+    monkeypatch.setattr(artifact_store, "_store", ArtifactStore(str(tmp_path / "artifacts.sqlite3")))
+    sent = []
+
+    async def generate_content(namespace, prompt, agent_factory, **kwargs):
+        sent.append(prompt)
+        return json.dumps({
+            "question_evaluations": [
+                {"question_number": 1, "marks_obtained": 2, "max_marks": 2, "feedback": "Correct.", "is_correct": True},
+                {"question_number": 2, "marks_obtained": len(sent), "max_marks": 4, "feedback": f"Reply {len(sent)}.", "is_correct": False},
+            ],
+            "overall_feedback": f"Reply {len(sent)}.",
+        })
+
+    monkeypatch.setattr(assessment_eval, "generate_content", generate_content)
+    return sent
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(assessment_eval.router)
+    return TestClient(app)
+
+
+def evaluate(client, assessment_data, submission_key="quiz:student-1"):
+    response = client.post("/evaluate", json={
+        "assessment_data": assessment_data,
+        "question_set": QUESTION_SET,
+        "submission_key": submission_key,
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def feedback(evaluation):
+    return [q["feedback"] for q in evaluation["question_evaluations"]]
+
+
+def test_unchanged_resubmission_skips_the_model(client, prompts):
+    first = evaluate(client, FIRST)
+    again = evaluate(client, FIRST)
+
+    assert len(prompts) == 1
+    assert feedback(again) == feedback(first) == ["Correct.", "Reply 1."]
+    assert (again["total_marks_obtained"], again["total_marks"]) == (3.0, 6.0)
+
+
+def test_only_changed_answers_are_regraded(client, prompts):
+    evaluate(client, FIRST)
+    revised = evaluate(client, REVISED)
+
+    assert len(prompts) == 2
+    changed, unchanged = prompts[1].split("PREVIOUSLY EVALUATED ANSWERS")
+    assert "carbon dioxide" in changed and "3/4" not in changed
+    assert "Question 1: 2/2 - Correct." in unchanged
+    # Question 1 keeps its stored evaluation; question 2 takes the new reply's
+    assert feedback(revised) == ["Correct.", "Reply 2."]
+    assert (revised["total_marks_obtained"], revised["total_marks"]) == (4.0, 6.0)
+
+    # The revised answer is stored too, so resubmitting it again needs no call
+    evaluate(client, REVISED)
+    assert len(prompts) == 2
+
+
+@pytest.mark.parametrize("first_key, second_key", [
+    (None, None),
+    ("quiz:student-1", "quiz:student-2"),
+])
+def test_evaluations_are_not_shared_without_the_same_key(client, prompts, first_key, second_key):
+    evaluate(client, FIRST, first_key)
+    evaluate(client, FIRST, second_key)
+
+    assert len(prompts) == 2
+    assert "PREVIOUSLY EVALUATED ANSWERS" not in prompts[1]
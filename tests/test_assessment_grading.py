@@ -0,0 +1,120 @@
+import pytest
+
+from app.services.assessment_grading import (
+    GRADE_BOUNDARIES,
+    QuestionAnswer,
+    compute_totals,
+    letter_grade,
+    parse_submission,
+    question_hash,
+    to_marks,
+)
+
+SUBMISSION = """Question 1: What is 1/2 + 1/4? (2 marks)
+Answer: 3/4
+
+Question 2: Explain photosynthesis. (5 marks)
+Answer: Plants turn light into food.
+They also release oxygen.
+"""
+
+QUESTION_SET = """Q1. Name a prime number. [1 mark]
+Q2) Define an acid.
+It may help to give an example. (3 marks)
+"""
+
+
+@pytest.mark.parametrize("submission, question_set, expected", [
+    (
+        SUBMISSION,
+        None,
+        [
+            QuestionAnswer(1, "What is 1/2 + 1/4? (2 marks)", "3/4", 2.0),
+            QuestionAnswer(2, "Explain photosynthesis. (5 marks)", "Plants turn light into food.\nThey also release oxygen.", 5.0),
+        ],
+    ),
+    (
+        "Answer 2: A sour substance.\nAnswer 1: 7",
+        QUESTION_SET,
+        [
+            QuestionAnswer(1, "Name a prime number. [1 mark]", "7", 1.0),
+            QuestionAnswer(2, "Define an acid.\nIt may help to give an example. (3 marks)", "A sour substance.", 3.0),
+        ],
+    ),
+    (
+        "Answer 1: 7",
+        QUESTION_SET,
+        [
+            QuestionAnswer(1, "Name a prime number. [1 mark]", "7", 1.0),
+            QuestionAnswer(2, "Define an acid.\nIt may help to give an example. (3 marks)", "", 3.0),
+        ],
+    ),
+    ("question 3 - Spell 'cat'.\nans: c-a-t", None, [QuestionAnswer(3, "Spell 'cat'.", "c-a-t", None)]),
+    # Layouts that are not recognized fall back to evaluating the whole submission
+    ("My essay about the water cycle.", None, []),
+    ("Question 1: What is 2 + 2?\nQuestion 2: What is 3 + 3?\nAnswer: 6", None, []),
+    ("Just some answers without numbers", QUESTION_SET, []),
+])
+def test_parse_submission(submission, question_set, expected):
+    assert parse_submission(submission, question_set) == expected
+
+
+def test_question_hash_ignores_position_and_whitespace():
+    first = QuestionAnswer(1, "What is 2 + 2?", "4")
+    moved = QuestionAnswer(7, "  What is   2 + 2? ", "4\n")
+
+    assert question_hash(first, "quiz:student-1") == question_hash(moved, "quiz:student-1")
+    assert question_hash(first, "quiz:student-1") != question_hash(QuestionAnswer(1, "What is 2 + 2?", "5"), "quiz:student-1")
+    assert question_hash(first, "quiz:student-1") != question_hash(first, "quiz:student-1", question_set="Set B")
+
+
+def test_question_hash_is_scoped_to_the_submission():
+    pair = QuestionAnswer(1, "What is 2 + 2?", "4")
+
+    assert question_hash(pair, "quiz:student-1") != question_hash(pair, "quiz:student-2")
+
+
+@pytest.mark.parametrize("value, expected", [
+    (3, 3.0),
+    ("2.5", 2.5),
+    (-1, 0.0),
+    (None, 0.0),
+    ("two", 0.0),
+    (float("nan"), 0.0),
+    (float("inf"), 0.0),
+])
+def test_to_marks(value, expected):
+    assert to_marks(value) == expected
+
+
+def test_to_marks_default():
+    assert to_marks(None, 1.0) == 1.0
+
+
+@pytest.mark.parametrize("percentage, grade", [
+    (100, "A+"), (90, "A+"), (89.99, "A"), (80, "A"), (70, "B"), (65, "C"), (50, "D"), (49.5, "F"), (0, "F"),
+])
+def test_letter_grade(percentage, grade):
+    assert letter_grade(percentage) == grade
+
+
+def test_grade_boundaries_are_descending_and_end_at_zero():
+    thresholds = [threshold for threshold, _ in GRADE_BOUNDARIES]
+    assert thresholds == sorted(thresholds, reverse=True)
+    assert thresholds[-1] == 0
+
+
+@pytest.mark.parametrize("evaluations, expected", [
+    (
+        [{"max_marks": 2, "marks_obtained": 2}, {"max_marks": 5, "marks_obtained": 3.5}],
+        {"total_marks": 7.0, "total_marks_obtained": 5.5, "percentage": 78.57, "grade": "B"},
+    ),
+    # Marks above the maximum are capped, malformed ones count as zero
+    (
+        [{"max_marks": "4", "marks_obtained": 9}, {"max_marks": 6, "marks_obtained": "n/a"}],
+        {"total_marks": 10.0, "total_marks_obtained": 4.0, "percentage": 40.0, "grade": "F"},
+    ),
+    ([], {"total_marks": 0, "total_marks_obtained": 0, "percentage": 0.0, "grade": "F"}),
+])
+def test_compute_totals(evaluations, expected):
+    assert compute_totals(evaluations) == expected
@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import context_cache, shared_store
+from app.services.context_cache import GeminiContextCache, LocalContextCache, prepare_cached_prompt, prefix_key
+from app.services.shared_store import SharedStore
+
+PREFIX = "Curriculum notes. " * 400
+
+
+class FakeCaches:
+    """Stands in for the Gemini caches API, counting the cached contents it creates"""
+
+    def __init__(self):
+        self.created = []
+
+    async def create(self, model, config):
+        await asyncio.sleep(0.01)
+        self.created.append(model)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+
+def gemini_cache(caches: FakeCaches) -> GeminiContextCache:
+    cache = GeminiContextCache(ttl=3600, min_tokens=100)
+    cache._client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+    return cache
+
+
+def fake_agent(cached_content=None):
+    return SimpleNamespace(description="You are a planner.", model=SimpleNamespace(id="gemini-test"), cached_content=cached_content)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SharedStore(str(tmp_path / "shared.sqlite3"))
+    monkeypatch.setattr(shared_store, "_store", store)
+    return store
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    cache = LocalContextCache(ttl=60)
+    monkeypatch.setattr(settings, "CONTEXT_CACHE_BACKEND", "local")
+    monkeypatch.setattr(context_cache, "_context_cache", cache)
+    return cache
+
+
+def test_local_cache_issues_one_handle_per_prefix():
+    cache = LocalContextCache(ttl=60)
+
+    first = asyncio.run(cache.handle_for("model", "system", "prefix"))
+    again = asyncio.run(cache.handle_for("model", "system", "prefix"))
+    other = asyncio.run(cache.handle_for("model", "system", "another prefix"))
+
+    assert first == (f"local/{prefix_key('model', 'system', 'prefix')}", True)
+    assert again == (first[0], False)
+    assert other[0] != first[0] and other[1] is True
+
+
+def test_local_cache_recreates_expired_entries():
+    cache = LocalContextCache(ttl=0)
+
+    handle, created = asyncio.run(cache.handle_for("model", "system", "prefix"))
+    assert created
+    assert asyncio.run(cache.handle_for("model", "system", "prefix")) == (handle, True)
+
+
+def test_local_cache_attach_prepends_the_cached_prefix():
+    cache = LocalContextCache(ttl=60)
+    handle, _ = asyncio.run(cache.handle_for("model", "system", "prefix "))
+
+    agent, prompt = cache.attach(fake_agent, handle, "suffix")
+
+    assert prompt == "prefix suffix"
+    assert agent.cached_content is None
+
+
+def test_prepare_cached_prompt_sends_full_prompt_through_local_cache(local_cache):
+    first = asyncio.run(prepare_cached_prompt("lesson_plan", fake_agent, PREFIX, "Topic: fractions"))
+    second = asyncio.run(prepare_cached_prompt("lesson_plan", fake_agent, PREFIX, "Topic: decimals"))
+
+    assert first[1] == PREFIX + "Topic: fractions"
+    assert second[1] == PREFIX + "Topic: decimals"
+    assert len(local_cache._entries) == 1
+
+
+def test_prepare_cached_prompt_without_cache_sends_full_prompt(monkeypatch):
+    monkeypatch.setattr(settings, "CONTEXT_CACHE_BACKEND", "off")
+
+    agent, prompt = asyncio.run(prepare_cached_prompt("lesson_plan", fake_agent, PREFIX, "Topic: fractions"))
+
+    assert prompt == PREFIX + "Topic: fractions"
+    assert agent.cached_content is None
+
+
+def test_gemini_cache_skips_short_prefixes(store):
+    caches = FakeCaches()
+
+    assert asyncio.run(gemini_cache(caches).handle_for("gemini-test", "system", "short")) == (None, False)
+    assert caches.created == []
+
+
+def test_gemini_cache_handle_is_shared_between_workers(store):
+    caches = FakeCaches()
+    # Two workers on one host: separate cache objects over the same shared store
+    first_worker, second_worker = gemini_cache(caches), gemini_cache(caches)
+
+    created = asyncio.run(first_worker.handle_for("gemini-test", "system", PREFIX))
+    reused = asyncio.run(second_worker.handle_for("gemini-test", "system", PREFIX))
+
+    assert created == ("cachedContents/1", True)
+    assert reused == ("cachedContents/1", False)
+    assert caches.created == ["gemini-test"]
+    assert store.get("context_cache", prefix_key("gemini-test", "system", PREFIX)) == b"cachedContents/1"
+
+
+def test_gemini_cache_concurrent_misses_create_one_cached_content(store):
+    caches = FakeCaches()
+    cache = gemini_cache(caches)
+
+    async def lookups():
+        return await asyncio.gather(*(cache.handle_for("gemini-test", "system", PREFIX) for _ in range(5)))
+
+    handles = asyncio.run(lookups())
+
+    assert {handle for handle, _ in handles} == {"cachedContents/1"}
+    assert sum(created for _, created in handles) == 1
+    assert len(caches.created) == 1
+
+
+def test_gemini_cache_attach_sends_only_the_suffix():
+    agent, prompt = GeminiContextCache(ttl=3600, min_tokens=100).attach(fake_agent, "cachedContents/1", "suffix")
+
+    assert prompt == "suffix"
+    assert agent.cached_content == "cachedContents/1"
@@ -0,0 +1,91 @@
+import pytest
+
+from app.services.curriculum_kb import INDEX_VERSION, CurriculumIndex, build_index, iter_corpus, tokenize
+
+PASSAGES = [
+    {"title": "Fractions", "text": "Compare fractions with like denominators. Add fractions.", "curriculum": "CBSE", "subject": "Mathematics", "grade": "5"},
+    {"title": "Decimals", "text": "Relate decimals to fractions and place value.", "curriculum": "CBSE", "subject": "Mathematics", "grade": "Grade 6"},
+    {"title": "Fractions in recipes", "text": "Use fractions when scaling recipes.", "curriculum": "Cambridge", "subject": "Mathematics", "grade": "5"},
+    {
+        "title": "Plant life",
+        "text": "Photosynthesis turns light into food. " + "Plants need water, soil and sunlight to grow. " * 10 + "Fractions of a leaf.",
+        "curriculum": "CBSE",
+        "subject": "Science",
+        "grade": "5",
+    },
+    {"title": "Any curriculum", "text": "Estimate fractions on a number line."},
+]
+
+
+@pytest.fixture
+def index():
+    return CurriculumIndex(build_index(iter(PASSAGES)))
+
+
+def titles(results):
+    return [result["title"] for result in results]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("Students should be able to compare the Fractions!") == ["compare", "fractions"]
+
+
+def test_rarer_terms_rank_higher(index):
+    # "fractions" is in every passage, "value" and "recipes" in one each
+    assert index.search("fractions value")[0]["title"] == "Decimals"
+    assert index.search("fractions recipes")[0]["title"] == "Fractions in recipes"
+
+
+def test_longer_passages_are_penalized(index):
+    results = index.search("fractions", limit=10)
+
+    assert len(results) == len(PASSAGES)
+    assert results[-1]["title"] == "Plant life"
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+
+
+def test_repeated_terms_score_higher(index):
+    results = {result["title"]: result["score"] for result in index.search("fractions", limit=10)}
+
+    # Both are six terms long, but "Fractions" uses the term three times
+    assert results["Fractions"] > results["Any curriculum"]
+
+
+def test_unknown_terms_and_stopwords_return_nothing(index):
+    assert index.search("zebra") == []
+    assert index.search("the and of") == []
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"curriculum": "CBSE"}, {"Fractions", "Decimals", "Plant life", "Any curriculum"}),
+    ({"curriculum": "cbse board", "subject": "math"}, {"Fractions", "Decimals", "Any curriculum"}),
+    ({"grade": "Grade 5"}, {"Fractions", "Fractions in recipes", "Plant life", "Any curriculum"}),
+    ({"grade": "6"}, {"Decimals", "Any curriculum"}),
+    ({"curriculum": "", "subject": None}, {passage["title"] for passage in PASSAGES}),
+])
+def test_metadata_filters(index, filters, expected):
+    assert set(titles(index.search("fractions", limit=10, **filters))) == expected
+
+
+def test_limit(index):
+    assert len(index.search("fractions", limit=2)) == 2
+
+
+def test_reads_text_files_with_metadata_headers(tmp_path):
+    (tmp_path / "cbse_math_5.md").write_text(
+        "curriculum: CBSE\nsubject: Mathematics\ngrade: 5\n\n# Fractions\nCompare fractions.\n\n# Geometry\nName shapes.\n",
+        encoding="utf-8"
+    )
+    (tmp_path / "extra.jsonl").write_text('{"title": "Money", "text": "Count coins.", "grade": 3}\n\n{"title": "Empty"}\n', encoding="utf-8")
+
+    index = CurriculumIndex(build_index(iter_corpus(str(tmp_path))))
+
+    assert titles(index.search("shapes")) == ["Geometry"]
+    assert index.search("compare fractions")[0]["curriculum"] == "CBSE"
+    assert index.search("coins", grade="Grade 3")[0]["title"] == "Money"
+    assert index.search("coins", grade="4") == []
+
+
+def test_rejects_indexes_of_another_version():
+    with pytest.raises(ValueError):
+        CurriculumIndex({"version": INDEX_VERSION + 1, "docs": [], "postings": {}})
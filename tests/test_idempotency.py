@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core import idempotency
+from app.core.idempotency import IdempotencyMiddleware
+from app.services import shared_store
+from app.services.shared_store import SharedStore
+
+PATH = "/api/v1/homework-generator/generate"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SharedStore(str(tmp_path / "shared.sqlite3"))
+    monkeypatch.setattr(shared_store, "_store", store)
+    monkeypatch.setattr(idempotency, "_inflight", {})
+    return store
+
+
+@pytest.fixture
+def app(store):
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.post(PATH)
+    async def generate(request: Request):
+        app.state.calls += 1
+        body = await request.json()
+        await asyncio.sleep(0.05)
+        if body.get("fail"):
+            return JSONResponse({"detail": "model unavailable"}, status_code=503)
+        return {"topic": body["topic"], "call": app.state.calls}
+
+    app.add_middleware(IdempotencyMiddleware)
+    return app
+
+
+async def post(app, requests):
+    """Send (key, body, query) requests concurrently and return the responses in order"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(
+            client.post(PATH + query, json=body, headers={"Idempotency-Key": key} if key else {})
+            for key, body, query in requests
+        ))
+
+
+def send(app, *requests):
+    """Send requests one after another"""
+    return [asyncio.run(post(app, [request]))[0] for request in requests]
+
+
+FRACTIONS = {"topic": "fractions"}
+DECIMALS = {"topic": "decimals"}
+
+
+@pytest.mark.parametrize("first, second, status, replayed, calls", [
+    # A retry with the same key and body replays the stored response
+    (("key-1", FRACTIONS, ""), ("key-1", FRACTIONS, ""), 200, True, 1),
+    # Reusing a key for a different body or query string is a conflict
+    (("key-1", FRACTIONS, ""), ("key-1", DECIMALS, ""), 422, False, 1),
+    (("key-1", FRACTIONS, ""), ("key-1", FRACTIONS, "?include_input=false"), 422, False, 1),
+    # Different keys, or no key at all, run again
+    (("key-1", FRACTIONS, ""), ("key-2", FRACTIONS, ""), 200, False, 2),
+    ((None, FRACTIONS, ""), (None, FRACTIONS, ""), 200, False, 2),
+])
+def test_sequential_requests(app, first, second, status, replayed, calls):
+    original, retry = send(app, first, second)
+
+    assert original.status_code == 200
+    assert retry.status_code == status
+    assert ("idempotent-replayed" in retry.headers) is replayed
+    if replayed:
+        assert retry.json() == original.json()
+    assert app.state.calls == calls
+
+
+def test_errors_are_not_stored(app):
+    failed, retry = send(app, ("key-1", {"fail": True}, ""), ("key-1", {"fail": True}, ""))
+
+    assert failed.status_code == retry.status_code == 503
+    assert "idempotent-replayed" not in retry.headers
+    assert app.state.calls == 2
+
+
+def test_concurrent_duplicates_run_once(app):
+    responses = asyncio.run(post(app, [("key-1", FRACTIONS, "")] * 5))
+
+    assert app.state.calls == 1
+    assert [response.status_code for response in responses] == [200] * 5
+    assert {response.json()["call"] for response in responses} == {1}
+    assert sum("idempotent-replayed" in response.headers for response in responses) == 4
+
+
+def test_stored_records_are_capped(app, store, monkeypatch):
+    monkeypatch.setattr(idempotency.settings, "IDEMPOTENCY_MAX_RECORDS", 2)
+
+    send(app, *((f"key-{n}", {"topic": f"topic {n}"}, "") for n in range(4)))
+
+    assert len(store.scan(idempotency.STORE_NAMESPACE)) == 2
+    # The oldest record was evicted, so its key runs again
+    send(app, ("key-0", {"topic": "topic 0"}, ""))
+    assert app.state.calls == 5
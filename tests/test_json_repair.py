@@ -0,0 +1,35 @@
+import pytest
+
+from app.services.json_repair import repair_locally
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ('{"score": 4, "feedback": "Good"}', {"score": 4, "feedback": "Good"}),
+    # Fences and surrounding prose
+    ('```json\n{"score": 4}\n```', {"score": 4}),
+    ('```\n{"score": 4}\n```', {"score": 4}),
+    ('Here is the evaluation:\n{"score": 4}\nLet me know if you need more.', {"score": 4}),
+    ('```json\n{"score": 4}', {"score": 4}),
+    # Trailing commas
+    ('{"score": 4, "tags": ["a", "b",],}', {"score": 4, "tags": ["a", "b"]}),
+    ('{"items": [{"n": 1,}, {"n": 2},]}', {"items": [{"n": 1}, {"n": 2}]}),
+    # Truncated replies, closed at the cut or at the last complete value
+    ('{"score": 4, "tags": ["a", "b"', {"score": 4, "tags": ["a", "b"]}),
+    ('{"score": 4, "feedback": "Good wor', {"score": 4, "feedback": "Good wor"}),
+    ('{"score": 4, "feedback":', {"score": 4}),
+    ('{"questions": [{"n": 1, "marks": 2}, {"n": 2, "mar', {"questions": [{"n": 1, "marks": 2}, {"n": 2}]}),
+    ('```json\n{"score": 4, "tags": ["a",', {"score": 4, "tags": ["a"]}),
+    ('{"text": "a \\"quoted, comma\\" and', {"text": 'a "quoted, comma" and'}),
+])
+def test_repair_locally(reply, expected):
+    assert repair_locally(reply) == expected
+
+
+@pytest.mark.parametrize("reply", [
+    "",
+    "I could not evaluate this submission.",
+    "[1, 2, 3]",
+    '{"score": 4 "feedback": "missing comma"}',
+])
+def test_repair_locally_gives_up(reply):
+    assert repair_locally(reply) is None
@@ -0,0 +1,120 @@
+import pytest
+
+from app.services.markdown_sections import find_section, parse_sections, parse_selectors, replace_section, select_sections
+
+LESSON_PLAN = """# Lesson Plan: Fractions
+
+**1. LEARNING OBJECTIVES**
+Students compare fractions.
+
+## 2. Lesson Activities
+
+### Warm-up
+1. Count to ten.
+2. Share pizza slices.
+
+### Main Activity
+Fraction strips in pairs.
+
+## 3. Homework Assignments
+
+Worksheet page 4.
+
+```
+# not a heading inside code
+```
+"""
+
+
+@pytest.fixture
+def sections():
+    return parse_sections(LESSON_PLAN)
+
+
+def test_parse_sections_builds_the_heading_tree(sections):
+    assert [section.title for section in sections] == ["Lesson Plan: Fractions"]
+    plan = sections[0]
+    assert [(section.number, section.level, section.key) for section in plan.subsections] == [
+        (1, 3, "learning-objectives"),
+        (2, 2, "lesson-activities"),
+        (3, 2, "homework-assignments"),
+    ]
+    activities = plan.subsections[1]
+    assert [section.key for section in activities.subsections] == ["warm-up", "main-activity"]
+    # Ordered list items are not headings
+    assert activities.subsections[0].content == "1. Count to ten.\n2. Share pizza slices."
+
+
+def test_parse_sections_ignores_headings_in_code_blocks(sections):
+    homework = sections[0].subsections[2]
+    assert homework.subsections == []
+    assert homework.content.startswith("Worksheet page 4.")
+    assert "# not a heading inside code" in homework.content
+
+
+def test_parse_sections_of_empty_markdown():
+    assert parse_sections("") == []
+    assert parse_sections(None) == []
+
+
+@pytest.mark.parametrize("selectors, expected", [
+    (["1"], ["learning-objectives"]),
+    (["3"], ["homework-assignments"]),
+    (["homework"], ["homework-assignments"]),
+    (["Main Activity"], ["main-activity"]),
+    (["2", "lesson-activities", "warm-up"], ["lesson-activities", "warm-up"]),
+    (["", "   "], []),
+    (["glossary"], []),
+])
+def test_select_sections(sections, selectors, expected):
+    assert [section.key for section in select_sections(sections, selectors)] == expected
+
+
+def test_parse_selectors():
+    assert parse_selectors(" 1, homework ,,") == ["1", "homework"]
+    assert parse_selectors(None) == []
+
+
+@pytest.mark.parametrize("selector, heading", [
+    ("1", "**1. LEARNING OBJECTIVES**"),
+    ("2", "## 2. Lesson Activities"),
+    ("warm-up", "### Warm-up"),
+    ("homework", "## 3. Homework Assignments"),
+])
+def test_find_section(selector, heading):
+    span = find_section(LESSON_PLAN, selector)
+    assert LESSON_PLAN.splitlines()[span.start] == heading
+
+
+def test_find_section_missing():
+    assert find_section(LESSON_PLAN, "glossary") is None
+
+
+def test_replace_section_keeps_heading_spacing_and_neighbours():
+    span = find_section(LESSON_PLAN, "warm-up")
+
+    updated = replace_section(LESSON_PLAN, span, "### Warm-up\nFold paper into halves.\n")
+
+    assert "### Warm-up\nFold paper into halves.\n\n### Main Activity" in updated
+    assert "Count to ten" not in updated
+    assert updated.replace("Fold paper into halves.", "1. Count to ten.\n2. Share pizza slices.") == LESSON_PLAN.rstrip("\n")
+
+
+def test_replace_section_with_subsections_and_blank_line_after_heading():
+    span = find_section(LESSON_PLAN, "2")
+
+    updated = replace_section(LESSON_PLAN, span, "Stations with fraction strips.")
+
+    assert "## 2. Lesson Activities\n\nStations with fraction strips.\n\n## 3. Homework Assignments" in updated
+    assert "Warm-up" not in updated
+    assert [section.key for section in parse_sections(updated)[0].subsections] == [
+        "learning-objectives", "lesson-activities", "homework-assignments"
+    ]
+
+
+def test_replace_last_section():
+    span = find_section(LESSON_PLAN, "homework")
+
+    updated = replace_section(LESSON_PLAN, span, "Worksheet page 5.")
+
+    assert updated.endswith("## 3. Homework Assignments\n\nWorksheet page 5.")
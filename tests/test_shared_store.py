@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from app.services import shared_store
+from app.services.shared_store import SharedStore, SharedStorePurger
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SharedStore(str(tmp_path / "shared.sqlite3"))
+    monkeypatch.setattr(shared_store, "_store", store)
+    return store
+
+
+def rows(store, table):
+    return store._connection().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_purge_deletes_expired_rows_only(store):
+    store.set("response_cache", "old", b"x", ttl=0.01)
+    store.set("response_cache", "fresh", b"x", ttl=60)
+    store.set("artifact_ids", "forever", b"x")
+    store.incr("rate:10.0.0.1:1", ttl=0.01)
+    store.incr("rate:10.0.0.1:2", ttl=60)
+    store.acquire_lease("generate:old", "worker", 0.01)
+    time.sleep(0.05)
+
+    assert store.purge_expired() == 3
+    assert rows(store, "kv") == 2
+    assert rows(store, "counters") == 1
+    assert rows(store, "leases") == 0
+    assert store.get("response_cache", "fresh") == b"x"
+
+
+def test_one_purger_per_interval(store):
+    store.set("response_cache", "old", b"x", ttl=0.01)
+    time.sleep(0.05)
+    first, second = SharedStorePurger(), SharedStorePurger()
+    second._owner = "purge-other-worker"
+
+    assert first.purge_once(60) == 1
+    store.set("response_cache", "old", b"x", ttl=0.01)
+    time.sleep(0.05)
+    # The other worker finds the lease taken and leaves the purge to the first
+    assert second.purge_once(60) == 0
+    assert rows(store, "kv") == 1
+
+
+@pytest.mark.parametrize("max_entries, max_bytes, kept", [
+    (10, 10_000, ["a", "b", "c", "d"]),
+    (2, 10_000, ["c", "d"]),
+    (10, 250, ["c", "d"]),
+    (3, 350, ["b", "c", "d"]),
+])
+def test_trim_evicts_the_records_expiring_first(store, max_entries, max_bytes, kept):
+    for ttl, key in enumerate("abcd", start=10):
+        store.set("idempotency", key, b"x" * 100, ttl=ttl)
+    store.set("idempotency", "expired", b"x", ttl=0.01)
+    store.set("other", "untouched", b"x" * 1000, ttl=1)
+    time.sleep(0.05)
+
+    store.trim("idempotency", max_entries, max_bytes)
+
+    assert sorted(store.scan("idempotency")) == kept
+    assert rows(store, "kv") == len(kept) + 1
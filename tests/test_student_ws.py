@@ -0,0 +1,34 @@
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.v1.endpoints import student_assistant
+
+URL = "/ws?curriculum=CBSE&subject=Mathematics&grade=5"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(student_assistant.router)
+    return TestClient(app)
+
+
+def test_failed_agent_setup_reports_an_error_and_frees_the_session(client, monkeypatch):
+    def broken_agent(**kwargs):
+        raise ValueError("GOOGLE_API_KEY environment variable is required")
+
+    monkeypatch.setattr(student_assistant, "get_student_assistant_agent", broken_agent)
+    monkeypatch.setattr(student_assistant.settings, "STUDENT_WS_MAX_CONNECTIONS", 2)
+
+    for _ in range(3):
+        with client.websocket_connect(URL) as websocket:
+            message = websocket.receive_json()
+            assert message["type"] == "error"
+            assert "GOOGLE_API_KEY" in message["detail"]
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+            assert closed.value.code == 1011
+
+    assert student_assistant._open_sessions == 0
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import web_search
+from app.services.web_search import (
+    DuckDuckGoBackend,
+    FakeSearchBackend,
+    SearchBudget,
+    SearchResult,
+    run_searches,
+    start_search_run,
+    web_search_tool,
+)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = FakeSearchBackend(latency=0.2)
+    monkeypatch.setattr(web_search, "_backend", backend)
+    return backend
+
+
+def test_queries_in_one_call_run_concurrently(backend):
+    queries = [f"query {n}" for n in range(5)]
+
+    started = time.perf_counter()
+    outcome = asyncio.run(run_searches(queries, SearchBudget(max_searches=5, budget_seconds=5)))
+    elapsed = time.perf_counter() - started
+
+    assert list(outcome) == queries
+    assert all(isinstance(results, list) and results for results in outcome.values())
+    # Five searches of 0.2 s each finish together rather than one after another
+    assert elapsed < 0.6
+
+
+def test_search_count_budget_is_per_run(backend):
+    budget = SearchBudget(max_searches=2, budget_seconds=5)
+
+    outcome = asyncio.run(run_searches(["a", "b", "c"], budget))
+
+    assert isinstance(outcome["a"], list) and isinstance(outcome["b"], list)
+    assert outcome["c"] == "Not searched: the search budget for this answer is used up"
+    assert backend.queries == ["a", "b"]
+
+    later = asyncio.run(run_searches(["d"], budget))
+    assert later["d"] == "Not searched: the search budget for this answer is used up"
+
+    budget.reset()
+    assert isinstance(asyncio.run(run_searches(["d"], budget))["d"], list)
+
+
+def test_repeated_queries_are_answered_from_the_run(backend):
+    budget = SearchBudget(max_searches=1, budget_seconds=5)
+
+    first = asyncio.run(run_searches(["fractions", " fractions "], budget))
+    again = asyncio.run(run_searches(["fractions"], budget))
+
+    assert backend.queries == ["fractions"]
+    assert again["fractions"] == first["fractions"]
+
+
+def test_searches_past_the_time_budget_are_abandoned(backend):
+    budget = SearchBudget(max_searches=5, budget_seconds=0.05)
+
+    outcome = asyncio.run(run_searches(["slow"], budget))
+
+    assert outcome["slow"] == "Not searched: the search time budget for this answer ran out"
+    assert asyncio.run(run_searches(["late"], budget))["late"] == (
+        "Not searched: the search time budget for this answer is used up"
+    )
+
+
+def test_failed_searches_are_reported_per_query(monkeypatch):
+    def results(query):
+        if query == "broken":
+            raise RuntimeError("backend unavailable")
+        return [SearchResult(query, "https://example.com", "snippet")]
+
+    monkeypatch.setattr(web_search, "_backend", FakeSearchBackend(results=results))
+
+    outcome = asyncio.run(run_searches(["broken", "fine"], SearchBudget(max_searches=5, budget_seconds=5)))
+
+    assert outcome["broken"] == "Search failed: backend unavailable"
+    assert outcome["fine"][0].title == "fine"
+
+
+def test_tool_returns_json_and_resets_with_the_run(backend):
+    tool = web_search_tool(SearchBudget(max_searches=1, budget_seconds=5))
+    agent = SimpleNamespace(tools=[tool])
+
+    first = json.loads(asyncio.run(tool(["fractions", "decimals"])))
+    assert first["fractions"][0]["url"] == "https://example.com/fractions"
+    assert first["decimals"].startswith("Not searched")
+
+    start_search_run(agent)
+    assert isinstance(json.loads(asyncio.run(tool(["decimals"])))["decimals"], list)
+
+
+def test_duckduckgo_backend_bounds_concurrent_threads(monkeypatch):
+    backend = DuckDuckGoBackend(max_concurrent=2)
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def search(query, max_results):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return [SearchResult(query, "https://example.com", "snippet")] * 10
+
+    monkeypatch.setattr(backend, "_search", search)
+
+    async def fan_out():
+        return await asyncio.gather(*(backend.search(f"query {n}", 3) for n in range(6)))
+
+    results = asyncio.run(fan_out())
+
+    assert peak == 2
+    assert all(len(found) == 3 for found in results)
+
+
+def test_duckduckgo_backend_reuses_one_client_per_thread(monkeypatch):
+    created = []
+
+    class FakeDDGS:
+        def __init__(self, timeout=None):
+            created.append(threading.get_ident())
+
+        def text(self, query, max_results):
+            time.sleep(0.01)
+            return [{"title": query, "href": "https://example.com", "body": "snippet"}]
+
+    monkeypatch.setattr(web_search, "DDGS", FakeDDGS)
+    backend = DuckDuckGoBackend(max_concurrent=2)
+
+    async def searches():
+        for n in range(4):
+            await backend.search(f"query {n}", 3)
+        return await asyncio.gather(*(backend.search(f"parallel {n}", 3) for n in range(4)))
+
+    results = asyncio.run(searches())
+
+    assert results[0] == [SearchResult("parallel 0", "https://example.com", "snippet")]
+    # One client per worker thread that ran a search, not one per search
+    assert len(created) == len(set(created)) < 8